@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Measure how fast SydrDriver moves seeds: file detection, hashing, dedup,
+send_seed and telemetry parsing, with benchmarks/fake-sydr-fuzz standing
+in for sydr-fuzz.
+
+The agent is either a FileAgent (every message logged to a file) or a stub
+agent dropping messages, both instrumented to record what is sent. Seeds
+can also be injected as if they were received from the broker.
+
+Reports seeds/sec, the end-to-end latency distribution (file written by
+the fake sydr-fuzz -> send_seed), CPU time and RSS of the agent.
+
+Usage: bench_driver.py [--duration 30] [--seed-rate 500] [--agent stub] ...
+"""
+
+# built-in imports
+import argparse
+import logging
+import os
+import resource
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# third-party imports
+from libpastis import FileAgent
+from libpastis.types import CheckMode, CoverageMode, ExecMode, FuzzingEngineInfo, FuzzMode, SeedInjectLoc, SeedType
+from libpastis.agent import MessageType
+from libpastis.proto import InputSeedMsg, TelemetryMsg
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR.parent / "broker-addon"))
+
+# local imports
+import pastissydr
+from pastissydr import DriverOptions, SydrDriver
+from pastissydr.watcher import WATCHER_KINDS
+
+
+class StubAgent(FileAgent):
+    """ Client agent which accepts every message and drops it """
+
+    def __init__(self):
+        super(StubAgent, self).__init__(log_file=None)
+
+    def send(self, msg, msg_type=None):
+        pass
+
+
+class Recorder:
+    """ Wrap the send method of an agent to record seeds and telemetry """
+
+    def __init__(self, agent):
+        self._send = agent.send
+        agent.send = self.send
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.seeds = 0
+        self.crashes = 0
+        self.telemetry = 0
+        self.first = None
+        self.last = None
+
+    def send(self, msg, msg_type=None):
+        now = time.time()
+        if isinstance(msg, InputSeedMsg):
+            with self._lock:
+                self.first = self.first or now
+                self.last = now
+                if msg.type == SeedType.CRASH.value:
+                    self.crashes += 1
+                else:
+                    self.seeds += 1
+                if len(msg.seed) >= 8:
+                    created, = struct.unpack_from("<d", msg.seed)
+                    if 0 < now - created < 3600:  # Only files written by the fake sydr-fuzz
+                        self.latencies.append(now - created)
+        elif isinstance(msg, TelemetryMsg):
+            self.telemetry += 1
+        return self._send(msg, msg_type)
+
+
+def rss_mib() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def inject(agent, rate: float, size: int, stop: threading.Event):
+    """ Feed the seed callbacks as the broker would """
+    callbacks = agent._cbs[MessageType.INPUT_SEED]
+    period = 1 / rate
+    deadline = time.time()
+    count = 0
+    while not stop.is_set():
+        seed = struct.pack("<d", 0) + os.urandom(max(0, size - 8))
+        for cb in callbacks:
+            cb(SeedType.INPUT, seed)
+        count += 1
+        deadline += period
+        stop.wait(max(0.0, deadline - time.time()))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SydrDriver seed pipeline benchmark")
+    parser.add_argument("--duration", type=float, default=30, help="Benchmark duration (sec)")
+    parser.add_argument("--seed-rate", type=float, default=500, help="Queue entries written per second")
+    parser.add_argument("--seed-size", type=int, default=64, help="Size of queue entries (bytes)")
+    parser.add_argument("--sydr-ratio", type=float, default=0.1, help="Fraction of entries produced by Sydr")
+    parser.add_argument("--crash-rate", type=float, default=1, help="Crashes written per second")
+    parser.add_argument("--stats-period", type=float, default=1, help="fuzzer_stats refresh period (sec)")
+    parser.add_argument("--inbound-rate", type=float, default=0, help="Seeds received from the broker per second")
+    parser.add_argument("--inbound-interval", type=float, default=10, help="Interval (sec) between injections of broker seeds")
+    parser.add_argument("--cores", type=int, default=None, help="Scale on N cores (number of fake AFL++ workers)")
+    parser.add_argument("--agent", choices=["stub", "file"], default="stub", help="Agent used by the driver")
+    parser.add_argument("--watcher", choices=WATCHER_KINDS, default="auto", help="Workspace watcher backend")
+    parser.add_argument("--send-workers", type=int, default=2)
+    parser.add_argument("--outbound-budget", type=int, default=None, help="Queue entries sent per second (best first)")
+    parser.add_argument("--telemetry-frequency", type=int, default=1)
+    parser.add_argument("--target", type=str, default=shutil.which("true"), help="Binary given as fuzz target")
+    parser.add_argument("--keep", action="store_true", help="Keep the workspace")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    workspace = Path(tempfile.mkdtemp(prefix="bench-sydr-"))
+    os.environ["SYDR_PATH"] = str(BENCH_DIR / "fake-sydr-fuzz")
+    os.environ["SYDR_WS"] = str(workspace / "ws")
+    os.environ.update({"FAKE_SYDR_SEED_RATE": str(args.seed_rate),
+                       "FAKE_SYDR_SEED_SIZE": str(args.seed_size),
+                       "FAKE_SYDR_SYDR_RATIO": str(args.sydr_ratio),
+                       "FAKE_SYDR_CRASH_RATE": str(args.crash_rate),
+                       "FAKE_SYDR_STATS_PERIOD": str(args.stats_period)})
+
+    agent = StubAgent() if args.agent == "stub" else FileAgent(log_file=str(workspace / "agent.log"))
+    recorder = Recorder(agent)
+    driver = SydrDriver(agent, DriverOptions(telemetry_frequency=args.telemetry_frequency, watcher=args.watcher,
+                                             send_workers=args.send_workers, outbound_budget=args.outbound_budget,
+                                             cores=args.cores, inbound_filter=False,
+                                             inbound_interval=args.inbound_interval))
+
+    rss_start = rss_mib()
+    usage_start = resource.getrusage(resource.RUSAGE_SELF)
+    t0 = time.time()
+    target = Path(args.target)
+    driver.start_received(target.name, target.read_bytes(), FuzzingEngineInfo("SYDR", pastissydr.__version__, None),
+                          ExecMode.SINGLE_EXEC, FuzzMode.BINARY_ONLY, CheckMode.ALERT_ONLY, CoverageMode.EDGE,
+                          SeedInjectLoc.ARGV, "", [], "")
+    if not driver.started:
+        print("driver did not start", file=sys.stderr)
+        return 1
+
+    stop = threading.Event()
+    injected = []
+    injector = None
+    if args.inbound_rate > 0:
+        injector = threading.Thread(target=lambda: injected.append(inject(agent, args.inbound_rate, args.seed_size, stop)))
+        injector.start()
+
+    rss_peak = rss_start
+    while time.time() - t0 < args.duration:
+        time.sleep(0.5)
+        rss_peak = max(rss_peak, rss_mib())
+    stop.set()
+    if injector:
+        injector.join()
+    driver.stop()
+    elapsed = time.time() - t0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    cpu = (usage.ru_utime - usage_start.ru_utime) + (usage.ru_stime - usage_start.ru_stime)
+    lat = [x * 1000 for x in recorder.latencies]
+    active = (recorder.last - recorder.first) if recorder.first and recorder.last else 0
+
+    print(f"duration          {elapsed:10.1f} s")
+    print(f"seeds sent        {recorder.seeds:10}  ({recorder.seeds / max(active, 1e-6):.1f} seeds/s)")
+    print(f"crashes sent      {recorder.crashes:10}")
+    print(f"telemetry sent    {recorder.telemetry:10}")
+    if injected:
+        print(f"seeds injected    {injected[0]:10}  ({injected[0] / elapsed:.1f} seeds/s)")
+    if lat:
+        print(f"latency (ms)      min {min(lat):.1f}  p50 {percentile(lat, 50):.1f}  p90 {percentile(lat, 90):.1f}  "
+              f"p99 {percentile(lat, 99):.1f}  max {max(lat):.1f}  mean {statistics.mean(lat):.1f}")
+    print(f"cpu               {cpu:10.2f} s  ({cpu / elapsed * 100:.1f}% of a core)")
+    print(f"rss (MiB)         start {rss_start:.1f}  peak {rss_peak:.1f}  max {usage.ru_maxrss / 1024:.1f}")
+
+    if args.keep:
+        print(f"workspace         {workspace}")
+    else:
+        shutil.rmtree(workspace, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compare SydrEngineDescriptor.accept_file detection paths:
+
+- lief: full lief.parse and walk of symbols/functions (historical implementation)
+- scan: mmap scan of the ELF symbol string tables
+- cached: scan + content-hash cache (second pass over the same files)
+- bulk: accept_directory (thread pool) on a cold cache
+
+Usage: bench_accept_file.py [DIRECTORY_OR_FILES...]  (default: /usr/bin)
+"""
+
+# built-in imports
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# local imports
+from sydrbroker import SydrEngineDescriptor
+from sydrbroker.elfscan import ContentCache
+
+
+def bench(name, func, files):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    results = [func(f) for f in files]
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:8} {len(files):6} files  {elapsed:8.3f}s  {elapsed / max(1, len(files)) * 1000:8.3f} ms/file  peak py mem: {peak / 1024 / 1024:.1f} MiB")
+    return results
+
+
+def main():
+    args = [Path(x) for x in sys.argv[1:]] or [Path("/usr/bin")]
+    files = []
+    for arg in args:
+        files.extend(sorted(p for p in arg.iterdir() if p.is_file()) if arg.is_dir() else [arg])
+
+    ref = bench("lief", SydrEngineDescriptor._accept_file_lief, files)
+    scan = bench("scan", SydrEngineDescriptor._accept_file_uncached, files)
+    SydrEngineDescriptor._cache = ContentCache()
+    bench("cold", SydrEngineDescriptor.accept_file, files)
+    bench("cached", SydrEngineDescriptor.accept_file, files)
+
+    SydrEngineDescriptor._cache = ContentCache()
+    for arg in args:
+        if arg.is_dir():
+            t0 = time.perf_counter()
+            res = SydrEngineDescriptor.accept_directory(arg)
+            print(f"bulk     {len(res):6} files  {time.perf_counter() - t0:8.3f}s  ({arg})")
+
+    mismatches = [f for f, a, b in zip(files, ref, scan) if a != b]
+    print(f"mismatches with lief: {len(mismatches)}")
+    for f in mismatches[:10]:
+        print(f"  {f}")
+
+
+if __name__ == "__main__":
+    main()
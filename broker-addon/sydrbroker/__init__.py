@@ -1,46 +1,15 @@
 # built-in imports
+import os
 from pathlib import Path
-from typing import Union, Tuple, List, Optional, Type
+from typing import Union, Tuple, List, Optional, Type, Dict
 
 # third-party import
-import lief
-
-from libpastis import FuzzingEngineDescriptor, EngineConfiguration
+from libpastis import FuzzingEngineDescriptor
 from libpastis.types import ExecMode, CoverageMode, FuzzMode
 
-
-class SydrConfigurationInterface(EngineConfiguration):
-    """
-    Small wrapping function for AFL++ additional parameters
-    """
-
-    def __init__(self, args: List[str] = None):
-        self._argvs = [] if args is None else args # Argument to send on the command line
-
-    @staticmethod
-    def new() -> 'SydrConfigurationInterface':
-        return SydrConfigurationInterface()
-
-    @staticmethod
-    def from_file(filepath: Path) -> 'SydrConfigurationInterface':
-        with open(filepath, "r") as f:
-            return SydrConfigurationInterface(f.read().split())
-
-    @staticmethod
-    def from_str(s: str) -> 'SydrConfigurationInterface':
-        return SydrConfigurationInterface(s.split())
-
-    def to_str(self) -> str:
-        return " ".join(self._argvs)
-
-    def get_coverage_mode(self) -> CoverageMode:
-        """ Current coverage mode selected in the file """
-        return CoverageMode.AUTO
-
-    def set_target(self, target: int) -> None:
-        # Note: Giving a target to Honggfuzz does not
-        # do anything as Honggfuzz is not directed.
-        pass
+# local imports
+from .config import AFLOptions, SchedulingOptions, SydrConfigurationInterface, SydrOptions
+from .elfscan import ContentCache, classify_directory, has_afl_instrumentation
 
 
 class SydrEngineDescriptor(FuzzingEngineDescriptor):
@@ -54,11 +23,57 @@ class SydrEngineDescriptor(FuzzingEngineDescriptor):
     def __init__(self):
         pass
 
+    CACHE_ENV_VAR = "SYDR_BROKER_CACHE"  # Directory persisting accept_file results
+
+    _cache = ContentCache(os.environ.get(CACHE_ENV_VAR))
+
     @staticmethod
     def accept_file(binary_file: Path) -> Tuple[bool, Optional[ExecMode], Optional[FuzzMode]]:
         if str(binary_file).endswith(".cmplog"):
             return False, None, None
 
+        return SydrEngineDescriptor._cache.cached(binary_file,
+                                                  SydrEngineDescriptor._accept_file_uncached,
+                                                  SydrEngineDescriptor._encode_result,
+                                                  SydrEngineDescriptor._decode_result)
+
+    @staticmethod
+    def accept_directory(directory: Path, workers: Optional[int] = None) -> Dict[Path, Tuple[bool, Optional[ExecMode], Optional[FuzzMode]]]:
+        """ Classify all binaries of a directory in parallel """
+        return classify_directory(directory, SydrEngineDescriptor.accept_file, workers)
+
+    @staticmethod
+    def _encode_result(result: Tuple[bool, Optional[ExecMode], Optional[FuzzMode]]) -> str:
+        accepted, exec_mode, fuzz_mode = result
+        return f"{int(accepted)}:{exec_mode.name if exec_mode else ''}:{fuzz_mode.name if fuzz_mode else ''}"
+
+    @staticmethod
+    def _decode_result(value: str) -> Tuple[bool, Optional[ExecMode], Optional[FuzzMode]]:
+        accepted, exec_mode, fuzz_mode = value.split(":")
+        return accepted == "1", ExecMode[exec_mode] if exec_mode else None, FuzzMode[fuzz_mode] if fuzz_mode else None
+
+    @staticmethod
+    def _accept_file_uncached(binary_file: Path) -> Tuple[bool, Optional[ExecMode], Optional[FuzzMode]]:
+        # Fast path: only scan ELF symbol string tables
+        instrumented = has_afl_instrumentation(binary_file)
+        if instrumented is None:
+            return SydrEngineDescriptor._accept_file_lief(binary_file)
+
+        if not instrumented:
+            # NOTE This can be improve. We usually use PERSISTENT mode when
+            # fuzzing a binary-only target because of performance reasons but
+            # it can also be SINGLE_EXEC. Therefore, ExecMode would not be the
+            # right place to add the BINARY_ONLY option (it was done this way
+            # to keep things simple).
+            return True, ExecMode.AUTO, FuzzMode.BINARY_ONLY
+
+        return True, ExecMode.AUTO, FuzzMode.INSTRUMENTED
+
+    @staticmethod
+    def _accept_file_lief(binary_file: Path) -> Tuple[bool, Optional[ExecMode], Optional[FuzzMode]]:
+        # Slow path: full parsing, for files not handled by the ELF scanner
+        import lief
+
         p = lief.parse(str(binary_file))
         if not p:
             return False, None, None
@@ -77,11 +92,6 @@ class SydrEngineDescriptor(FuzzingEngineDescriptor):
                 break
 
         if not instrumented:
-            # NOTE This can be improve. We usually use PERSISTENT mode when
-            # fuzzing a binary-only target because of performance reasons but
-            # it can also be SINGLE_EXEC. Therefore, ExecMode would not be the
-            # right place to add the BINARY_ONLY option (it was done this way
-            # to keep things simple).
             return True, ExecMode.AUTO, FuzzMode.BINARY_ONLY
 
         return True, ExecMode.AUTO, FuzzMode.INSTRUMENTED
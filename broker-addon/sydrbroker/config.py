@@ -0,0 +1,165 @@
+# built-in imports
+import json
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+# third-party import
+from libpastis import EngineConfiguration
+from libpastis.types import CoverageMode
+
+
+class SydrOptions(NamedTuple):
+    solving_timeout: Optional[int] = None  # -s (sec)
+    memory_limit: Optional[int] = None     # -m (MiB)
+    wait_jobs: Optional[int] = None        # --wait-jobs (sec)
+    jobs: Optional[int] = None             # Concurrent Sydr jobs
+    timeout: Optional[int] = None          # Timeout of a Sydr run (sec)
+    optimistic: Optional[bool] = None      # Optimistic solving (False adds --no-optimistic)
+    strategy: Optional[str] = None         # Path predicate strategy (--strategy)
+    extra_args: Tuple[str, ...] = ()       # Appended to the Sydr arguments
+
+
+class AFLOptions(NamedTuple):
+    power_schedule: Optional[str] = None   # -p
+    timeout: Optional[str] = None          # -t (ms, "+" to skip timeouting seeds)
+    cmplog_level: Optional[str] = None     # -l, used with the cmplog binary of the package
+    dictionary: Optional[str] = None       # -x (path on the agent host)
+    jobs: Optional[int] = None             # AFL++ instances
+    extra_args: Tuple[str, ...] = ()       # Appended to the AFL++ arguments
+
+
+class SchedulingOptions(NamedTuple):
+    sleep_time: Optional[int] = None       # sydr-fuzz sleep-time (sec)
+    cmin: Optional[bool] = None            # Minimize the initial corpus
+
+
+class SydrConfigurationInterface(EngineConfiguration):
+    """
+    Sydr, AFL++ and sydr-fuzz options pushed by the broker to agents.
+    Unset options (None) are left to the agent. Serialized as JSON:
+
+        {"sydr": {"solving_timeout": 30}, "aflplusplus": {"power_schedule": "explore"}, "sydr-fuzz": {"sleep_time": 5}}
+
+    An empty configuration sets no option. Free-form extra arguments (legacy
+    format) are not accepted, AFL++ and Sydr arguments go in extra_args.
+    """
+
+    SECTIONS = {"sydr": SydrOptions, "aflplusplus": AFLOptions, "sydr-fuzz": SchedulingOptions}
+    POWER_SCHEDULES = ["explore", "mmopt", "exploit", "fast", "coe", "lin", "quad", "rare", "seek"]
+    AFL_TIMEOUT = re.compile(r'^\d+\+?$')
+    CMPLOG_LEVEL = re.compile(r'^[123][AXT]*$')
+    STRATEGY = re.compile(r'^[\w-]+$')
+
+    def __init__(self, sydr: Optional[SydrOptions] = None, afl: Optional[AFLOptions] = None,
+                 scheduling: Optional[SchedulingOptions] = None):
+        self.sydr = SydrOptions() if sydr is None else sydr
+        self.afl = AFLOptions() if afl is None else afl
+        self.scheduling = SchedulingOptions() if scheduling is None else scheduling
+
+    @staticmethod
+    def new() -> 'SydrConfigurationInterface':
+        return SydrConfigurationInterface()
+
+    @staticmethod
+    def from_file(filepath: Path) -> 'SydrConfigurationInterface':
+        with open(filepath, "r") as f:
+            return SydrConfigurationInterface.from_str(f.read())
+
+    @staticmethod
+    def from_str(s: str) -> 'SydrConfigurationInterface':
+        """
+        :raise ValueError: if the configuration is malformed or invalid
+        """
+        s = s.strip()
+        if not s:
+            return SydrConfigurationInterface()
+        if not s.startswith("{"):
+            raise ValueError("not a JSON object")
+        data = json.loads(s)
+        unknown = set(data) - set(SydrConfigurationInterface.SECTIONS)
+        if unknown:
+            raise ValueError(f"unknown section(s): {', '.join(sorted(unknown))}")
+        sections = []
+        for name, cls in SydrConfigurationInterface.SECTIONS.items():
+            values = data.get(name, {})
+            if not isinstance(values, dict):
+                raise ValueError(f"section {name} is not an object")
+            unknown = set(values) - set(cls._fields)
+            if unknown:
+                raise ValueError(f"unknown option(s) in {name}: {', '.join(sorted(unknown))}")
+            if "extra_args" in values:
+                if not isinstance(values["extra_args"], list):
+                    raise ValueError(f"{name}.extra_args must be a list of strings")
+                values = dict(values, extra_args=tuple(values["extra_args"]))
+            sections.append(cls(**values))
+        config = SydrConfigurationInterface(*sections)
+        config.validate()
+        return config
+
+    def to_str(self) -> str:
+        data = {}
+        for name, options in zip(self.SECTIONS, (self.sydr, self.afl, self.scheduling)):
+            values = {k: list(v) if isinstance(v, tuple) else v for k, v in options._asdict().items()
+                      if v is not None and v != ()}
+            if values:
+                data[name] = values
+        return json.dumps(data)
+
+    def errors(self) -> List[str]:
+        """ Invalid options, as messages """
+        errors = []
+
+        def check_int(section: str, options: NamedTuple, *names: str, minimum: int = 1):
+            for name in names:
+                value = getattr(options, name)
+                if value is not None and (type(value) is not int or value < minimum):
+                    errors.append(f"{section}.{name} must be an integer >= {minimum} (got {value!r})")
+
+        def check_bool(section: str, options: NamedTuple, *names: str):
+            for name in names:
+                value = getattr(options, name)
+                if value is not None and not isinstance(value, bool):
+                    errors.append(f"{section}.{name} must be a boolean (got {value!r})")
+
+        def check_str(section: str, name: str, value, pattern: re.Pattern = None, choices: List[str] = None):
+            if value is None:
+                return
+            if not isinstance(value, str) or (pattern and not pattern.match(value)) or (choices and value not in choices):
+                expected = f"one of {', '.join(choices)}" if choices else f"a string matching {pattern.pattern}" if pattern else "a string"
+                errors.append(f"{section}.{name} must be {expected} (got {value!r})")
+
+        def check_args(section: str, options: NamedTuple):
+            if not all(isinstance(arg, str) for arg in options.extra_args):
+                errors.append(f"{section}.extra_args must be a list of strings")
+
+        check_int("sydr", self.sydr, "solving_timeout", "memory_limit", "wait_jobs", "jobs", "timeout")
+        check_bool("sydr", self.sydr, "optimistic")
+        check_str("sydr", "strategy", self.sydr.strategy, pattern=self.STRATEGY)
+        check_args("sydr", self.sydr)
+        check_int("aflplusplus", self.afl, "jobs")
+        check_str("aflplusplus", "power_schedule", self.afl.power_schedule, choices=self.POWER_SCHEDULES)
+        check_str("aflplusplus", "timeout", self.afl.timeout, pattern=self.AFL_TIMEOUT)
+        check_str("aflplusplus", "cmplog_level", self.afl.cmplog_level, pattern=self.CMPLOG_LEVEL)
+        check_str("aflplusplus", "dictionary", self.afl.dictionary)
+        check_args("aflplusplus", self.afl)
+        check_int("sydr-fuzz", self.scheduling, "sleep_time")
+        check_bool("sydr-fuzz", self.scheduling, "cmin")
+        return errors
+
+    def validate(self) -> None:
+        """
+        :raise ValueError: listing invalid options
+        """
+        errors = self.errors()
+        if errors:
+            raise ValueError("; ".join(errors))
+
+    def get_coverage_mode(self) -> CoverageMode:
+        """ Current coverage mode selected in the file """
+        return CoverageMode.AUTO
+
+    def set_target(self, target: int) -> None:
+        # Note: Giving a target to Sydr does not
+        # do anything as Sydr-Fuzz is not directed.
+        pass
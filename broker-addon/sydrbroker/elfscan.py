@@ -0,0 +1,205 @@
+# built-in imports
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+
+ELF_MAGIC = b"\x7fELF"
+SHT_PROGBITS = 1
+SHT_SYMTAB = 2
+SHT_DYNSYM = 11
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+EM_386 = 3
+EM_X86_64 = 62
+
+AFL_MARKER = b"__afl_"
+
+
+class Section(NamedTuple):
+    name: str
+    type: int
+    flags: int
+    addr: int
+    offset: int    # In the file
+    size: int
+    link: int
+
+
+def elf_machine(mm: mmap.mmap) -> Optional[int]:
+    """ Return the e_machine of an ELF file (eg: EM_X86_64), None if it is not an ELF """
+    if len(mm) < 0x40 or mm[:4] != ELF_MAGIC:
+        return None
+    machine, = struct.unpack_from("<H" if mm[5] == 1 else ">H", mm, 0x12)
+    return machine
+
+
+def elf_sections(mm: mmap.mmap) -> Optional[List[Section]]:
+    """
+    Return the sections of an ELF file, reading only its headers.
+    Return None if the file is not an ELF or has no section headers.
+    """
+    if len(mm) < 0x40 or mm[:4] != ELF_MAGIC:
+        return None
+    is64 = mm[4] == 2
+    endian = "<" if mm[5] == 1 else ">"
+    if is64:
+        shoff, = struct.unpack_from(endian + "Q", mm, 0x28)
+        shentsize, shnum, shstrndx = struct.unpack_from(endian + "HHH", mm, 0x3A)
+        shdr = struct.Struct(endian + "IIQQQQIIQQ")  # name, type, flags, addr, offset, size, link, ...
+    else:
+        shoff, = struct.unpack_from(endian + "I", mm, 0x20)
+        shentsize, shnum, shstrndx = struct.unpack_from(endian + "HHH", mm, 0x2E)
+        shdr = struct.Struct(endian + "IIIIIIIIII")
+    if shoff == 0 or shnum == 0 or shoff + shnum * shentsize > len(mm):
+        return None
+
+    headers = [shdr.unpack_from(mm, shoff + i * shentsize) for i in range(shnum)]
+    names_off = headers[shstrndx][4] if shstrndx < shnum else None
+    sections = []
+    for h in headers:
+        name = ""
+        if names_off is not None and names_off + h[0] < len(mm):
+            end = mm.find(b"\0", names_off + h[0])
+            name = mm[names_off + h[0]:end if end != -1 else names_off + h[0]].decode(errors="replace")
+        sections.append(Section(name, h[1], h[2], h[3], h[4], h[5], h[6]))
+    return sections
+
+
+def _string_tables(mm: mmap.mmap) -> Optional[Iterable[Tuple[int, int]]]:
+    """
+    Return the (offset, size) of the string tables linked to the symbol
+    tables (.symtab and .dynsym) of an ELF file, reading only its headers.
+    Return None if the file is not an ELF or has no section headers.
+    """
+    sections = elf_sections(mm)
+    if sections is None:
+        return None
+    tables = []
+    for s in sections:
+        if s.type in (SHT_SYMTAB, SHT_DYNSYM) and s.link < len(sections):
+            strtab = sections[s.link]
+            if strtab.offset + strtab.size <= len(mm):
+                tables.append((strtab.offset, strtab.size))
+    # .dynsym is usually smaller and enough for AFL++ runtime symbols, scan it first
+    return sorted(set(tables), key=lambda x: x[1])
+
+
+def has_afl_instrumentation(binary_file: Union[str, Path]) -> Optional[bool]:
+    """
+    Check whether an ELF file contains AFL++ instrumentation symbols by
+    scanning the string tables of its symbol tables through mmap and stopping
+    at the first hit.
+
+    :return: True or False, None if the file cannot be handled (not an ELF, no sections, unreadable)
+    """
+    try:
+        with open(binary_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                tables = _string_tables(mm)
+                if tables is None:
+                    return None
+                return any(mm.find(AFL_MARKER, off, off + size) != -1 for off, size in tables)
+    except OSError:
+        return None
+
+
+def file_digest(binary_file: Union[str, Path]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(binary_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h.update(mm)
+    return h.hexdigest()
+
+
+class ContentCache:
+    """
+    Cache of results keyed by file content hash. The content hash itself is
+    memoized on (device, inode, size, mtime) so that unchanged files are not
+    re-hashed. Results can be persisted in a directory (one small file per
+    entry, written atomically) to be shared across brokers.
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None):
+        self.directory = Path(directory) if directory else None
+        self._results: Dict[str, str] = {}
+        self._digests: Dict[Tuple[int, int, int, int], str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, path: Union[str, Path]) -> Optional[str]:
+        """ Content hash of a file, None if it cannot be read """
+        try:
+            st = os.stat(path)
+            key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+            with self._lock:
+                digest = self._digests.get(key)
+            if digest is None:
+                digest = file_digest(path)
+                with self._lock:
+                    self._digests[key] = digest
+        except OSError:
+            return None
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        with self._lock:
+            value = self._results.get(digest)
+        if value is None and self.directory is not None:
+            try:
+                value = (self.directory / digest).read_text()
+            except OSError:
+                value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._results[digest] = value
+        return value
+
+    def put(self, digest: str, value: str) -> None:
+        with self._lock:
+            self._results[digest] = value
+        if self.directory is not None:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                tmp = self.directory / f".{digest}.{os.getpid()}.{threading.get_ident()}"
+                tmp.write_text(value)
+                os.replace(tmp, self.directory / digest)
+            except OSError:
+                pass  # The cache is only an optimization
+
+    def cached(self, path: Union[str, Path], compute: Callable[[Path], T], encode: Callable[[T], str], decode: Callable[[str], T]) -> T:
+        digest = self.digest(path)
+        if digest is None:
+            return compute(Path(path))  # Not cached, compute reports the error (if any)
+        value = self.get(digest)
+        if value is not None:
+            return decode(value)
+        result = compute(Path(path))
+        self.put(digest, encode(result))
+        return result
+
+
+def classify_directory(directory: Union[str, Path], classify: Callable[[Path], T], workers: Optional[int] = None, recursive: bool = False) -> Dict[Path, T]:
+    """
+    Apply ``classify`` on every file of ``directory`` using a thread pool
+    (hashing and mmap scans release the GIL).
+    """
+    directory = Path(directory)
+    files = [p for p in (directory.rglob("*") if recursive else directory.iterdir()) if p.is_file() and not p.is_symlink()]
+    with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as pool:
+        return dict(zip(files, pool.map(classify, files)))
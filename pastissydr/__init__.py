@@ -1,6 +1,23 @@
-from .driver import SydrDriver
-from .sydr import SydrProcess
-from .workspace import Workspace
+from .lazy import lazy_import
+from .options import DriverOptions
+
+# libpastis imports lief (slow to load) but only uses it to inspect archive packages
+lazy_import("lief")
 
 __version__ = "0.1"
 
+__all__ = ["DriverOptions", "SydrDriver", "SydrProcess", "Workspace"]
+
+
+def __getattr__(name: str):
+    # Imported on first use, "import pastissydr" alone stays cheap
+    if name == "SydrDriver":
+        from .driver import SydrDriver
+        return SydrDriver
+    if name == "SydrProcess":
+        from .sydr import SydrProcess
+        return SydrProcess
+    if name == "Workspace":
+        from .workspace import Workspace
+        return Workspace
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
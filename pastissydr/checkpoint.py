@@ -0,0 +1,188 @@
+# builtin imports
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class Checkpointer:
+    """
+    Periodically copy the corpus (every worker queue, the remote queue) and
+    the crashes of a RAM-backed workspace to persistent storage. Copies are
+    incremental (only new entries) and atomic (written to a temporary name
+    then renamed). The state AFL++ needs to resume in place (fuzzer_stats
+    and sync cursors of every worker) is copied again at every checkpoint.
+
+    When a RAM budget is set and exceeded, the spill policy applies:
+    - "warn": only log a warning
+    - "spill": replace checkpointed files (crashes first, then the largest
+      queue entries) by symlinks to their persistent copy
+    """
+
+    SPILL_POLICIES = ["warn", "spill"]
+    STATE_FILES = ["fuzzer_stats", "cmdline"]
+    SYNC_DIR = ".synced"
+
+    def __init__(self, workspace, interval: float = 300, ram_budget: Optional[int] = None, spill_policy: str = "spill"):
+        """
+        :param workspace: Workspace to checkpoint
+        :param interval: checkpoint interval (sec)
+        :param ram_budget: maximum size (bytes) of the RAM workspace, None for no limit
+        :param spill_policy: what to do when the budget is exceeded
+        """
+        if spill_policy not in self.SPILL_POLICIES:
+            raise ValueError(f"Invalid spill policy {spill_policy} (expected one of {self.SPILL_POLICIES})")
+        self.workspace = workspace
+        self.interval = interval
+        self.ram_budget = ram_budget
+        self.spill_policy = spill_policy
+
+        self._saved: Dict[Path, Set[str]] = {}   # source directory -> names already checkpointed
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Counters
+        self.checkpoints = 0
+        self.files_saved = 0
+        self.bytes_saved = 0
+        self.files_spilled = 0
+        self.ram_usage = 0
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="Checkpointer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Stop the periodic checkpoint and do a last one """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.checkpoint()
+        logger.info(f"Checkpoint stats: {self.stats()}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"checkpoints": self.checkpoints, "files": self.files_saved, "bytes": self.bytes_saved,
+                "spilled": self.files_spilled, "ram_usage": self.ram_usage}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+                if self.ram_budget is not None:
+                    self.enforce_budget()
+            except OSError as e:
+                logger.error(f"Checkpoint failed: {e}")
+
+    def sources(self) -> List[Path]:
+        return [w / 'queue' for w in self.workspace.worker_dirs()] + [self.workspace.dynamic_input_dir,
+                                                                      self.workspace.crash_dir]
+
+    def state_files(self) -> List[Path]:
+        """ Files AFL++ rewrites and needs to resume in place (AFL_AUTORESUME) """
+        files = []
+        for worker in self.workspace.worker_dirs():
+            files += [worker / name for name in self.STATE_FILES]
+            try:
+                files += [Path(e.path) for e in os.scandir(worker / self.SYNC_DIR) if e.is_file(follow_symlinks=False)]
+            except FileNotFoundError:
+                pass
+        return files
+
+    def destination(self, path: Path) -> Path:
+        return self.workspace.checkpoint_dir / path.relative_to(self.workspace.root_dir)
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            for src in self.sources():
+                saved = self._saved.setdefault(src, set())
+                dst = self.destination(src)
+                try:
+                    entries = [e for e in os.scandir(src) if e.name not in saved and e.is_file(follow_symlinks=False)]
+                except FileNotFoundError:
+                    continue
+                if not entries:
+                    continue
+                dst.mkdir(parents=True, exist_ok=True)
+                for entry in entries:
+                    if (dst / entry.name).exists():  # Restored from a previous checkpoint
+                        saved.add(entry.name)
+                        continue
+                    tmp = dst / f".{entry.name}.tmp"
+                    try:
+                        shutil.copyfile(entry.path, tmp)
+                        os.replace(tmp, dst / entry.name)
+                    except FileNotFoundError:
+                        continue  # Removed meanwhile (eg: AFL++ .cur_input)
+                    saved.add(entry.name)
+                    self.files_saved += 1
+                    self.bytes_saved += entry.stat().st_size
+            for src in self.state_files():
+                dst = self.destination(src)
+                tmp = dst.with_name(f".{dst.name}.tmp")
+                try:
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(src, tmp)
+                    os.replace(tmp, dst)
+                except FileNotFoundError:
+                    continue  # Not written yet
+            self.checkpoints += 1
+
+    def usage(self) -> int:
+        """ Size of the files held in RAM by the workspace """
+        total = 0
+        stack = [self.workspace.root_dir]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def enforce_budget(self) -> None:
+        self.ram_usage = self.usage()
+        if self.ram_usage <= self.ram_budget:
+            return
+        excess = self.ram_usage - self.ram_budget
+        logger.warning(f"RAM workspace uses {self.ram_usage >> 20} MiB (budget: {self.ram_budget >> 20} MiB)")
+        if self.spill_policy != "spill":
+            return
+
+        # Crashes are never read again, then the largest queue entries
+        candidates: List[Tuple[int, int, Path]] = []
+        with self._lock:
+            for src, saved in self._saved.items():
+                priority = 0 if src == self.workspace.crash_dir else 1
+                for name in saved:
+                    path = src / name
+                    try:
+                        if not path.is_symlink():
+                            candidates.append((priority, -path.stat().st_size, path))
+                    except FileNotFoundError:
+                        continue
+        candidates.sort()
+
+        for _, neg_size, path in candidates:
+            if excess <= 0:
+                break
+            tmp = path.with_name(f".{path.name}.spill")
+            try:
+                os.symlink(self.destination(path), tmp)
+                os.replace(tmp, path)   # Atomically swap the file for the link
+            except OSError as e:
+                logger.warning(f"Cannot spill {path.name}: {e}")
+                continue
+            excess += neg_size
+            self.files_spilled += 1
+        logger.info(f"Spilled {self.files_spilled} files to persistent storage so far")
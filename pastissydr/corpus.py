@@ -0,0 +1,170 @@
+# builtin imports
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Union
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class CorpusImporter:
+    """
+    Bulk import of seed files into a directory: directories are walked
+    recursively, files are deduplicated by content and linked into the
+    destination (hardlink, then reflink, falling back to a copy) by a pool of
+    threads. Destination files are named after their digest.
+    """
+
+    LINK_MODES = ["auto", "hardlink", "reflink", "copy"]
+    FICLONE = 0x40049409  # ioctl(dst, FICLONE, src)
+    PROGRESS_INTERVAL = 5  # sec
+
+    def __init__(self, dest: Path, digest: Callable[[Path], bytes], workers: int = 8,
+                 max_size: Optional[int] = None, max_count: Optional[int] = None, link: str = "auto"):
+        """
+        :param dest: destination directory
+        :param digest: function returning the digest of a file
+        :param workers: number of threads
+        :param max_size: files larger than this size (bytes) are skipped
+        :param max_count: maximum number of files imported
+        :param link: how files are materialized in ``dest``
+        """
+        if link not in self.LINK_MODES:
+            raise ValueError(f"Invalid link mode {link} (expected one of {self.LINK_MODES})")
+        self.dest = Path(dest)
+        self._digest = digest
+        self.workers = workers
+        self.max_size = max_size
+        self.max_count = max_count
+        self.link = link
+
+        self._seen: Set[bytes] = set()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers * 4)  # Bound the number of pending files
+        self._start = 0.0
+        self._last_progress = 0.0
+
+        # Counters
+        self.scanned = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.errors = 0
+        self.bytes = 0
+        self.methods: Dict[str, int] = {"hardlink": 0, "reflink": 0, "copy": 0}
+
+    @staticmethod
+    def walk(paths: Iterable[Union[str, Path]]) -> Iterator[Path]:
+        for path in paths:
+            path = Path(path)
+            if path.is_file():
+                yield path
+            elif path.is_dir():
+                for root, _, files in os.walk(path):
+                    for name in files:
+                        yield Path(root) / name
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        elapsed = max(time.monotonic() - self._start, 1e-6)
+        return {"scanned": self.scanned, "imported": self.imported, "duplicates": self.duplicates,
+                "skipped": self.skipped, "errors": self.errors, "bytes": self.bytes,
+                "files/s": round(self.scanned / elapsed, 1), "MiB/s": round(self.bytes / elapsed / (1 << 20), 2),
+                **self.methods}
+
+    def run(self, paths: Iterable[Union[str, Path]]) -> Dict[str, Union[int, float]]:
+        self.dest.mkdir(parents=True, exist_ok=True)
+        self._start = self._last_progress = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="CorpusImport") as pool:
+            for file in self.walk(paths):
+                if self._full():
+                    break
+                self._slots.acquire()
+                future = pool.submit(self._import, file)
+                future.add_done_callback(lambda _: self._slots.release())
+        logger.info(f"Corpus import done: {self.stats()}")
+        return self.stats()
+
+    def _full(self) -> bool:
+        return self.max_count is not None and self.imported >= self.max_count
+
+    def _import(self, file: Path) -> None:
+        try:
+            size = file.stat().st_size
+            with self._lock:
+                self.scanned += 1
+            if self.max_size is not None and size > self.max_size:
+                with self._lock:
+                    self.skipped += 1
+                return
+            digest = self._digest(file)
+            with self._lock:
+                if digest in self._seen:
+                    self.duplicates += 1
+                    return
+                if self._full():
+                    self.skipped += 1
+                    return
+                self._seen.add(digest)
+                self.imported += 1
+                self.bytes += size
+            try:
+                method = self._materialize(file, self.dest / digest.hex())
+            except OSError:
+                with self._lock:
+                    self._seen.discard(digest)
+                    self.imported -= 1
+                    self.bytes -= size
+                raise
+            with self._lock:
+                self.methods[method] += 1
+        except OSError as e:
+            logger.warning(f"Cannot import {file}: {e}")
+            with self._lock:
+                self.errors += 1
+        finally:
+            self._progress()
+
+    def _materialize(self, src: Path, dst: Path) -> str:
+        if self.link in ["auto", "hardlink"]:
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except FileExistsError:
+                return "hardlink"
+            except OSError as e:
+                if self.link == "hardlink" or e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EACCES):
+                    raise
+        if self.link in ["auto", "reflink"]:
+            try:
+                self._reflink(src, dst)
+                return "reflink"
+            except OSError:
+                if self.link == "reflink":
+                    raise
+        shutil.copyfile(src, dst)
+        return "copy"
+
+    def _reflink(self, src: Path, dst: Path) -> None:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), self.FICLONE, fsrc.fileno())
+            except OSError:
+                fdst.close()
+                os.unlink(dst)
+                raise
+
+    def _progress(self) -> None:
+        now = time.monotonic()
+        if now - self._last_progress < self.PROGRESS_INTERVAL:
+            return
+        with self._lock:
+            if now - self._last_progress < self.PROGRESS_INTERVAL:
+                return
+            self._last_progress = now
+        logger.info(f"Corpus import in progress: {self.stats()}")
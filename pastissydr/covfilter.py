@@ -0,0 +1,227 @@
+# builtin imports
+import logging
+import os
+import queue
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# third-party imports
+from libpastis.types import SeedType
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class CoverageFilter:
+    """
+    Inbound seed filter: seeds received from the broker are batched and run
+    through ``afl-showmap`` on the fuzz target. Only seeds reaching at least
+    one edge not seen so far are forwarded to AFL++. Without afl-showmap (or
+    before the target is known) seeds are forwarded as is. Edges covered by
+    the AFL++ queue are learned from its new entries every ``prime_interval``
+    sec.
+    """
+
+    SHOWMAP_BINARY = "afl-showmap"
+
+    def __init__(self, forward: Callable[[bytes, bytes, SeedType], None], work_dir: Path, batch_size: int = 64, batch_latency: float = 2.0,
+                 prime_interval: float = 60):
+        """
+        :param forward: callback called with (seed, digest, type) for every accepted seed
+        :param work_dir: directory used to write batches and coverage maps
+        :param batch_size: maximum number of seeds per afl-showmap run
+        :param batch_latency: maximum time (sec) a seed waits for its batch
+        :param prime_interval: time (sec) between two updates of the edges covered by the AFL++ queue
+        """
+        self._forward = forward
+        self.work_dir = Path(work_dir)
+        self.batch_size = batch_size
+        self.batch_latency = batch_latency
+        self.prime_interval = prime_interval
+
+        self._showmap = self.find_showmap()
+        self._command: Optional[List[str]] = None
+        self._stdin = False
+        self._edges: Set[int] = set()
+        self._corpus_dir: Optional[Path] = None
+        self._primed: Set[str] = set()  # Queue entries whose edges are known
+        self._next_prime = 0.0
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters
+        self.received = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = 0
+        self.primes = 0
+
+    @staticmethod
+    def find_showmap() -> Optional[str]:
+        afl_path = os.environ.get("AFL_PATH")
+        if afl_path and os.path.isfile(os.path.join(afl_path, CoverageFilter.SHOWMAP_BINARY)):
+            return os.path.join(afl_path, CoverageFilter.SHOWMAP_BINARY)
+        return shutil.which(CoverageFilter.SHOWMAP_BINARY)
+
+    @property
+    def enabled(self) -> bool:
+        return self._showmap is not None and self._command is not None
+
+    def configure(self, fuzz_cmd: str, stdin: bool, qemu: bool, timeout: int = 1000, corpus_dir: Optional[Path] = None) -> None:
+        """
+        Set the target used to compute coverage maps.
+
+        :param fuzz_cmd: fuzz target command line (with @@ for file inputs)
+        :param stdin: whether the target reads its input on stdin
+        :param qemu: whether the target is run in AFL++ QEMU mode
+        :param timeout: execution timeout (ms)
+        :param corpus_dir: AFL++ queue, whose coverage is already known by AFL++
+        """
+        if self._showmap is None:
+            logger.warning(f"{self.SHOWMAP_BINARY} not found, inbound seeds are not filtered on coverage")
+            return
+        options = ["-q", "-e", "-m", "none", "-t", str(timeout)] + (["-Q"] if qemu else [])
+        self._command = [self._showmap] + options
+        self._target = shlex.split(fuzz_cmd)
+        self._stdin = stdin
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self._corpus_dir = corpus_dir
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="CoverageFilter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        logger.info(f"Inbound filter stats: {self.stats()}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"received": self.received, "accepted": self.accepted, "rejected": self.rejected,
+                "errors": self.errors, "edges": len(self._edges), "primed": len(self._primed), "primes": self.primes,
+                "pending": self._queue.qsize()}
+
+    def submit(self, seed: bytes, digest: bytes, typ: SeedType = SeedType.INPUT) -> None:
+        self.received += 1
+        if not self.enabled or self._thread is None:
+            self.accepted += 1
+            self._forward(seed, digest, typ)
+        else:
+            self._queue.put((seed, digest, typ))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if self._corpus_dir is not None and time.monotonic() >= self._next_prime:
+                self._prime(self._corpus_dir)
+                self._next_prime = time.monotonic() + self.prime_interval
+            if batch:
+                self._filter(batch)
+
+    def _next_batch(self) -> List[Tuple[bytes, bytes, SeedType]]:
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = 0.1 if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is None:
+                    return batch
+                continue
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.batch_latency
+        return batch
+
+    def _showmap_cmd(self, *args: str) -> List[str]:
+        return self._command + list(args) + ["--"] + self._target
+
+    def _prime(self, corpus_dir: Path) -> None:
+        """ Learn the edges covered by the entries added to the given queue since the previous call """
+        try:
+            new = [e for e in os.scandir(corpus_dir) if e.name not in self._primed and e.is_file()]
+        except OSError:
+            return  # Not created by AFL++ yet
+        if not new:
+            return
+        in_dir, union = self.work_dir / "prime", self.work_dir / "corpus.map"
+        shutil.rmtree(in_dir, ignore_errors=True)
+        in_dir.mkdir(parents=True)
+        for entry in new:
+            try:
+                os.link(entry.path, in_dir / entry.name)
+            except OSError:
+                try:
+                    shutil.copyfile(entry.path, in_dir / entry.name)
+                except OSError:
+                    continue  # Removed meanwhile
+        try:
+            union.unlink(missing_ok=True)
+            subprocess.run(self._showmap_cmd("-C", "-i", str(in_dir), "-o", str(union)),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60 + len(new) * 10)
+            self._edges |= self._read_map(union)
+        except (OSError, subprocess.SubprocessError) as e:
+            self.errors += 1
+            logger.warning(f"Cannot compute corpus coverage: {e}")
+            return
+        self._primed.update(e.name for e in new)
+        self.primes += 1
+        logger.debug(f"Inbound filter primed with {len(new)} queue entries, {len(self._edges)} edges")
+
+    @staticmethod
+    def _read_map(path: Path) -> Set[int]:
+        edges = set()
+        with open(path) as f:
+            for line in f:
+                edge, _, _ = line.partition(":")
+                if edge.strip().isdigit():
+                    edges.add(int(edge))
+        return edges
+
+    def _filter(self, batch: List[Tuple[bytes, bytes, SeedType]]) -> None:
+        in_dir, out_dir = self.work_dir / "batch", self.work_dir / "maps"
+        for d in (in_dir, out_dir):
+            shutil.rmtree(d, ignore_errors=True)
+            d.mkdir(parents=True)
+        for seed, digest, _ in batch:
+            (in_dir / digest.hex()).write_bytes(seed)
+
+        try:
+            # afl-showmap substitutes @@ itself, in stdin mode it feeds the input on stdin
+            subprocess.run(self._showmap_cmd("-i", str(in_dir), "-o", str(out_dir)),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           timeout=60 + len(batch) * 10)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"afl-showmap failed ({e}), forward the batch unfiltered")
+            self.errors += 1
+            for seed, digest, typ in batch:
+                self.accepted += 1
+                self._forward(seed, digest, typ)
+            return
+
+        # Smaller seeds first, they are the cheapest ones to claim new edges
+        for seed, digest, typ in sorted(batch, key=lambda x: len(x[0])):
+            map_file = out_dir / digest.hex()
+            if not map_file.exists():
+                # No map (crash or timeout), let AFL++ decide
+                new = True
+            else:
+                edges = self._read_map(map_file)
+                new = not edges.issubset(self._edges)
+                self._edges |= edges
+            if new:
+                self.accepted += 1
+                self._forward(seed, digest, typ)
+            else:
+                self.rejected += 1
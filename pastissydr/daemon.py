@@ -0,0 +1,197 @@
+# builtin imports
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+# third-party imports
+import toml
+from libpastis import ClientAgent
+
+# Local imports
+from .driver import SydrDriver
+from .options import DriverOptions
+from .pipeline import SeedWorkerPool
+from .resources import HostResources, MiB
+from .sydr import SydrProcess
+from .watcher import create_observer
+from .workspace import Workspace
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class CampaignSpec(NamedTuple):
+    name: str                         # Workspace directory name
+    host: str = "localhost"           # Broker
+    port: int = 5555
+    cpus: Optional[List[int]] = None  # CPUs sydr-fuzz is pinned to (None: 1 AFL++ instance and 1 Sydr job, not pinned)
+    memory: Optional[int] = None      # Memory quota (bytes), None for an even share of what is left
+    options: Dict = {}                # DriverOptions fields
+
+    @staticmethod
+    def parse(data: Dict) -> "CampaignSpec":
+        """
+        :raise ValueError: if the campaign description is invalid
+        """
+        unknown = set(data) - set(CampaignSpec._fields)
+        if unknown:
+            raise ValueError(f"unknown campaign key(s): {', '.join(sorted(unknown))}")
+        if not isinstance(data.get("name"), str) or not data["name"] or "/" in data["name"]:
+            raise ValueError(f"invalid campaign name {data.get('name')!r}")
+        cpus = data.get("cpus")
+        if cpus is not None:
+            try:
+                cpus = SydrProcess.parse_cpu_list(str(cpus))
+            except ValueError:
+                raise ValueError(f"{data['name']}: invalid CPU list {cpus!r}")
+        memory = data.get("memory")
+        if memory is not None:
+            if type(memory) is not int or memory <= 0:
+                raise ValueError(f"{data['name']}: memory must be a positive number of MiB (got {memory!r})")
+            memory *= MiB
+        options = data.get("options", {})
+        SydrDaemon.check_options(options)
+        return CampaignSpec(data["name"], data.get("host", "localhost"), int(data.get("port", 5555)), cpus, memory,
+                            options)
+
+
+class SydrDaemon:
+    """
+    Run several campaigns (one SydrDriver each) in a single process. The
+    drivers share the workspace watcher and the threads preparing outbound
+    seeds, and get their own CPUs and memory quota. Every campaign keeps its
+    own broker connection (a libpastis client runs a single campaign).
+    """
+
+    # Set by the daemon, not by campaign options
+    RESERVED_OPTIONS = ["cpus", "cores"]
+
+    def __init__(self, campaigns: List[CampaignSpec], workspace: Optional[Path] = None, watcher: str = "auto",
+                 seed_workers: int = 4, defaults: Optional[Dict] = None):
+        """
+        :param campaigns: campaigns to run
+        :param workspace: directory holding the campaign workspaces (default: SYDR_WS)
+        :param watcher: watcher backend (see watcher.create_observer)
+        :param seed_workers: number of threads preparing outbound seeds, for all campaigns
+        :param defaults: DriverOptions fields common to all campaigns
+        """
+        names = [c.name for c in campaigns]
+        if len(set(names)) != len(names):
+            raise ValueError("campaign names must be unique")
+        if workspace is None:
+            workspace = os.environ.get(Workspace.SYDR_WS_ENV_VAR, Path(tempfile.gettempdir()) / Workspace.DEFAULT_WS_PATH)
+        self.campaigns = campaigns
+        self.workspace = Path(workspace)
+        self.defaults = defaults if defaults is not None else {}
+        self.check_options(self.defaults)
+
+        self.observer = create_observer(watcher)
+        self.seed_pool = SeedWorkerPool(seed_workers)
+        self.drivers: Dict[str, SydrDriver] = {}
+        self._stopping = threading.Event()
+
+    @staticmethod
+    def load(path: Path) -> "SydrDaemon":
+        """
+        Read the daemon configuration (toml):
+
+            workspace = "/data/sydr"          # optional, SYDR_WS by default
+            seed_workers = 4
+            [defaults]                         # SydrDriver options of all campaigns
+            adaptive_tuning = true
+            [[campaign]]
+            name = "libpng"
+            host = "broker"
+            port = 5555
+            cpus = "0-7"
+            memory = 16384                     # MiB
+            [campaign.options]                 # SydrDriver options of this campaign
+            outbound_budget = 100
+
+        :raise ValueError: if the configuration is invalid
+        """
+        try:
+            data = toml.load(path)
+        except toml.TomlDecodeError as e:
+            raise ValueError(f"invalid configuration {path}: {e}")
+        unknown = set(data) - {"workspace", "watcher", "seed_workers", "defaults", "campaign"}
+        if unknown:
+            raise ValueError(f"unknown key(s): {', '.join(sorted(unknown))}")
+        campaigns = [CampaignSpec.parse(c) for c in data.get("campaign", [])]
+        if not campaigns:
+            raise ValueError("no campaign")
+        return SydrDaemon(campaigns, data.get("workspace"), data.get("watcher", "auto"), data.get("seed_workers", 4),
+                          data.get("defaults", {}))
+
+    @staticmethod
+    def check_options(options: Dict) -> None:
+        """
+        :raise ValueError: if ``options`` are not DriverOptions fields, or are reserved
+        """
+        DriverOptions.from_dict(options, reserved=SydrDaemon.RESERVED_OPTIONS)
+
+    def quotas(self) -> Dict[str, HostResources]:
+        """ Resources of every campaign: memory not given explicitly is shared evenly """
+        host = HostResources.detect()
+        given = sum(c.memory for c in self.campaigns if c.memory is not None)
+        if given > host.memory:
+            logger.warning(f"Memory quotas ({given // MiB} MiB) exceed the available memory ({host.memory // MiB} MiB)")
+        others = sum(1 for c in self.campaigns if c.memory is None)
+        share = max(0, host.memory - given) // others if others else 0
+        pinned: Dict[int, str] = {}
+        quotas = {}
+        for c in self.campaigns:
+            for cpu in c.cpus or []:
+                if cpu in pinned:
+                    logger.warning(f"CPU {cpu} is given to both {pinned[cpu]} and {c.name}")
+                pinned[cpu] = c.name
+            quotas[c.name] = HostResources(float(len(c.cpus)) if c.cpus else host.cpus,
+                                           c.memory if c.memory is not None else share)
+        return quotas
+
+    def start(self) -> None:
+        """
+        :raise FileNotFoundError: if sydr-fuzz cannot be found
+        """
+        self.observer.start()
+        self.seed_pool.start()
+        quotas = self.quotas()
+        for c in self.campaigns:
+            options = DriverOptions.from_dict(dict(self.defaults, **c.options))
+            logger.info(f"[DAEMON] campaign {c.name}: broker {c.host}:{c.port}, "
+                        f"CPUs {c.cpus if c.cpus else 'not pinned'}, memory {quotas[c.name].memory // MiB} MiB")
+            driver = SydrDriver(ClientAgent(), options._replace(cpus=c.cpus, cores=0 if c.cpus else None),
+                                workspace_dir=self.workspace / c.name, observer=self.observer,
+                                seed_pool=self.seed_pool, resources=quotas[c.name])
+            driver.init_agent(c.host, c.port)
+            self.drivers[c.name] = driver
+
+    def run(self) -> None:
+        """ Wait for all campaigns to end, every campaign is stopped as soon as its sydr-fuzz ends """
+        threads = [threading.Thread(target=self._wait, args=(name, driver), name=f"Campaign-{name}", daemon=True)
+                   for name, driver in self.drivers.items()]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def _wait(self, name: str, driver: SydrDriver) -> None:
+        driver.run()
+        logger.info(f"[DAEMON] campaign {name} ended")
+        if not self._stopping.is_set():
+            # Stopped by its broker, or sydr-fuzz gave up: release its resources while the others go on
+            try:
+                driver.stop()
+            except Exception as e:
+                logger.error(f"[DAEMON] cannot stop campaign {name}: {e}")
+
+    def stop(self) -> None:
+        self._stopping.set()
+        for name, driver in self.drivers.items():
+            if driver.started:
+                logger.info(f"[DAEMON] stop campaign {name}")
+                driver.stop()
+        self.seed_pool.stop()
+        self.observer.stop()
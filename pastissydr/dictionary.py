@@ -0,0 +1,263 @@
+# builtin imports
+import itertools
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# third-party imports
+from sydrbroker.elfscan import ContentCache, EM_386, EM_X86_64, SHF_ALLOC, SHF_EXECINSTR, SHT_PROGBITS, \
+                               elf_machine, elf_sections
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+MAX_TOKEN = 128  # AFL++ MAX_DICT_FILE
+
+STRING_RE = re.compile(rb"[\x20-\x7e]{4,%d}" % MAX_TOKEN)
+# x86 comparisons against an immediate (imm16/imm32), and 64-bit constants loaded by movabs
+IMMEDIATE_RES = [
+    re.compile(rb"(?:[\x40-\x4f])?\x3d(.{4})", re.S),                               # cmp eax/rax, imm32
+    re.compile(rb"(?:[\x40-\x4f])?\x81[\xf8-\xff](.{4})", re.S),                    # cmp r32/r64, imm32
+    re.compile(rb"(?:[\x40-\x4f])?\x81[\x78-\x7b\x7d-\x7f].(.{4})", re.S),          # cmp [r+disp8], imm32
+    re.compile(rb"(?:[\x40-\x4f])?\x81\x7c..(.{4})", re.S),                         # cmp [sib+disp8], imm32
+    re.compile(rb"\x66(?:[\x40-\x4f])?\x81[\xf8-\xff](.{2})", re.S),                # cmp r16, imm16
+    re.compile(rb"\x66\x3d(.{2})", re.S),                                           # cmp ax, imm16
+    re.compile(rb"[\x48\x49][\xb8-\xbf](.{8})", re.S),                              # movabs r64, imm64
+]
+
+
+def escape_token(token: bytes) -> str:
+    """ Token as an AFL++ dictionary value """
+    return "".join(chr(b) if 0x20 <= b < 0x7f and b not in b'\\"' else f"\\x{b:02x}" for b in token)
+
+
+def unescape_token(value: str) -> bytes:
+    out = bytearray()
+    i = 0
+    while i < len(value):
+        if value[i] == "\\" and value[i + 1:i + 2] == "x":
+            out.append(int(value[i + 2:i + 4], 16))
+            i += 4
+        elif value[i] == "\\":
+            out += value[i + 1].encode()
+            i += 2
+        else:
+            out += value[i].encode()
+            i += 1
+    return bytes(out)
+
+
+def _interesting_immediate(token: bytes, addresses: List[Tuple[int, int]]) -> bool:
+    value = int.from_bytes(token, "little")
+    if value < 0x100 or value >= (1 << (8 * len(token))) - 0x100:
+        return False  # Small (positive or negative) values are better found by mutations
+    if any(start <= value < end for start, end in addresses):
+        return False  # Address in the binary (non-PIE code)
+    nonzero = sum(1 for b in token if b not in (0, 0xff))
+    return nonzero * 2 >= len(token) and len(set(token)) > 1
+
+
+def _immediate_score(token: bytes, count: int) -> float:
+    # Byte scanning also matches across instructions, recurring values are more likely real constants
+    score = math.log2(count)
+    if sum(1 for b in token if 0x20 <= b < 0x7f) * 4 >= len(token) * 3:
+        score += 2.0  # Magic values (eg: b"GIF8") are the ones mutations hardly find
+    return score
+
+
+def _string_score(token: bytes, count: int) -> float:
+    score = 1.0 + math.log2(count)
+    score -= 0.5 * token.count(b" ")  # Messages rather than keywords
+    if b"%" in token:
+        score -= 1.0  # Format strings
+    if len(token) > 32:
+        score -= 1.0
+    return score
+
+
+def extract_tokens(binary: Path, max_tokens: int = 256) -> List[bytes]:
+    """
+    Extract dictionary tokens from an ELF binary, best first: printable
+    strings of the read-only and data sections, and comparison immediates
+    of the code (x86 only), ranked by number of occurrences.
+
+    :return: tokens, empty if the file is not an ELF
+    """
+    with open(binary, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            sections = elf_sections(mm)
+            if sections is None:
+                return []
+            x86 = elf_machine(mm) in (EM_386, EM_X86_64)
+            addresses = [(s.addr, s.addr + s.size) for s in sections if s.flags & SHF_ALLOC and s.addr]
+            strings: Counter = Counter()
+            immediates: Counter = Counter()
+            for s in sections:
+                if s.type != SHT_PROGBITS or not s.flags & SHF_ALLOC or s.offset + s.size > len(mm):
+                    continue
+                data = mm[s.offset:s.offset + s.size]
+                if s.flags & SHF_EXECINSTR:
+                    if x86:
+                        for regex in IMMEDIATE_RES:
+                            immediates.update(m for m in regex.findall(data) if _interesting_immediate(m, addresses))
+                else:
+                    strings.update(STRING_RE.findall(data))
+
+    scored: Dict[bytes, float] = {}
+    for token, count in strings.items():
+        if token.strip():
+            scored[token] = _string_score(token, count)
+    for token, count in immediates.items():
+        scored[token] = max(scored.get(token, float("-inf")), _immediate_score(token, count))
+    return sorted(scored, key=lambda t: (-scored[t], t))[:max_tokens]
+
+
+class Dictionary:
+    """
+    AFL++ dictionary of a campaign: tokens of the broker dictionary (if any),
+    tokens extracted from the target binaries (cached by binary hash across
+    agents of the host, see ContentCache), then tokens learned from Sydr
+    inputs: printable runs found in at least ``min_hits`` of them.
+
+    The dictionary is written at a fixed path, AFL++ instances read it when
+    they start, thus learned tokens are taken into account by the next
+    restart of sydr-fuzz.
+    """
+
+    CACHE_ENV_VAR = "SYDR_DICT_CACHE"
+    DEFAULT_CACHE_PATH = "sydr_dict_cache"
+    LEARNED_PREFIX = "sydr_"
+    MAX_EXTRACTED = 1024  # Tokens cached per binary, whatever ``max_tokens``
+    MAX_CANDIDATES = 65536
+    LEARN_READ_SIZE = 64 * 1024  # Only the beginning of large inputs is scanned
+
+    def __init__(self, path: Path, max_tokens: int = 256, max_learned: int = 64, min_hits: int = 2,
+                 cache_dir: Optional[Path] = None):
+        """
+        :param path: dictionary file
+        :param max_tokens: maximum number of tokens extracted from the binaries
+        :param max_learned: maximum number of tokens learned from Sydr inputs
+        :param min_hits: number of Sydr inputs a token must be found in to be learned
+        :param cache_dir: cache of extracted tokens (default: SYDR_DICT_CACHE, or sydr_dict_cache in the temporary directory)
+        """
+        if cache_dir is None:
+            cache_dir = os.environ.get(self.CACHE_ENV_VAR, Path(tempfile.gettempdir()) / self.DEFAULT_CACHE_PATH)
+        self.path = Path(path)
+        self.max_tokens = max_tokens
+        self.max_learned = max_learned
+        self.min_hits = min_hits
+        self._cache = ContentCache(cache_dir)
+        self._lock = threading.Lock()
+        self._extra: List[str] = []       # Lines of the broker dictionary
+        self._tokens: List[bytes] = []    # Extracted from the binaries
+        self._learned: List[bytes] = []
+        self._known: set = set()
+        self._candidates: Counter = Counter()
+
+        # Counters
+        self.scanned = 0
+        self.errors = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"extracted": len(self._tokens), "learned": len(self._learned), "scanned": self.scanned,
+                "candidates": len(self._candidates), "errors": self.errors,
+                "cache_hits": self._cache.hits, "cache_misses": self._cache.misses}
+
+    def build(self, binaries: Iterable[Path], extra: Optional[Path] = None) -> Optional[Path]:
+        """
+        Write the dictionary from the target ``binaries`` and the ``extra``
+        dictionary. Tokens learned in a previous run (resumed workspace) are kept.
+
+        :return: the dictionary file, None if it is empty
+        """
+        ranked = []
+        for binary in binaries:
+            try:
+                ranked.append(self._cache.cached(binary, lambda p: extract_tokens(p, self.MAX_EXTRACTED),
+                                                 lambda t: "\n".join(x.hex() for x in t),
+                                                 lambda s: [bytes.fromhex(x) for x in s.split()]))
+            except (OSError, ValueError, struct.error) as e:
+                self.errors += 1
+                logger.warning(f"Cannot extract dictionary tokens from {binary}: {e}")
+        # Best tokens of every binary first
+        tokens = [t for group in itertools.zip_longest(*ranked) for t in group if t is not None]
+        with self._lock:
+            if extra is not None:
+                try:
+                    self._extra = [line for line in extra.read_text(errors="replace").splitlines() if line.strip()]
+                except OSError as e:
+                    logger.warning(f"Cannot read dictionary {extra}: {e}")
+            self._learned = self._load_learned()
+            self._tokens = list(dict.fromkeys(tokens))[:self.max_tokens]
+            self._known = set(self._tokens) | set(self._learned)
+            self._write()
+        logger.info(f"Dictionary: {len(self._extra)} broker lines, {len(self._tokens)} extracted tokens, "
+                    f"{len(self._learned)} learned tokens")
+        return self.path if self._extra or self._known else None
+
+    def learn(self, input_file: Path) -> bool:
+        """
+        Count the printable runs of a Sydr input, tokens found in enough
+        inputs are added to the dictionary.
+
+        :return: True if the dictionary has been updated
+        """
+        try:
+            with open(input_file, "rb") as f:
+                data = f.read(self.LEARN_READ_SIZE)
+        except OSError:
+            return False
+        runs = set(STRING_RE.findall(data))
+        with self._lock:
+            self.scanned += 1
+            if len(self._learned) >= self.max_learned:
+                return False
+            promoted = []
+            for run in runs - self._known:
+                self._candidates[run] += 1
+                if self._candidates[run] >= self.min_hits:
+                    promoted.append(run)
+            if len(self._candidates) > self.MAX_CANDIDATES:
+                # Forget tokens seen once
+                self._candidates = Counter({k: v for k, v in self._candidates.items() if v > 1})
+            if not promoted:
+                return False
+            for run in promoted[:self.max_learned - len(self._learned)]:
+                del self._candidates[run]
+                self._learned.append(run)
+                self._known.add(run)
+            self._write()
+        return True
+
+    def _load_learned(self) -> List[bytes]:
+        learned = []
+        try:
+            lines = self.path.read_text().splitlines()
+        except OSError:
+            return learned
+        for line in lines:
+            name, sep, value = line.partition("=")
+            if sep and name.startswith(self.LEARNED_PREFIX) and len(value) >= 2:
+                learned.append(unescape_token(value.strip()[1:-1]))
+        return learned[:self.max_learned]
+
+    def _write(self) -> None:
+        lines = list(self._extra)
+        lines += [f'auto_{i}="{escape_token(t)}"' for i, t in enumerate(self._tokens)]
+        lines += [f'{self.LEARNED_PREFIX}{i}="{escape_token(t)}"' for i, t in enumerate(self._learned)]
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        try:
+            tmp.write_text("\n".join(lines) + "\n")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.errors += 1
+            logger.warning(f"Cannot write dictionary {self.path}: {e}")
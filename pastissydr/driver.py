@@ -1,22 +1,43 @@
 # builtin imports
-import hashlib
+import json
 import logging
 import os
+import shutil
 import stat
 import threading
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 # Third party imports
 from libpastis import ClientAgent, BinaryPackage
 from libpastis.types import CheckMode, CoverageMode, ExecMode, FuzzingEngineInfo, SeedInjectLoc, SeedType, State, \
-                            LogLevel, AlertData, FuzzMode
+                            LogLevel, FuzzMode
+from sydrbroker import SydrConfigurationInterface
 
 # Local imports
 import pastissydr
+from pastissydr.checkpoint import Checkpointer
+from pastissydr.corpus import CorpusImporter
+from pastissydr.covfilter import CoverageFilter
+from pastissydr.dictionary import Dictionary
+from pastissydr.localsync import LocalSync
+from pastissydr.logtail import LogEvent, LogEventType
+from pastissydr.metrics import Metrics
+from pastissydr.options import DriverOptions
+from pastissydr.pipeline import SeedPipeline, SeedWorkerPool
+from pastissydr.pkgcache import PackageCache
+from pastissydr.resources import HostResources, ResourceManager, ResourceTuner
+from pastissydr.scheduler import OutboundScheduler
+from pastissydr.seedfile import DIGEST_NAME, OVERSIZE_POLICIES, SeedFile, digest_file, digest_seed
+from pastissydr.seedindex import SeedIndex
+from pastissydr.staging import InboundStaging
+from pastissydr.startup import StartupTimer
 from pastissydr.sydr import SydrProcess
+from pastissydr.telemetry import TelemetrySample, TelemetrySampler
+from pastissydr.triage import CrashTriage
 from pastissydr.workspace import Workspace
 
 
@@ -30,11 +51,51 @@ logger = logging.getLogger("pastis_sydr_logger")
 
 class SydrDriver:
 
-    def __init__(self, agent: ClientAgent, telemetry_frequency: int = 30):
+    OVERSIZE_POLICIES = OVERSIZE_POLICIES
+
+    def __init__(self, agent: ClientAgent, options: Optional[DriverOptions] = None,
+                 workspace_dir: Optional[Path] = None, observer=None, seed_pool: Optional[SeedWorkerPool] = None,
+                 resources: Optional[HostResources] = None):
+        """
+        :param agent: broker client
+        :param options: driver options (see DriverOptions), defaults if None
+        :param workspace_dir: workspace location (default: SYDR_WS)
+        :param observer: workspace watcher shared with other drivers (see Workspace)
+        :param seed_pool: seed preparation threads shared with other drivers (``send_workers`` is then ignored)
+        :param resources: CPUs and memory given to this driver (default: detected from the host)
+        """
+        options = options if options is not None else DriverOptions()
+        if options.oversize_policy not in self.OVERSIZE_POLICIES:
+            raise ValueError(f"Invalid oversize policy {options.oversize_policy} "
+                             f"(expected one of {self.OVERSIZE_POLICIES})")
+        self.options = options
+
+        # Time to first exec, by phase
+        self.startup = StartupTimer()
+        self.startup.mark("process")
+
         # Internal objects
         self._agent = agent
-        self.workspace = Workspace()
-        self.sydr = SydrProcess()
+        self.workspace = Workspace(watcher=options.watcher, ram=options.ram_workspace, resume=options.resume,
+                                   path=workspace_dir, observer=observer)
+        self._packages = PackageCache(max_size=options.package_cache_size) if options.package_cache_size else None
+        self._localsync = LocalSync(max_size=options.local_sync_size) if options.local_sync else None
+        self._dictionary = Dictionary(self.workspace.dictionary_file,
+                                      max_tokens=options.dictionary_size) if options.auto_dictionary else None
+        self._checkpointer = Checkpointer(self.workspace, options.checkpoint_interval, options.ram_budget,
+                                          options.spill_policy) if options.ram_workspace else None
+        # Fit AFL++ instances and Sydr jobs in the host (or cgroup) CPUs, Sydr jobs and their memory limit in its memory
+        manager = ResourceManager(resources)
+        if options.cores is None:
+            afl_jobs, sydr_jobs = 1, 1
+        else:
+            available = len(options.cpus) if options.cpus else max(1, int(manager.resources.cpus))
+            afl_jobs, sydr_jobs = SydrProcess.plan_jobs(available if options.cores == 0 else min(options.cores, available))
+        sydr_jobs, self._tuning = manager.plan(sydr_jobs)
+        self.sydr = SydrProcess(afl_jobs=afl_jobs, sydr_jobs=sydr_jobs, cpus=options.cpus,
+                                max_restarts=options.max_restarts, stop_timeout=options.stop_timeout)
+        self._tuner = ResourceTuner(manager, self._tuning, sydr_jobs, self.__measure_yield, self.sydr.restart,
+                                    interval=options.tune_interval) if options.adaptive_tuning else None
 
         # Register callbacks.
         self._agent.register_seed_callback(self.__seed_received)
@@ -44,23 +105,112 @@ class SydrDriver:
         self.workspace.add_creation_hook(self.workspace.corpus_dir, self.__send_seed)
         self.workspace.add_creation_hook(self.workspace.sydr_dir, self.__send_seed)
         self.workspace.add_creation_hook(self.workspace.crash_dir, self.__send_crash)
-        self.workspace.add_file_modification_hook(self.workspace.stats_dir, self.__send_telemetry)
+        self.workspace.add_worker_discovery_hook(self.__send_seed)
+
+        # Export inputs as soon as Sydr keeps them
+        self.sydr.log_follower.subscribe(LogEventType.KEEP_INPUT, self.__sydr_input_kept)
+        self.sydr.log_follower.subscribe(LogEventType.ERROR, lambda e: logger.warning(f"[SYDR] {e.line}"))
 
         self._started = False
+        self._prepared = False
+        self._stopped = False
+        self._stop_lock = threading.Lock()  # Stopped by the broker, the user or the daemon, only once
 
-        # Telemetry frequency
-        self._tel_frequency = telemetry_frequency
-        self._tel_last = time.time()
+        # Hot path counters and latencies
+        self.metrics = Metrics()
+        self._metrics_interval = options.metrics_interval
 
         # Runtime data
         self._tot_seeds = 0
-        self._seed_recvs = set()  # Seed received to make sure NOT to send them back
-        self._already_sent = set() # Sent seeds
+        self._dup_recvs = 0
+        self._sydr_kept = 0
+        self._max_seed_size = options.max_seed_size
+        self._oversize_policy = options.oversize_policy
+        # Seeds received (to make sure NOT to send them back) and sent
+        self._seeds = SeedIndex(self.workspace.seed_index_file, digest_name=DIGEST_NAME, bloom_bits=1 << 22)
+        # Seeds being sent, only marked sent in the index once the broker has them
+        self._sending = set()
+        self._publishing: Dict[bytes, Path] = {}  # Queue entries being sent, published locally once sent
+        self._sending_lock = threading.Lock()
+        received = self._resume_state() if self.workspace.resumed else 0
+
+        # Outbound seeds are prepared and sent out of the workspace watcher thread
+        self._pipeline = SeedPipeline(self.__prepare_seed, self.__send_to_broker,
+                                      workers=options.send_workers,
+                                      batch_size=options.send_batch_size,
+                                      batch_latency=options.send_batch_latency,
+                                      metrics=self.metrics,
+                                      pool=seed_pool,
+                                      release=self.__release_seed)
+        # Stats of all AFL++ instances and Sydr jobs are sampled on a timer
+        self._telemetry = TelemetrySampler(self.__stats_files,
+                                           self.sydr.log_follower,
+                                           self.__send_telemetry,
+                                           send_interval=options.telemetry_frequency,
+                                           sample_interval=options.telemetry_sample_interval,
+                                           series_file=self.workspace.telemetry_file,
+                                           counters=lambda: (self._tot_seeds, self._staging.next_id),
+                                           metrics=self.metrics,
+                                           main_stats_file=self.workspace.stats_file)
+        # Queue entries are scored from their AFL++ metadata, the best ones are sent first
+        self._scheduler = OutboundScheduler(lambda path: self.__send(path, SeedType.INPUT),
+                                            budget=options.outbound_budget,
+                                            interval=options.outbound_interval,
+                                            suppress_remote=options.suppress_remote,
+                                            defer_size=options.max_seed_size if options.oversize_policy == "defer" else None,
+                                            metrics=self.metrics)
+
+        # Inbound seeds go through a coverage check, then are staged and injected
+        # in batches paced to AFL++ synchronization. Staging allocates the ids of the remote queue.
+        self._inbound_filter = options.inbound_filter
+        self._staging = InboundStaging(self.add_seed,
+                                       synced_file=self.workspace.remote_synced_file,
+                                       first_id=received,
+                                       capacity=options.inbound_capacity,
+                                       batch_size=options.inbound_batch_size,
+                                       interval=options.inbound_interval,
+                                       metrics=self.metrics)
+        self._inbound = CoverageFilter(self._staging.submit, self.workspace.root_dir / 'inbound')
+
+        # Crashes are bucketed locally, only the first crash of a bucket is sent
+        self._triage = CrashTriage(lambda path: self.__send(path, SeedType.CRASH), self.__send_crash_summary,
+                                   workers=options.triage_workers,
+                                   timeout=options.triage_timeout,
+                                   state_file=self.workspace.crash_buckets_file) if options.crash_triage else None
+
+        self.metrics.register("pipeline", self._pipeline.stats)
+        self.metrics.register("scheduler", self._scheduler.stats)
+        self.metrics.register("telemetry", self._telemetry.stats)
+        self.metrics.register("inbound", self._inbound.stats)
+        self.metrics.register("staging", self._staging.stats)
+        if self._triage:
+            self.metrics.register("triage", self._triage.stats)
+        if self._packages:
+            self.metrics.register("packages", self._packages.stats)
+        if self._dictionary:
+            self.metrics.register("dictionary", self._dictionary.stats)
+        if self._localsync:
+            self.metrics.register("localsync", self._localsync.stats)
+        if self._tuner:
+            self.metrics.register("tuning", lambda: dict(self._tuner.tuning._asdict(), restarts=self._tuner.restarts,
+                                                             deferred=self._tuner.deferred))
+        self.metrics.register("startup", self.startup.report)
+        self.metrics.register("seeds", lambda: {"known": len(self._seeds), "sent": self._tot_seeds,
+                                                "received": self._staging.next_id, "duplicates": self._dup_recvs})
+        self.startup.mark("driver")
 
 
     @staticmethod
     def hash_seed(seed: bytes):
-        return hashlib.md5(seed).hexdigest()
+        return digest_seed(seed).hex()
+
+    @staticmethod
+    def digest_seed(seed: bytes) -> bytes:
+        return digest_seed(seed)
+
+    @staticmethod
+    def digest_file(file: Union[str, Path]) -> bytes:
+        return digest_file(file)
 
 
     @property
@@ -68,9 +218,60 @@ class SydrDriver:
         return self._started
 
 
-    def start(self, package: BinaryPackage, argv: List[str], fuzz_mode: FuzzMode, input_source: SeedInjectLoc, engine_args: str):
+    def _resume_state(self) -> int:
+        """
+        Rebuild seed state of a resumed workspace
+
+        :return: number of seeds received (written in the remote queue) so far
+        """
+        received = sum(1 for _ in self.workspace.dynamic_input_dir.iterdir())
+        if len(self._seeds) > 0:
+            logger.info(f"Resume with {len(self._seeds)} known seeds, {received} received")
+            return received
+
+        # No index, consider everything on disk as already exchanged
+        logger.warning("Seed index missing, rebuild it from the workspace queues")
+        for file in self.workspace.dynamic_input_dir.iterdir():
+            self._seeds.add(self.digest_file(file), SeedIndex.RECEIVED)
+        for queue in [w / 'queue' for w in self.workspace.worker_dirs()] + [self.workspace.crash_dir]:
+            for file in queue.iterdir():
+                if file.is_file():
+                    self._seeds.add(self.digest_file(file), SeedIndex.SENT)
+        self._seeds.flush()
+        logger.info(f"Seed index rebuilt with {len(self._seeds)} seeds")
+        return received
+
+    def _catch_up(self):
+        """ Submit entries written after the last index update of a resumed workspace """
+        since = self.workspace.seed_index_file.stat().st_mtime - 1.0
+        count = 0
+        for queue, typ in [(w / 'queue', SeedType.INPUT) for w in self.workspace.worker_dirs()] + [(self.workspace.crash_dir, SeedType.CRASH)]:
+            with os.scandir(queue) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name != 'README.txt' and entry.stat().st_mtime >= since:
+                        if typ == SeedType.INPUT:
+                            self._scheduler.submit(Path(entry.path))
+                        elif self._triage:
+                            self._triage.submit(Path(entry.path))
+                        else:
+                            self._pipeline.submit(Path(entry.path), typ)
+                        count += 1
+        logger.info(f"Resume: {count} entries to check since last run")
+
+    def _prepare(self):
+        """ Start the outbound path and the workspace watcher (once), they do not depend on the target """
+        if self._prepared:
+            return
+        self._prepared = True
+        self._pipeline.start()
+        self._scheduler.start()
+        if self.workspace.resumed:
+            self._catch_up()
         self.workspace.start()  # Start looking at directories
 
+    def start(self, package: BinaryPackage, argv: List[str], fuzz_mode: FuzzMode, input_source: SeedInjectLoc, engine_args: str):
+        self._prepare()
+
         # Unpack different targets
         fuzz_target = str(package.executable_path.absolute())
         sydr_target = ""
@@ -96,26 +297,74 @@ class SydrDriver:
                     continue
                 sydr_target = extra_file.absolute()
                 logger.warning(f"Uninstrumented binary target for Sydr-Fuzz is {sydr_target}")
-                sydr_target.chmod(stat.S_IRWXU)
+                self.__make_executable(sydr_target)
                 sydr_target = str(sydr_target)
             if sydr_target == "":
                 raise FileNotFoundError(f"Can't find uninstrumented target for Sydr-Fuzz in package")
 
+        if self._dictionary:
+            # The uninstrumented target first, its code is not cluttered by instrumentation
+            binaries = [Path(sydr_target)] + ([Path(fuzz_target)] if fuzz_target != sydr_target else [])
+            built = self._dictionary.build(binaries, Path(dictionary) if dictionary else None)
+            dictionary = str(built) if built else dictionary
+            self.startup.mark("dictionary")
+
+        if self._localsync:
+            key = LocalSync.key(digest_file(fuzz_target), argv, fuzz_mode.name, input_source.name)
+            try:
+                self._localsync.attach(key, self.workspace.local_sync_link)
+            except OSError as e:
+                logger.warning(f"Cannot join the local seed exchange, use the broker only: {e}")
+
         logger.info(f"Start Sydr process, extra engine_args:{engine_args}")
+        try:
+            if engine_args.strip() and not engine_args.strip().startswith("{"):
+                # Legacy free-form arguments are not passed to AFL++ unchecked
+                logger.warning(f"IGNORING ARGUMENTS {engine_args} (not a JSON engine configuration)")
+                engine_args = ""
+            engine_config = SydrConfigurationInterface.from_str(engine_args)
+        except ValueError as e:
+            logger.error(f"Invalid engine configuration, use the defaults: {e}")
+            self._agent.send_log(LogLevel.ERROR, f"Invalid engine configuration, use the defaults: {e}")
+            engine_config = SydrConfigurationInterface.new()
+        tuning, pinned = SydrProcess.merge_tuning(self._tuning, engine_config)
         self.sydr.start(fuzz_target,
                         sydr_target,
                         " ".join(argv),
                         self.workspace,
                         fuzz_mode,
                         input_source == SeedInjectLoc.STDIN,
-                        engine_args,
+                        engine_config,
                         dictionary,
-                        cmplog_target)
+                        cmplog_target,
+                        tuning=tuning)
+        self.startup.mark("spawn")
+        self.startup.wait_first_exec(self.__stats_files, self.__startup_done)
+        if self._inbound_filter:
+            self._inbound.configure(self.sydr.fuzz_command,
+                                    input_source == SeedInjectLoc.STDIN,
+                                    fuzz_mode == FuzzMode.BINARY_ONLY,
+                                    corpus_dir=self.workspace.corpus_dir)
+        self._telemetry.start()
+        self._inbound.start()
+        self._staging.start()
+        if self._triage:
+            self._triage.configure(self.sydr.sydr_command, input_source == SeedInjectLoc.STDIN)
+            self._triage.start()
+        if self._checkpointer:
+            self._checkpointer.start()
+        if self._tuner:
+            # Parameters set by the broker are not retuned
+            self._tuner.tuning, self._tuner.pinned = tuning, pinned
+            self._tuner.sydr_jobs = self.sydr.jobs[1]
+            self._tuner.start()
+        self.metrics.start(self._metrics_interval, self.workspace.metrics_file)
         self._started = True
 
     def start_received(self, fname: str, binary: bytes, engine: FuzzingEngineInfo, _exec_mode: ExecMode, fuzz_mode: FuzzMode, _check_mode: CheckMode,
                        _cov_mode: CoverageMode, input_source: SeedInjectLoc, engine_args: str, argv: List[str], _kl_report: str = None):
         logger.info(f"[START] bin:{fname} engine:{engine.name} seedloc:{input_source.name}")
+        self.startup.mark("wait_start")
         if self.started:
             self._agent.send_log(LogLevel.CRITICAL, "Instance already started!")
             return
@@ -129,22 +378,32 @@ class SydrDriver:
             self._agent.send_log(LogLevel.ERROR, f"Invalid fuzzing engine version {engine.version} do nothing")
             return
 
-        # Retrieve package out of the binary received
-        try:
-            package = BinaryPackage.from_binary(fname, binary, self.workspace.target_dir)
-        except FileNotFoundError:
-            logger.error("Invalid package received: FileNotFound")
-            self._agent.send_log(LogLevel.ERROR, "Invalid package provided: FileNotFound")
-            return
-        except ValueError:
-            logger.error("Invalid package received: ValueError")
-            self._agent.send_log(LogLevel.ERROR, "Invalid package provided: ValueError")
-            return
+        # Pre-flight: retrieve package out of the binary received, meanwhile start what does not depend on it
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="Preflight") as preflight:
+            unpacking = preflight.submit(self.__unpack, fname, binary)
+            self._prepare()
+            try:
+                package = unpacking.result()
+            except FileNotFoundError:
+                logger.error("Invalid package received: FileNotFound")
+                self._agent.send_log(LogLevel.ERROR, "Invalid package provided: FileNotFound")
+                return
+            except ValueError:
+                logger.error("Invalid package received: ValueError")
+                self._agent.send_log(LogLevel.ERROR, "Invalid package provided: ValueError")
+                return
+        self.startup.mark("preflight")
 
         # Start fuzzer.
         self.start(package, argv, fuzz_mode, input_source, engine_args)
 
 
+    def __unpack(self, fname: str, binary: bytes) -> BinaryPackage:
+        if self._packages:
+            return self._packages.unpack(fname, binary, self.workspace.target_dir)
+        return BinaryPackage.from_binary(fname, binary, self.workspace.target_dir)
+
+
     def init_agent(self, remote: str = "localhost", port: int = 5555):
         self._agent.register_start_callback(self.start_received)  # Register start because launched manually (not by pastisd)
         self._agent.connect(remote, port)
@@ -154,27 +413,38 @@ class SydrDriver:
 
 
     def stop(self):
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self.startup.stop()
+        if self._tuner:
+            self._tuner.stop()  # No restart from now on
         self.sydr.stop()
         self.workspace.stop()
+        self._telemetry.stop()
         self._started = False
-        # Wait for copying Sydr inputs
-        if not os.path.isfile(self.workspace.output_dir / "sydr-fuzz.log"):
-            return
-        with open(self.workspace.output_dir / "sydr-fuzz.log") as f:
-            lines = f.readlines()
-            lines.reverse()
-            for line in lines:
-                if "Keeping input" in line:
-                    name = line.split(' ')[-1].strip().strip('\"')
-                    self.__send_seed(self.workspace.sydr_dir / name)
-                elif "Received SIGINT/SIGTERM: terminating" in line:
-                    break
-
-
-    def add_seed(self, seed: bytes):
-        remote_seed_id = str(len(self._seed_recvs)).zfill(6)
-        seed_path = self.workspace.dynamic_input_dir / f"id:{remote_seed_id},seed-{hashlib.md5(seed).hexdigest()}"
+        # Sydr inputs kept until termination were already submitted by the log follower
+        self._scheduler.stop()
+        self._pipeline.stop()
+        self._inbound.stop()
+        self._staging.stop()
+        if self._triage:
+            self._triage.stop()
+        if self._checkpointer:
+            self._checkpointer.stop()
+            self.workspace.release()
+        self._seeds.flush()
+        self.metrics.stop()
+
+
+    def add_seed(self, seed: bytes, digest: bytes, seed_id: int):
+        """ Write a seed in the remote queue, ``seed_id`` is allocated by the inbound staging """
+        remote_seed_id = str(seed_id).zfill(6)
+        seed_path = self.workspace.dynamic_input_dir / f"id:{remote_seed_id},seed-{digest.hex()}"
+        t0 = time.perf_counter()
         seed_path.write_bytes(seed)
+        self.metrics.observe("recv.written", time.perf_counter() - t0)
 
 
     def add_initial_seed(self, file: Union[str, Path]):
@@ -184,16 +454,78 @@ class SydrDriver:
         seed_path = self.workspace.input_dir / p.name
         seed_path.write_bytes(p.read_bytes())
 
+    def add_initial_corpus(self, paths: List[Union[str, Path]], workers: int = 8, max_size: Optional[int] = None,
+                           max_count: Optional[int] = None, link: str = "auto") -> Dict[str, Union[int, float]]:
+        """
+        Import files and directories (recursively) as initial seeds, deduplicated
+        by content. See CorpusImporter for the parameters.
+        """
+        importer = CorpusImporter(self.workspace.input_dir, self.digest_file, workers=workers,
+                                  max_size=max_size, max_count=max_count, link=link)
+        return importer.run(paths)
+
+
+    @staticmethod
+    def __make_executable(path: Path):
+        """ chmod +x, on a private copy if ``path`` is shared (eg: hardlink into the package cache) """
+        if os.access(path, os.X_OK):
+            return
+        st = path.stat()
+        if st.st_nlink > 1 or st.st_uid != os.getuid():
+            tmp = path.with_name(f".{path.name}.tmp")
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, path)
+        path.chmod(stat.S_IMODE(path.stat().st_mode) | stat.S_IRWXU)
+
 
     def run(self):
         self.sydr.wait()        
 
 
     def __seed_received(self, typ: SeedType, seed: bytes):
-        h = self.hash_seed(seed)
-        logger.info(f"[SEED] received {h} ({typ.name})")
-        self.add_seed(seed)
-        self._seed_recvs.add(h)
+        self.metrics.incr("recv.received")
+        t0 = time.perf_counter()
+        digest = self.digest_seed(seed)
+        t1 = time.perf_counter()
+        self.metrics.observe("recv.hashed", t1 - t0)
+        logger.info(f"[SEED] received {digest.hex()} ({typ.name})")
+        # Drop seeds already received, sent by us or published by an agent of the host (thus already in AFL++ queues)
+        known = self._seeds.has(digest, SeedIndex.SENT) or digest in self._sending \
+            or not self._seeds.add(digest, SeedIndex.RECEIVED) \
+            or (self._localsync is not None and self._localsync.echo(digest))
+        self.metrics.observe("recv.deduped", time.perf_counter() - t1)
+        if known:
+            self.metrics.incr("recv.duplicate")
+            self._dup_recvs += 1
+            logger.debug(f"[SEED] {digest.hex()} already known, skip it [{self._dup_recvs} duplicates]")
+            return
+        self._inbound.submit(seed, digest, typ)
+
+
+    def __sydr_input_kept(self, event: LogEvent):
+        self._sydr_kept += 1
+        path = self.workspace.sydr_dir / event.value
+        self.__send_seed(path)
+        if self._dictionary and self._dictionary.learn(path):
+            logger.info(f"Dictionary: {self._dictionary.stats()['learned']} tokens learned from Sydr inputs (used from the next restart)")
+
+
+    def __stats_files(self) -> List[Path]:
+        return [w / SydrProcess.STAT_FILE for w in self.workspace.worker_dirs()]
+
+
+    def __startup_done(self, startup: StartupTimer):
+        logger.info(f"Startup: {startup.summary()}")
+        try:
+            startup.dump(self.workspace.startup_file)
+        except OSError as e:
+            logger.warning(f"Cannot write startup report: {e}")
+
+
+    def __measure_yield(self) -> Tuple[int, Optional[float]]:
+        """ Inputs kept by Sydr so far, mean exec/s of the AFL++ instances """
+        sample = self._telemetry.last
+        return self._sydr_kept, sample.exec_per_sec / sample.workers if sample and sample.workers else None
 
 
     def __stop_received(self):
@@ -202,66 +534,121 @@ class SydrDriver:
 
 
     def __send_seed(self, filename: Path):
-        self.__send(filename, SeedType.INPUT)
+        self._scheduler.submit(filename)
 
 
     def __send_crash(self, filename: Path):
         # Skip README file that AFL adds to the crash folder.
-        if filename.name != 'README.txt':
-            self.__send(filename, SeedType.CRASH)
-
-
-    def __send(self, filename: Path, typ: SeedType):
-        file = Path(filename)
-        raw = file.read_bytes()
-        h = self.hash_seed(raw)
-        if h in self._already_sent:
-            #logger.debug(f'[{typ.name}] Seed was already sent: {filename}, do not send it back')
+        if filename.name == 'README.txt':
             return
-        self._tot_seeds += 1
-        logger.debug(f'[{typ.name}] Sending new: {h} [{self._tot_seeds}]')
-        if h not in self._seed_recvs:
-            self._agent.send_seed(typ, raw)
-            self._already_sent.add(h)
+        if self._triage:
+            self._triage.submit(filename)
         else:
-            logger.info("seed (previously sent) do not send it back")
-
+            self.__send(filename, SeedType.CRASH)
 
-    def __send_telemetry(self, filename: Path):
-        if filename.name != SydrProcess.STAT_FILE:
-            return
 
-        now = time.time()
-        if now < (self._tel_last + self._tel_frequency):
-            return
-        self._tel_last = now
+    def __send_crash_summary(self, summary: Dict):
+        self._agent.send_log(LogLevel.INFO, f"[TRIAGE] {json.dumps(summary)}")
 
-        logger.debug(f'[TELEMETRY] Stats file updated: {filename}')
 
-        with open(filename, 'r') as stats_file:
+    def __send(self, filename: Path, typ: SeedType):
+        self.metrics.incr("seed.discovered")
+        self._pipeline.submit(Path(filename), typ)
+
+
+    def __send_to_broker(self, typ: SeedType, raw: bytes, digest: bytes):
+        t0 = time.perf_counter()
+        self._agent.send_seed(typ, raw)
+        self._seeds.add(digest, SeedIndex.SENT)
+        with self._sending_lock:
+            published = self._publishing.pop(digest, None)
+        self.__release_seed(digest)
+        if published is not None:
+            self._localsync.publish(published, digest)
+        self._tot_seeds += 1
+        self.metrics.observe("seed.sent", time.perf_counter() - t0)
+        logger.debug(f'[{typ.name}] Sent new: {digest.hex()} ({len(raw)} bytes)')
+
+
+    def __release_seed(self, digest: bytes):
+        with self._sending_lock:
+            self._sending.discard(digest)
+            self._publishing.pop(digest, None)
+
+
+    def __seed_limit(self, filename: Path, typ: SeedType) -> Optional[int]:
+        """ Number of bytes of a seed to consider (None for all of them, -1 to skip it) """
+        if self._max_seed_size is None or typ != SeedType.INPUT or self._oversize_policy == "defer":
+            return None  # Crashes are always sent whole, deferred entries are held back by the scheduler
+        if self._oversize_policy == "truncate":
+            return self._max_seed_size
+        if os.stat(filename).st_size > self._max_seed_size:
+            return -1
+        return None
+
+
+    def __prepare_seed(self, filename: Path, typ: SeedType) -> Optional[Tuple[bytes, bytes]]:
+        # Called from the pipeline workers, return the seed content and digest if it has to be sent.
+        # The seed is hashed once, its content is only loaded (large seeds are mapped) if it is sent.
+        t0 = time.perf_counter()
+        limit = self.__seed_limit(filename, typ)
+        if limit == -1:
+            self.metrics.incr("seed.oversized")
+            return None
+        with SeedFile(filename, limit) as seed:
+            digest = seed.digest()
+            t1 = time.perf_counter()
+            self.metrics.observe("seed.hashed", t1 - t0)
+            flags = self._seeds.flags(digest)
+            if flags & SeedIndex.SENT:
+                #logger.debug(f'[{typ.name}] Seed was already sent: {filename}, do not send it back')
+                self.metrics.incr("seed.duplicate")
+                return None
+            if flags & SeedIndex.RECEIVED:
+                logger.info("seed (previously sent) do not send it back")
+                self.metrics.incr("seed.duplicate")
+                return None
+            if self._localsync is not None and typ == SeedType.INPUT and self._localsync.has(digest):
+                # Published (thus sent) by an agent of the host, re-imported through a local instance
+                self.metrics.incr("seed.local")
+                return None
+            # Claim it so that concurrent workers do not send it twice, it is marked sent once sent
+            with self._sending_lock:
+                claimed = digest not in self._sending
+                self._sending.add(digest)
+            if claimed and self._seeds.has(digest, SeedIndex.SENT):
+                # Sent by another worker since the first lookup
+                self.__release_seed(digest)
+                claimed = False
+            t2 = time.perf_counter()
+            self.metrics.observe("seed.deduped", t2 - t1)
+            if not claimed:
+                self.metrics.incr("seed.duplicate")
+                return None
             try:
-                stats = {}
-                for line in stats_file.readlines():
-                    k, v = line.strip('\n').split(':')
-                    stats[k.strip()] = v.strip()
-
-                state = State.RUNNING
-                last_cov_update = int(stats['last_update'])
-                total_exec = int(stats['execs_done'])
-                exec_per_sec = int(float(stats['execs_per_sec']))
-                timeout = int(stats['unique_hangs']) if 'unique_hangs' in stats else None # N/A in AFL-QEMU.
-                coverage_edge = int(stats['total_edges'])
-                cycle = int(stats['cycles_done'])
-                coverage_path = int(stats['paths_total']) if 'paths_total' in stats else None # N/A in AFL-QEMU.
-
-                # NOTE: `coverage_block` does not apply for AFLPP.
-                self._agent.send_telemetry(state=state,
-                                           exec_per_sec=exec_per_sec,
-                                           total_exec=total_exec,
-                                           cycle=cycle,
-                                           timeout=timeout,
-                                           coverage_edge=coverage_edge,
-                                           coverage_path=coverage_path,
-                                           last_cov_update=last_cov_update)
-            except:
-                logger.error(f'Error retrieving stats!')
+                raw = seed.read()
+            except Exception:
+                self.__release_seed(digest)
+                raise
+            self.metrics.observe("seed.read", time.perf_counter() - t2)
+            if seed.truncated:
+                self.metrics.incr("seed.truncated")
+            elif self._localsync and typ == SeedType.INPUT:
+                # Published once sent, a seed the broker does not get is not dropped by the other agents
+                with self._sending_lock:
+                    self._publishing[digest] = filename
+        return raw, digest
+
+
+    def __send_telemetry(self, sample: TelemetrySample):
+        logger.debug(f'[TELEMETRY] {sample}')
+        # NOTE: AFL++ does not count blocks, its covered map entries are the closest measure.
+        self._agent.send_telemetry(state=State.RUNNING,
+                                   exec_per_sec=int(sample.exec_per_sec),
+                                   total_exec=sample.total_exec,
+                                   cycle=sample.cycles,
+                                   timeout=sample.hangs,
+                                   coverage_block=sample.edges_found,
+                                   coverage_edge=sample.edges_found,
+                                   coverage_path=sample.corpus,
+                                   last_cov_update=sample.last_find)
@@ -0,0 +1,53 @@
+# builtin imports
+import importlib
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+from typing import Optional
+
+_lock = threading.Lock()
+
+
+class _LazyModule(ModuleType):
+    """ Placeholder importing the actual module on the first access to one of its attributes """
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def _load(self) -> ModuleType:
+        with _lock:
+            module = self.__dict__.get("_module")
+            if module is None:
+                if sys.modules.get(self.__name__) is self:
+                    del sys.modules[self.__name__]
+                try:
+                    module = importlib.import_module(self.__name__)
+                except BaseException:
+                    sys.modules.setdefault(self.__name__, self)
+                    raise
+                self.__dict__["_module"] = module
+        return module
+
+
+def lazy_import(name: str) -> Optional[ModuleType]:
+    """
+    Register ``name`` as a module imported on its first attribute access,
+    so that modules importing it without using it (eg: libpastis and lief)
+    do not pay for it. Must be called before the first import of ``name``.
+
+    NOTE: importlib.util.LazyLoader does not fit, "import name" reads the
+    module __spec__, which triggers the actual import.
+
+    :return: the (lazy) module, None if it is not installed
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    module = _LazyModule(name)
+    module.__spec__ = spec
+    module.__file__ = spec.origin
+    sys.modules[name] = module
+    return module
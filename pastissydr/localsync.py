@@ -0,0 +1,245 @@
+# builtin imports
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class LocalSync:
+    """
+    Seed exchange between the agents of a host fuzzing the same target,
+    without the broker round-trip. The shared directory of a target is laid
+    out like an AFL++ instance:
+
+        <root>/<target key>/queue/id:NNNNNN,seed-<digest>    (ids allocated under a lock file)
+        <root>/<target key>/digests/<digest>                  (content-addressed, same inode)
+
+    Agents publish their new queue entries there (hardlinks, copies across
+    filesystems) and link the directory into their AFL++ sync directory, so
+    AFL++ imports the seeds of the other agents by itself. Seeds published
+    locally are recognized when the broker sends them back.
+
+    The directory of a target is bounded: seeds published more than
+    ``max_age`` ago, then the oldest ones above ``max_size``, are removed
+    (AFL++ instances already imported them). Directories of targets no
+    agent published to for ``max_age`` are removed.
+    """
+
+    SYNC_ENV_VAR = "SYDR_LOCAL_SYNC"
+    DEFAULT_SYNC_PATH = "sydr_local_sync"
+    LOCK_FILE = ".lock"
+    NEXT_ID_FILE = ".next_id"
+    EVICT_INTERVAL = 256  # Publications between two evictions
+
+    def __init__(self, root: Optional[Path] = None, max_size: int = 1 << 30, max_age: float = 7 * 24 * 3600):
+        """
+        :param root: directory shared by the agents of the host (default: SYDR_LOCAL_SYNC, or sydr_local_sync in the temporary directory)
+        :param max_size: size (bytes) of the seeds kept per target
+        :param max_age: time (sec) seeds are kept
+        """
+        if root is None:
+            root = os.environ.get(self.SYNC_ENV_VAR, Path(tempfile.gettempdir()) / self.DEFAULT_SYNC_PATH)
+        self.root = Path(root)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.target_dir: Optional[Path] = None
+        self._lock = threading.Lock()  # The lock file serializes processes, not the threads of one
+
+        # Counters
+        self.published = 0
+        self.duplicates = 0
+        self.echoes = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"published": self.published, "duplicates": self.duplicates, "echoes": self.echoes,
+                "errors": self.errors, "evictions": self.evictions}
+
+    @staticmethod
+    def key(executable_digest: bytes, argv: List[str], *modes: str) -> str:
+        """ Key of a target: the executable content, its arguments and how it is fuzzed """
+        h = hashlib.blake2b(executable_digest, digest_size=16)
+        for part in [" ".join(argv), *modes]:
+            h.update(b"\0" + part.encode())
+        return h.hexdigest()
+
+    @property
+    def queue_dir(self) -> Path:
+        return self.target_dir / "queue"
+
+    @property
+    def digests_dir(self) -> Path:
+        return self.target_dir / "digests"
+
+    def attach(self, key: str, link: Path) -> None:
+        """
+        Join the exchange of target ``key`` and expose it to AFL++ as the
+        instance ``link`` (in the AFL++ sync directory).
+        """
+        self.target_dir = self.root / key
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self.digests_dir.mkdir(parents=True, exist_ok=True)
+        if link.is_symlink() or link.exists():
+            if link.is_symlink() and Path(os.readlink(link)) == self.target_dir:
+                return
+            link.unlink()
+        link.symlink_to(self.target_dir, target_is_directory=True)
+        logger.info(f"Local seed exchange: {self.target_dir}")
+        self._remove_stale_targets()
+        self.evict()
+
+    @property
+    def attached(self) -> bool:
+        return self.target_dir is not None
+
+    def has(self, digest: bytes) -> bool:
+        """ Whether a seed has been published by an agent of the host (this one included) """
+        return self.target_dir is not None and os.path.exists(self.digests_dir / digest.hex())
+
+    def echo(self, digest: bytes) -> bool:
+        """ Whether a seed received from the broker has been published by an agent of the host """
+        if self.has(digest):
+            self.echoes += 1
+            return True
+        return False
+
+    def publish(self, path: Path, digest: bytes) -> bool:
+        """
+        Publish a queue entry (the file must not be modified afterwards), once
+        it has been sent to the broker: agents of the host drop published seeds.
+
+        :return: False if it was already published (or cannot be)
+        """
+        if self.target_dir is None:
+            return False
+        entry = self.digests_dir / digest.hex()
+        try:
+            if not self._link(path, entry):
+                self.duplicates += 1
+                return False
+        except FileNotFoundError:
+            return False  # Entry removed in the meantime (eg: spilled)
+        except OSError as e:
+            self.errors += 1
+            logger.warning(f"Cannot publish {path} locally: {e}")
+            return False
+        try:
+            # AFL++ imports ids in increasing order: allocate and link under the lock
+            with self._locked():
+                next_id = self._read_next_id()
+                os.link(entry, self.queue_dir / f"id:{next_id:06d},seed-{digest.hex()}")
+                (self.target_dir / self.NEXT_ID_FILE).write_text(str(next_id + 1))
+        except OSError as e:
+            self.errors += 1
+            logger.warning(f"Cannot publish {path} locally: {e}")
+            entry.unlink(missing_ok=True)
+            return False
+        self.published += 1
+        if self.published % self.EVICT_INTERVAL == 0:
+            self.evict()
+        return True
+
+    def evict(self) -> None:
+        """ Remove the seeds older than max_age, then the oldest ones above max_size """
+        if self.target_dir is None:
+            return
+        try:
+            with self._locked():
+                entries = sorted(self._digest_entries())
+                total = sum(size for _, size, _ in entries)
+                deadline = time.time() - self.max_age
+                evicted = set()
+                for ctime, size, name in entries:
+                    if ctime >= deadline and total <= self.max_size:
+                        break
+                    evicted.add(name)
+                    total -= size
+                if not evicted:
+                    return
+                with os.scandir(self.queue_dir) as it:
+                    for e in it:
+                        if e.name.rpartition(",seed-")[2] in evicted:
+                            os.unlink(e.path)
+                for name in evicted:
+                    (self.digests_dir / name).unlink(missing_ok=True)
+        except OSError as e:
+            self.errors += 1
+            logger.warning(f"Cannot evict seeds of the local exchange: {e}")
+            return
+        self.evictions += len(evicted)
+        logger.info(f"Local seed exchange: {len(evicted)} seeds evicted ({total} bytes kept)")
+
+    def _digest_entries(self) -> List[Tuple[float, int, str]]:
+        """ (publication time, size, digest) of the published seeds """
+        entries = []
+        with os.scandir(self.digests_dir) as it:
+            for e in it:
+                if e.name.startswith("."):
+                    continue  # Copy in progress
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue  # Publication failed meanwhile
+                entries.append((st.st_ctime, st.st_size, e.name))  # ctime: set when linked into digests/
+        return entries
+
+    def _remove_stale_targets(self) -> None:
+        """ Remove the directories of targets no agent published to for max_age """
+        deadline = time.time() - self.max_age
+        for entry in self.root.iterdir():
+            if entry == self.target_dir or not entry.is_dir():
+                continue
+            try:
+                last = max(entry.stat().st_mtime, (entry / self.NEXT_ID_FILE).stat().st_mtime)
+            except FileNotFoundError:
+                last = entry.stat().st_mtime
+            if last < deadline:
+                logger.info(f"Remove the local seed exchange of stale target {entry.name}")
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def _link(self, src: Path, dst: Path) -> bool:
+        """ Put ``src`` at ``dst`` (hardlink, or copy across filesystems), False if ``dst`` exists """
+        try:
+            os.link(src, dst)
+            return True
+        except FileExistsError:
+            return False
+        except OSError:
+            pass
+        tmp = dst.with_name(f".{dst.name}.{os.getpid()}.{threading.get_ident()}")
+        shutil.copyfile(src, tmp)
+        try:
+            os.link(tmp, dst)  # Unlike rename, fails if another agent published it meanwhile
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.unlink(tmp)
+
+    def _read_next_id(self) -> int:
+        try:
+            return int((self.target_dir / self.NEXT_ID_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            # Lost counter: continue after the entries on disk
+            ids = [int(e.name[3:9]) for e in os.scandir(self.queue_dir) if e.name[3:9].isdigit()]
+            return max(ids) + 1 if ids else 0
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            fd = os.open(self.target_dir / self.LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
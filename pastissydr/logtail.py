@@ -0,0 +1,144 @@
+# builtin imports
+import logging
+import os
+import re
+import threading
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class LogEventType(Enum):
+    KEEP_INPUT = 1     # Sydr produced a new input kept in the corpus
+    JOB_START = 2      # A Sydr job has been launched
+    JOB_FINISH = 3     # A Sydr job terminated
+    TERMINATING = 4    # sydr-fuzz received SIGINT/SIGTERM
+    RESULTS = 5        # sydr-fuzz printed its final results
+    ERROR = 6          # Error reported by sydr-fuzz
+
+
+class LogEvent(NamedTuple):
+    type: LogEventType
+    line: str
+    value: Optional[str] = None   # Parsed value (eg: input name for KEEP_INPUT)
+
+
+class LogFollower:
+    """
+    Follow sydr-fuzz.log from the last read offset and dispatch parsed events
+    to subscribers as soon as lines are written. The file is never re-read
+    from the beginning (unless it is truncated).
+    """
+
+    # First matching pattern wins. sydr-fuzz messages follow their "[LEVEL]" tag,
+    # lines of the target or of Sydr quoted in a message do not match.
+    PATTERNS = [
+        (LogEventType.KEEP_INPUT, re.compile(r'Keeping input')),
+        (LogEventType.RESULTS, re.compile(r'\[RESULTS\]')),
+        (LogEventType.TERMINATING, re.compile(r'Received SIGINT/SIGTERM: terminating')),
+        (LogEventType.JOB_START, re.compile(r'\] Launching Sydr\b')),
+        (LogEventType.JOB_FINISH, re.compile(r'\] Sydr (?:finished|exited)\b')),
+        (LogEventType.ERROR, re.compile(r'\[ERROR\]')),
+    ]
+    PREFILTER = ("Keeping input", "[RESULTS]", "SIGINT", "] Launching Sydr", "] Sydr ", "[ERROR]")
+
+    def __init__(self, path: Optional[Path] = None, interval: float = 0.2, chunk_size: int = 1024 * 1024):
+        self.path = path
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self._partial = b""
+        self._subscribers: Dict[LogEventType, List[Callable[[LogEvent], None]]] = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.results = threading.Event()  # Set once the RESULTS line has been seen
+
+        self.counts: Dict[LogEventType, int] = {t: 0 for t in LogEventType}
+        self.lines = 0
+
+    def subscribe(self, typ: LogEventType, callback: Callable[[LogEvent], None]) -> None:
+        self._subscribers.setdefault(typ, []).append(callback)
+
+    def follow(self, path: Path) -> None:
+        """ Follow ``path`` from its current end (previous content was already processed) """
+        with self._lock:
+            self.path = Path(path)
+            self.offset = self.path.stat().st_size if self.path.exists() else 0
+            self._partial = b""
+            self.results.clear()
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="LogFollower", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Stop following the file after a last read of its remaining content """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self.poll()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.poll()
+        self.poll()  # Flush what has been written until the stop
+        with self._lock:
+            if self._partial:
+                self._parse(self._partial.decode(errors="replace"))
+                self._partial = b""
+
+    def poll(self) -> None:
+        """ Read and dispatch all lines appended since the previous call """
+        with self._lock:
+            if self.path is None:
+                return
+            try:
+                size = os.stat(self.path).st_size
+            except FileNotFoundError:
+                return
+            if size < self.offset:
+                logger.warning(f"{self.path.name} truncated, follow it from the beginning")
+                self.offset, self._partial = 0, b""
+            if size == self.offset:
+                return
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                while True:
+                    data = f.read(self.chunk_size)
+                    if not data:
+                        break
+                    self.offset += len(data)
+                    data = self._partial + data
+                    lines = data.split(b"\n")
+                    self._partial = lines.pop()   # Incomplete last line
+                    for line in lines:
+                        self._parse(line.decode(errors="replace"))
+
+    def _parse(self, line: str) -> None:
+        self.lines += 1
+        if not any(x in line for x in self.PREFILTER):
+            return
+        for typ, pattern in self.PATTERNS:
+            if pattern.search(line):
+                value = None
+                if typ == LogEventType.KEEP_INPUT:
+                    # The input name is the last word of the line
+                    value = line.split(' ')[-1].strip().strip('"')
+                self._dispatch(LogEvent(typ, line, value))
+                return
+
+    def _dispatch(self, event: LogEvent) -> None:
+        self.counts[event.type] += 1
+        if event.type == LogEventType.RESULTS:
+            self.results.set()
+        for cb in self._subscribers.get(event.type, []):
+            try:
+                cb(event)
+            except Exception as e:
+                logger.error(f"Log event {event.type.name} callback failed: {e}")
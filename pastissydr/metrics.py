@@ -0,0 +1,161 @@
+# builtin imports
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class Histogram:
+    """
+    Latency histogram with power-of-two buckets in microseconds (bucket i
+    holds values in [2^(i-1), 2^i) us). Percentiles are approximated by the
+    upper bound of the bucket they fall in.
+    """
+
+    BUCKETS = 32  # Up to ~35 min
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * self.BUCKETS
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+
+    def percentile(self, p: float) -> float:
+        """ Approximate percentile (sec) """
+        if self.count == 0:
+            return 0.0
+        rank = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"count": self.count,
+                "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                "p50_ms": round(self.percentile(50) * 1000, 3),
+                "p90_ms": round(self.percentile(90) * 1000, 3),
+                "p99_ms": round(self.percentile(99) * 1000, 3),
+                "max_ms": round(self.max * 1000, 3)}
+
+
+class Metrics:
+    """
+    Counters and latency histograms of the agent hot path, identified by
+    dotted stage names (eg: "seed.hashed"). Optionally reported periodically
+    as a log summary and a JSON file (rewritten atomically).
+
+    Timing is done by the caller::
+
+        t0 = time.perf_counter()
+        ...
+        metrics.observe("seed.read", time.perf_counter() - t0)
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._counters: Dict[str, int] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._components: Dict[str, Callable[[], Dict]] = {}
+        self._lock = threading.Lock()
+        self._start = time.time()
+        self._stop = threading.Event()
+        self._thread = None
+        self._interval = 0.0
+        self._path: Optional[Path] = None
+
+    def incr(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    def register(self, name: str, stats: Callable[[], Dict]) -> None:
+        """ Add a component whose ``stats()`` dict is included in reports """
+        self._components[name] = stats
+
+    def snapshot(self) -> Dict[str, Union[float, Dict]]:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: h.snapshot() for k, h in self._histograms.items()}
+        components = {}
+        for name, stats in self._components.items():
+            try:
+                components[name] = stats()
+            except Exception as e:
+                components[name] = {"error": str(e)}
+        return {"time": time.time(), "uptime": round(time.time() - self._start, 1),
+                "counters": counters, "latency": histograms, "components": components}
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        lines = [f"Metrics (uptime {snap['uptime']}s)"]
+        if snap["counters"]:
+            lines.append("  " + " ".join(f"{k}={v}" for k, v in sorted(snap["counters"].items())))
+        for name, h in sorted(snap["latency"].items()):
+            lines.append(f"  {name:20} n={h['count']:<8} mean={h['mean_ms']}ms p50={h['p50_ms']}ms "
+                         f"p99={h['p99_ms']}ms max={h['max_ms']}ms")
+        for name, stats in snap["components"].items():
+            lines.append(f"  {name}: {stats}")
+        return "\n".join(lines)
+
+    def dump(self, path: Path) -> None:
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(self.snapshot(), indent=1))
+        os.replace(tmp, path)
+
+    def start(self, interval: float, path: Optional[Path] = None) -> None:
+        """
+        Report metrics every ``interval`` sec in the log and, if given, in ``path``.
+        """
+        if interval <= 0:
+            return
+        self._interval = interval
+        self._path = Path(path) if path else None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="Metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._report()
+
+    def _report(self) -> None:
+        logger.info(self.summary())
+        if self._path is not None:
+            try:
+                self.dump(self._path)
+            except OSError as e:
+                logger.warning(f"Cannot write metrics to {self._path}: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._report()
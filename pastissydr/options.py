@@ -0,0 +1,63 @@
+# builtin imports
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+
+class DriverOptions(NamedTuple):
+    """
+    SydrDriver options (sizes in bytes, durations in sec). They are given
+    on the command line, or by the daemon configuration.
+    """
+    # Telemetry
+    telemetry_frequency: int = 30             # Interval between telemetry messages
+    telemetry_sample_interval: float = 5      # Interval between samples recorded in the telemetry series
+    metrics_interval: float = 60              # Interval between hot path metrics reports (log and metrics file), 0 to disable
+    # Workspace
+    watcher: str = "auto"                     # Workspace watcher backend (see watcher.create_observer)
+    resume: bool = False                      # Resume the existing workspace instead of starting from scratch
+    ram_workspace: bool = False               # Run in a RAM-backed workspace checkpointed every checkpoint_interval
+    checkpoint_interval: float = 300
+    ram_budget: Optional[int] = None          # Size of the RAM workspace above which spill_policy applies
+    spill_policy: str = "spill"
+    package_cache_size: Optional[int] = 4 << 30  # Host-wide cache of unpacked packages, None (or 0) to disable it
+    # Outbound seeds
+    send_workers: int = 2                     # Ignored when the driver is given a shared seed pool
+    send_batch_size: int = 32
+    send_batch_latency: float = 0.1
+    outbound_budget: Optional[int] = None     # Queue entries sent every outbound_interval, best first (None: as they come)
+    outbound_interval: float = 1
+    suppress_remote: bool = True              # Do not send back entries AFL++ imported from the remote queue
+    max_seed_size: Optional[int] = None       # Size above which queue entries are oversized (None for no limit)
+    oversize_policy: str = "defer"            # Oversized entries: not sent ("skip"), first max_seed_size bytes sent
+                                              # ("truncate"), or sent after all others, one per outbound_interval ("defer")
+    local_sync: bool = False                  # Exchange seeds directly with the agents of the host fuzzing the same target
+    local_sync_size: int = 1 << 30            # Seeds kept in the local exchange of the target
+    # Inbound seeds
+    inbound_filter: bool = True               # Only inject broker seeds bringing new coverage
+    inbound_capacity: int = 10000             # Broker seeds staged before being injected
+    inbound_batch_size: int = 256             # Broker seeds injected every inbound_interval
+    inbound_interval: float = 10
+    # Crashes
+    crash_triage: bool = True                 # Replay crashes and only send the first one of every bucket
+    triage_workers: int = 2
+    triage_timeout: int = 10
+    # sydr-fuzz
+    cores: Optional[int] = None               # Cores to scale on (0 for all available ones), None for 1 AFL++ and 1 Sydr
+    cpus: Optional[List[int]] = None          # CPUs sydr-fuzz is pinned to
+    adaptive_tuning: bool = False             # Retune Sydr/AFL++ every tune_interval from the Sydr yield and AFL++ speed
+    tune_interval: float = 900                # (sydr-fuzz is restarted when they change)
+    max_restarts: int = 5                     # Consecutive restarts after unexpected exits before giving up
+    stop_timeout: float = 60                  # Time given to sydr-fuzz to stop gracefully before it is killed
+    auto_dictionary: bool = True              # Build the AFL++ dictionary from the target binaries and Sydr inputs
+    dictionary_size: int = 256                # Tokens extracted from the target binaries
+
+    @staticmethod
+    def from_dict(data: Dict, reserved: Sequence[str] = ()) -> "DriverOptions":
+        """
+        :param data: options by name
+        :param reserved: options which cannot be given
+        :raise ValueError: if ``data`` has unknown or reserved options
+        """
+        unknown = set(data) - (set(DriverOptions._fields) - set(reserved))
+        if unknown:
+            raise ValueError(f"unknown or reserved driver option(s): {', '.join(sorted(unknown))}")
+        return DriverOptions(**data)
@@ -0,0 +1,310 @@
+# builtin imports
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# third-party imports
+from libpastis.types import SeedType
+
+# Local imports
+from .metrics import Metrics
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class SeedPipeline:
+    """
+    Staged outbound seed pipeline decoupled from the workspace watcher thread:
+
+        submit() -> bounded intake queue -> worker threads (hash, dedup, read)
+                 -> bounded send queue -> sender thread (batches) -> send()
+
+    Seeds are hashed once by ``prepare``, their digest travels with them to ``send``.
+    Prepared seeds which are not sent (send failure, pipeline stopped) are
+    given back to ``release``.
+
+    ``submit`` never blocks: when the intake queue is full the seed path is
+    deferred (paths are cheap to keep, the content stays on disk) and is
+    re-injected as soon as workers have room. When the deferred backlog
+    itself is full, the seed is dropped and accounted for.
+    """
+
+    def __init__(self,
+                 prepare: Callable[[Path, SeedType], Optional[Tuple[bytes, bytes]]],
+                 send: Callable[[SeedType, bytes, bytes], None],
+                 workers: int = 2,
+                 queue_size: int = 1024,
+                 max_deferred: int = 100000,
+                 batch_size: int = 32,
+                 batch_bytes: int = 4 * 1024 * 1024,
+                 batch_latency: float = 0.1,
+                 metrics: Optional[Metrics] = None,
+                 pool: Optional["SeedWorkerPool"] = None,
+                 release: Optional[Callable[[bytes], None]] = None):
+        """
+        :param prepare: hash and deduplicate a seed, return its content and digest or None to skip it
+        :param send: send a seed (content, digest) to the broker
+        :param workers: number of worker threads preparing seeds
+        :param queue_size: capacity of the intake and send queues
+        :param max_deferred: maximum number of deferred seeds before dropping
+        :param batch_size: maximum number of seeds sent per batch
+        :param batch_bytes: maximum cumulated size of a batch
+        :param batch_latency: maximum time (sec) a seed waits for its batch to fill
+        :param metrics: where queueing ("seed.queued") and end-to-end ("seed.pipeline") latencies are recorded
+        :param pool: worker threads shared with other pipelines (``workers`` is then ignored)
+        :param release: called with the digest of a prepared seed which has not been sent
+        """
+        self._prepare = prepare
+        self._send = send
+        self._nb_workers = workers
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.batch_latency = batch_latency
+        self.max_deferred = max_deferred
+        self._metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self._pool = pool
+        self._release = release
+
+        self._intake: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._outbound: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._deferred: deque = deque()
+        self._deferred_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+        # Counters
+        self.submitted = 0
+        self.deferred = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.failed = 0
+        self.sent = 0
+        self.batches = 0
+
+    def start(self) -> None:
+        self._stop.clear()
+        if self._pool is not None:
+            self._pool.attach(self)
+        else:
+            for i in range(self._nb_workers):
+                self._threads.append(threading.Thread(target=self._worker, name=f"SeedWorker-{i}", daemon=True))
+        self._threads.append(threading.Thread(target=self._sender, name="SeedSender", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self, drain_timeout: float = 10) -> None:
+        """ Stop the pipeline once pending seeds are sent (or after ``drain_timeout`` seconds) """
+        if not self._threads:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while self.pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if self.pending:
+            logger.warning(f"Seed pipeline stopped with {self.pending} pending seeds")
+        self._stop.set()
+        if self._pool is not None:
+            self._pool.detach(self)
+        for t in self._threads:
+            t.join()
+        self._threads.clear()
+        # Seeds prepared but not sent
+        while True:
+            try:
+                _, _, digest, _ = self._outbound.get_nowait()
+            except queue.Empty:
+                break
+            self._outbound.task_done()
+            self._unsent(digest)
+        logger.info(f"Seed pipeline stats: {self.stats()}")
+
+    @property
+    def pending(self) -> int:
+        return self._intake.unfinished_tasks + self._outbound.unfinished_tasks + len(self._deferred)
+
+    def stats(self) -> Dict[str, int]:
+        return {"submitted": self.submitted, "deferred": self.deferred, "dropped": self.dropped,
+                "skipped": self.skipped, "failed": self.failed, "sent": self.sent, "batches": self.batches,
+                "backlog": len(self._deferred), "intake": self._intake.qsize(), "outbound": self._outbound.qsize()}
+
+    def submit(self, path: Path, typ: SeedType) -> bool:
+        """
+        Enqueue a seed file without blocking the caller.
+
+        :return: False if the seed has been dropped
+        """
+        self.submitted += 1
+        item = (path, typ, time.perf_counter())
+        self._refill()
+        with self._deferred_lock:
+            if not self._deferred:
+                try:
+                    self._intake.put_nowait(item)
+                    if self._pool is not None:
+                        self._pool.wakeup()
+                    return True
+                except queue.Full:
+                    pass
+            if len(self._deferred) >= self.max_deferred:
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning(f"Seed pipeline saturated, {self.dropped} seed(s) dropped so far")
+                return False
+            self._deferred.append(item)
+            self.deferred += 1
+            return True
+
+    def _refill(self) -> None:
+        """ Move deferred seeds back into the intake queue (keeping their order) """
+        with self._deferred_lock:
+            while self._deferred:
+                try:
+                    self._intake.put_nowait(self._deferred[0])
+                except queue.Full:
+                    return
+                self._deferred.popleft()
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            self._work(timeout=0.1)
+
+    def _work(self, timeout: Optional[float]) -> bool:
+        """
+        Prepare a seed of the intake queue, waiting at most ``timeout`` sec
+        for one (None to not wait).
+
+        :return: False if there was no seed to prepare
+        """
+        try:
+            if timeout is None:
+                path, typ, submitted = self._intake.get_nowait()
+            else:
+                path, typ, submitted = self._intake.get(timeout=timeout)
+        except queue.Empty:
+            self._refill()
+            return False
+        self._metrics.observe("seed.queued", time.perf_counter() - submitted)
+        try:
+            prepared = self._prepare(path, typ)
+            if prepared is None:
+                self.skipped += 1
+                return True
+            raw, digest = prepared
+            # Blocking here propagates backpressure to the intake queue
+            while not self._stop.is_set():
+                try:
+                    self._outbound.put((typ, raw, digest, submitted), timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                self._unsent(digest)
+        except FileNotFoundError:
+            self.skipped += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Seed pipeline: cannot prepare {path}: {e}")
+        finally:
+            self._intake.task_done()
+        return True
+
+    def _unsent(self, digest: bytes) -> None:
+        if self._release is not None:
+            self._release(digest)
+
+    def _next_batch(self) -> List[Tuple[SeedType, bytes, bytes, float]]:
+        try:
+            batch = [self._outbound.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        size = len(batch[0][1])
+        deadline = time.monotonic() + self.batch_latency
+        while len(batch) < self.batch_size and size < self.batch_bytes:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._outbound.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[1])
+        return batch
+
+    def _sender(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            # NOTE: libpastis has no multi-seed message, a batch is sent back-to-back
+            for typ, raw, digest, submitted in batch:
+                try:
+                    self._send(typ, raw, digest)
+                    self.sent += 1
+                    self._metrics.observe("seed.pipeline", time.perf_counter() - submitted)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Seed pipeline: cannot send seed: {e}")
+                    self._unsent(digest)
+                finally:
+                    self._outbound.task_done()
+            self.batches += 1
+
+
+class SeedWorkerPool:
+    """
+    Worker threads preparing (hashing, deduplicating, reading) the seeds of
+    several pipelines, so that the number of threads does not grow with the
+    number of campaigns. Pipelines are served in turn, a pipeline whose send
+    queue is full is skipped until its sender catches up.
+    """
+
+    def __init__(self, workers: int = 4):
+        self._nb_workers = workers
+        self._pipelines: List[SeedPipeline] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self._nb_workers):
+            self._threads.append(threading.Thread(target=self._worker, name=f"SeedWorker-{i}", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join()
+        self._threads.clear()
+
+    def attach(self, pipeline: SeedPipeline) -> None:
+        with self._lock:
+            self._pipelines = self._pipelines + [pipeline]
+
+    def detach(self, pipeline: SeedPipeline) -> None:
+        with self._lock:
+            self._pipelines = [p for p in self._pipelines if p is not pipeline]
+
+    def wakeup(self) -> None:
+        self._wakeup.set()
+
+    def _worker(self) -> None:
+        turn = 0
+        while not self._stop.is_set():
+            self._wakeup.clear()  # Before looking for work, not to miss a wakeup
+            pipelines = self._pipelines
+            busy = False
+            for i in range(len(pipelines)):
+                pipeline = pipelines[(turn + i) % len(pipelines)]
+                if not pipeline._outbound.full():
+                    busy |= pipeline._work(timeout=None)
+            turn += 1
+            if not busy:
+                self._wakeup.wait(0.1)
@@ -0,0 +1,244 @@
+# builtin imports
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# third-party imports
+from libpastis import BinaryPackage
+from libpastis.types import Arch, Platform
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class _InvalidPackage(Exception):
+    """ The package was rejected by BinaryPackage.from_binary (not a cache failure) """
+
+
+class PackageCache:
+    """
+    Host-wide cache of unpacked target packages (executable, cmplog binary,
+    Sydr target, dictionary...), keyed by the hash of the package. Agents
+    of the host share it: it is guarded by a lock file (flock), entries are
+    unpacked aside and renamed into place, and the least recently used ones
+    are evicted above ``max_size``.
+
+    Workspaces get hardlinks to the cached files (copies across
+    filesystems), thus evicting an entry never breaks a running campaign.
+    Cached files must not be modified in place: their modes are set when
+    they are inserted (binaries executable by all the agents of the host).
+    """
+
+    CACHE_ENV_VAR = "SYDR_PKG_CACHE"
+    DEFAULT_CACHE_PATH = "sydr_package_cache"
+    LOCK_FILE = ".lock"
+    MANIFEST_FILE = "manifest.json"
+    FILES_DIR = "files"
+    TMP_PREFIX = ".tmp-"
+    STALE_TMP_AGE = 3600  # sec, unpacking leftovers of crashed agents
+    EXEC_MODE = stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH
+    DATA_SUFFIXES = [".dict"]
+
+    def __init__(self, root: Optional[Path] = None, max_size: int = 4 << 30):
+        """
+        :param root: cache directory (default: SYDR_PKG_CACHE, or sydr_package_cache in the temporary directory)
+        :param max_size: size (bytes) above which least recently used entries are evicted
+        """
+        if root is None:
+            root = os.environ.get(self.CACHE_ENV_VAR, Path(tempfile.gettempdir()) / self.DEFAULT_CACHE_PATH)
+        self.root = Path(root)
+        self.max_size = max_size
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "errors": self.errors}
+
+    @staticmethod
+    def key(name: str, binary: bytes) -> str:
+        """ Cache key of a package (the name selects the executable of an archive) """
+        h = hashlib.sha256(binary)
+        h.update(b"\0" + name.encode())
+        return h.hexdigest()[:32]
+
+    def unpack(self, name: str, binary: bytes, extract_dir: Path) -> BinaryPackage:
+        """
+        Same as BinaryPackage.from_binary, through the cache. If the cache
+        cannot be used, the package is unpacked directly in ``extract_dir``.
+
+        :raise FileNotFoundError: if the mime type of the binary is not recognized
+        :raise ValueError: if the executable is not found in the archive
+        """
+        extract_dir = Path(extract_dir)
+        key = self.key(name, binary)
+        t0 = time.perf_counter()
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with self._locked(fcntl.LOCK_SH):
+                manifest = self._lookup(key, extract_dir)
+            if manifest is None:
+                self.misses += 1
+                manifest = self._insert(key, name, binary, extract_dir)
+            else:
+                self.hits += 1
+        except _InvalidPackage as e:
+            raise e.__cause__
+        except OSError as e:
+            self.errors += 1
+            logger.warning(f"Package cache {self.root} unusable, unpack directly: {e}")
+            return BinaryPackage.from_binary(name, binary, extract_dir)
+        logger.info(f"Package {name} ({key}) ready in {time.perf_counter() - t0:.3f}s "
+                    f"[{self.hits} hits, {self.misses} misses]")
+        return self._package(manifest, extract_dir)
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        with open(self.root / self.LOCK_FILE, "a") as lock:
+            fcntl.flock(lock.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _lookup(self, key: str, extract_dir: Path) -> Optional[Dict]:
+        """ Link a cached entry into ``extract_dir`` (lock held) """
+        entry = self.root / key
+        try:
+            manifest = json.loads((entry / self.MANIFEST_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if "layout" not in manifest:
+            return None  # Entry of a previous version, replaced
+        self._link_tree(entry / self.FILES_DIR, extract_dir)
+        os.utime(entry / self.MANIFEST_FILE)  # Most recently used
+        return manifest
+
+    def _insert(self, key: str, name: str, binary: bytes, extract_dir: Path) -> Dict:
+        # Unpack out of the lock, other agents keep using the cache meanwhile
+        tmp = Path(tempfile.mkdtemp(prefix=self.TMP_PREFIX, dir=self.root))
+        try:
+            files = tmp / self.FILES_DIR
+            files.mkdir()
+            try:
+                pkg = BinaryPackage.from_binary(name, binary, files)
+            except (FileNotFoundError, ValueError) as e:
+                raise _InvalidPackage() from e
+            self._set_modes(files)
+            manifest = {"name": name,
+                        "size": sum(p.stat().st_size for p in files.rglob("*") if p.is_file()),
+                        "layout": self._layout(pkg, files)}
+            (tmp / self.MANIFEST_FILE).write_text(json.dumps(manifest))
+            with self._locked(fcntl.LOCK_EX):
+                manifest = self._lookup(key, extract_dir)
+                if manifest is not None:
+                    logger.debug(f"Package {key} cached concurrently by another agent")
+                    return manifest
+                entry = self.root / key
+                if entry.exists():
+                    shutil.rmtree(entry)  # Incomplete or corrupted entry
+                tmp.rename(entry)
+                self._evict(keep=key)
+                return self._lookup(key, extract_dir)
+        finally:
+            if tmp.exists():
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """ (last use, size, path) of the cached entries """
+        entries = []
+        for entry in self.root.iterdir():
+            if entry.name.startswith(self.TMP_PREFIX):
+                if time.time() - entry.stat().st_mtime > self.STALE_TMP_AGE:
+                    shutil.rmtree(entry, ignore_errors=True)
+                continue
+            if not entry.is_dir():
+                continue
+            try:
+                manifest_file = entry / self.MANIFEST_FILE
+                manifest = json.loads(manifest_file.read_text())
+                entries.append((manifest_file.stat().st_mtime, manifest["size"], entry))
+            except (OSError, ValueError, KeyError):
+                shutil.rmtree(entry, ignore_errors=True)  # Incomplete or corrupted
+        return entries
+
+    def _evict(self, keep: str) -> None:
+        """ Remove least recently used entries until the cache fits in max_size (exclusive lock held) """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            if entry.name == keep:
+                continue
+            logger.info(f"Evict package {entry.name} from the cache ({size} bytes)")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def _set_modes(self, files: Path) -> None:
+        """ Make the unpacked binaries (eg: Sydr target of an archive) executable """
+        for file in files.rglob("*"):
+            if file.is_file() and not file.is_symlink() and file.suffix not in self.DATA_SUFFIXES:
+                mode = stat.S_IMODE(file.stat().st_mode)
+                if mode & self.EXEC_MODE != self.EXEC_MODE:
+                    file.chmod(mode | self.EXEC_MODE)
+
+    def _link_tree(self, src: Path, dst: Path) -> None:
+        for dirpath, dirnames, filenames in os.walk(src):
+            target = dst / Path(dirpath).relative_to(src)
+            target.mkdir(parents=True, exist_ok=True)
+            for filename in filenames:
+                self._link(Path(dirpath) / filename, target / filename)
+
+    @staticmethod
+    def _link(src: Path, dst: Path) -> None:
+        try:
+            os.link(src, dst)
+        except FileExistsError:
+            pass
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EACCES):
+                raise
+            shutil.copy2(src, dst)
+
+    @staticmethod
+    def _layout(pkg: BinaryPackage, files: Path) -> Dict:
+        """ Files of the package unpacked in ``files``, relative to it """
+        def rel(path: Optional[Path]) -> Optional[str]:
+            return str(Path(path).relative_to(files)) if path is not None else None
+        return {"executable": rel(pkg.executable_path), "cmplog": rel(pkg.cmplog), "dictionary": rel(pkg.dictionary),
+                "quokka": rel(pkg.quokka), "callgraph": rel(pkg.callgraph),
+                "other_files": [rel(f) for f in pkg.other_files],
+                "arch": pkg.arch.name if pkg.arch else None, "platform": pkg.platform.name if pkg.platform else None}
+
+    @staticmethod
+    def _package(manifest: Dict, extract_dir: Path) -> BinaryPackage:
+        """
+        Package of the files linked in ``extract_dir``, as BinaryPackage.from_binary
+        built it. It is rebuilt from the manifest: BinaryPackage.auto would chmod the
+        cached files through their links.
+        """
+        layout = manifest["layout"]
+
+        def path(rel: Optional[str]) -> Optional[Path]:
+            return extract_dir / rel if rel is not None else None
+        pkg = BinaryPackage(path(layout["executable"]))
+        pkg._cmplog, pkg._dictionary = path(layout["cmplog"]), path(layout["dictionary"])
+        pkg._quokka, pkg._callgraph = path(layout["quokka"]), path(layout["callgraph"])
+        pkg.other_files = [path(f) for f in layout["other_files"]]
+        pkg._arch = Arch[layout["arch"]] if layout["arch"] else None
+        pkg._platform = Platform[layout["platform"]] if layout["platform"] else None
+        return pkg
@@ -0,0 +1,131 @@
+# builtin imports
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+# cProfile is built on sys.monitoring from Python 3.12: a profiler sees the calls of all threads,
+# before it only sees the thread enabling it (and the threads started afterwards, through threading.setprofile)
+CPROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class Profiler:
+    """
+    Profile the agent for a time window and dump the result in ``output_dir``.
+
+    - "sampling": every ``interval`` sec, record the stack of every thread
+      (sys._current_frames). Low overhead, covers all threads. Dumps folded
+      stacks (flamegraph.pl / speedscope format) and a top of functions.
+    - "cprofile": deterministic profiling of all threads. Dumps a pstats
+      file. It needs Python >= 3.12: older versions cannot profile threads
+      which are already running (all the agent threads), "sampling" is then
+      used instead.
+    """
+
+    MODES = ["sampling", "cprofile"]
+
+    def __init__(self, mode: str, output_dir: Path, delay: float = 0, duration: float = 60, interval: float = 0.01):
+        """
+        :param mode: one of MODES
+        :param output_dir: directory where profiles are written
+        :param delay: time (sec) before the window opens
+        :param duration: length (sec) of the window
+        :param interval: sampling period (sec)
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid profiler mode {mode} (expected one of {self.MODES})")
+        if mode == "cprofile" and not CPROFILE_ALL_THREADS:
+            logger.warning("cProfile cannot profile running threads before Python 3.12, use the sampling profiler")
+            mode = "sampling"
+        self.mode = mode
+        self.output_dir = Path(output_dir)
+        self.delay = delay
+        self.duration = duration
+        self.interval = interval
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="Profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Close the window early (if still open) and dump """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        if self._stop.wait(self.delay):
+            return
+        logger.info(f"Profiler ({self.mode}) started for {self.duration}s")
+        if self.mode == "sampling":
+            self._sample()
+        else:
+            self._enable_cprofile()
+            self._stop.wait(self.duration)
+            self._disable_cprofile()
+        self._dump()
+
+    # Sampling profiler
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline and not self._stop.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self._samples += 1
+
+    # cProfile (Python >= 3.12)
+    def _enable_cprofile(self) -> None:
+        # A single profiler: they are exclusive since they use sys.monitoring, which covers all threads
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def _disable_cprofile(self) -> None:
+        self._profile.disable()
+
+    def _dump(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / f"profile-{os.getpid()}-{int(time.time())}"
+        if self.mode == "sampling":
+            with open(f"{base}.folded", "w") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            # Self samples per function
+            top = Counter()
+            for stack, count in self._stacks.items():
+                top[stack.rsplit(";", 1)[-1]] += count
+            with open(f"{base}.txt", "w") as f:
+                f.write(f"{self._samples} samples every {self.interval * 1000:.0f}ms, self samples per function summed over threads\n")
+                for func, count in top.most_common(50):
+                    f.write(f"{count:8} {count / max(1, self._samples) * 100:6.1f}%  {func}\n")
+            logger.info(f"Sampling profile written to {base}.folded ({self._samples} samples)")
+        else:
+            pstats.Stats(self._profile).dump_stats(f"{base}.prof")
+            logger.info(f"cProfile stats written to {base}.prof")
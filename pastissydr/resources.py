@@ -0,0 +1,283 @@
+# builtin imports
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+MiB = 1024 * 1024
+
+
+class HostResources(NamedTuple):
+    cpus: float   # CPUs usable by the agent (affinity and cgroup quota)
+    memory: int   # Memory usable by the agent (bytes, available memory and cgroup limit)
+
+    @staticmethod
+    def detect() -> "HostResources":
+        cpus = float(len(os.sched_getaffinity(0)))
+        quota = cgroup_cpu_limit()
+        if quota is not None:
+            cpus = min(cpus, quota)
+
+        info = meminfo()
+        memory = info.get("MemAvailable", info.get("MemTotal", 0))
+        limit = cgroup_memory_limit()
+        if limit is not None:
+            memory = min(memory, limit) if memory else limit
+        return HostResources(cpus, memory)
+
+
+def _cgroup_dir() -> Optional[Path]:
+    """ cgroup v2 directory of the current process """
+    try:
+        for line in Path("/proc/self/cgroup").read_text().splitlines():
+            hierarchy, controllers, path = line.split(":", 2)
+            if hierarchy == "0" and controllers == "":
+                d = CGROUP_ROOT / path.lstrip("/")
+                return d if d.is_dir() else CGROUP_ROOT
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """ CPU quota (in CPUs) of the current cgroup, None if unlimited """
+    v2 = _cgroup_dir()
+    if v2 is not None:
+        value = _read(v2 / "cpu.max")  # "<quota> <period>" or "max <period>"
+        if value and not value.startswith("max"):
+            quota, period = value.split()
+            return int(quota) / int(period)
+        return None
+    quota = _read(CGROUP_ROOT / "cpu" / "cpu.cfs_quota_us") or _read(CGROUP_ROOT / "cpu,cpuacct" / "cpu.cfs_quota_us")
+    period = _read(CGROUP_ROOT / "cpu" / "cpu.cfs_period_us") or _read(CGROUP_ROOT / "cpu,cpuacct" / "cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cgroup_memory_limit() -> Optional[int]:
+    """ Memory limit (bytes) of the current cgroup, None if unlimited """
+    v2 = _cgroup_dir()
+    if v2 is not None:
+        limit = _read(v2 / "memory.max")
+    else:
+        limit = _read(CGROUP_ROOT / "memory" / "memory.limit_in_bytes")
+    if not limit or limit == "max" or int(limit) >= 1 << 60:  # v1 reports "no limit" as a huge value
+        return None
+    return int(limit)
+
+
+def meminfo() -> Dict[str, int]:
+    info = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                info[key] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return info
+
+
+class SydrTuning(NamedTuple):
+    """ Sydr and AFL++ parameters of a sydr-fuzz run (defaults are the historical values) """
+    solving_timeout: int = 60   # Sydr -s (sec)
+    memory_limit: int = 8192    # Sydr -m (MiB)
+    wait_jobs: int = 300        # Sydr --wait-jobs (sec)
+    timeout: int = 180          # Sydr run timeout (sec)
+    sleep_time: int = 10        # sydr-fuzz sleep-time (sec)
+    afl_timeout: str = "1000+"  # AFL++ -t (ms, "+" to skip timeouting seeds)
+    afl_memory: str = "none"    # AFL++ -m
+
+    @property
+    def sydr_args(self) -> str:
+        return f"-s {self.solving_timeout} -m {self.memory_limit} --wait-jobs {self.wait_jobs}"
+
+    @property
+    def afl_args(self) -> str:
+        return f"-t {self.afl_timeout} -m {self.afl_memory}"
+
+
+class ResourceManager:
+    """
+    Derive sydr-fuzz parameters from the host resources, and adjust them
+    from the observed Sydr yield (inputs kept per job-minute) and AFL++
+    execution speed.
+    """
+
+    MIN_SYDR_MEMORY = 1024    # MiB
+    MAX_SYDR_MEMORY = 8192    # MiB
+    SYDR_MEMORY_SHARE = 0.6   # Share of the memory given to Sydr jobs, the rest goes to AFL++ and the agent
+    MIN_SOLVING_TIMEOUT = 10
+    MAX_SOLVING_TIMEOUT = 300
+    LOW_YIELD = 0.05          # Inputs kept per job-minute
+    HIGH_YIELD = 1.0
+    SYDR_SLOWDOWN = 1000      # Symbolic execution of an input vs. a native AFL++ execution
+    MIN_AFL_TIMEOUT = 1000    # ms, historical AFL++ timeout
+    MAX_AFL_TIMEOUT = 5000    # ms
+    MAX_SYDR_TIMEOUT = 600    # sec
+
+    def __init__(self, resources: Optional[HostResources] = None):
+        self.resources = resources if resources is not None else HostResources.detect()
+
+    def plan(self, sydr_jobs: int) -> Tuple[int, SydrTuning]:
+        """
+        :param sydr_jobs: requested number of Sydr jobs
+        :return: number of Sydr jobs that fit in memory, initial parameters
+        """
+        budget = int(self.resources.memory * self.SYDR_MEMORY_SHARE) // MiB
+        jobs = max(1, min(sydr_jobs, budget // self.MIN_SYDR_MEMORY)) if budget else sydr_jobs
+        if jobs < sydr_jobs:
+            logger.warning(f"Not enough memory for {sydr_jobs} Sydr jobs, run {jobs}")
+        memory = min(self.MAX_SYDR_MEMORY, max(self.MIN_SYDR_MEMORY, budget // jobs)) if budget else self.MAX_SYDR_MEMORY
+
+        # With several jobs, poll the queue more often so that jobs are not idle
+        sleep_time = max(2, 10 // jobs)
+        tuning = SydrTuning(memory_limit=memory, sleep_time=sleep_time)
+        logger.info(f"Resources: {self.resources.cpus:g} CPUs, {self.resources.memory // MiB} MiB -> "
+                    f"{jobs} Sydr jobs, {tuning.sydr_args}, sleep-time {sleep_time}")
+        return jobs, tuning
+
+    def retune(self, tuning: SydrTuning, sydr_yield: Optional[float], exec_per_sec: Optional[float]) -> SydrTuning:
+        """
+        :param tuning: current parameters
+        :param sydr_yield: inputs kept per Sydr job-minute since the last tuning
+        :param exec_per_sec: AFL++ executions per second of a single instance
+        :return: new parameters
+        """
+        if sydr_yield is not None:
+            if sydr_yield < self.LOW_YIELD:
+                # Solving rarely pays off: spend less time per input to go through more of them
+                solving = max(self.MIN_SOLVING_TIMEOUT, int(tuning.solving_timeout / 1.5))
+            elif sydr_yield > self.HIGH_YIELD:
+                # Solving pays off: let queries go deeper
+                solving = min(self.MAX_SOLVING_TIMEOUT, int(tuning.solving_timeout * 1.5))
+            else:
+                solving = tuning.solving_timeout
+            tuning = tuning._replace(solving_timeout=solving, wait_jobs=max(solving * 5, 60))
+
+        if exec_per_sec:
+            # Give slow targets more time, keep AFL++ auto-calibration ("+")
+            exec_ms = 1000 / exec_per_sec
+            afl_timeout = int(min(self.MAX_AFL_TIMEOUT, max(self.MIN_AFL_TIMEOUT, exec_ms * 50)))
+            # Sydr run timeout is only raised for targets too slow for the default one
+            sydr_timeout = int(min(self.MAX_SYDR_TIMEOUT, max(SydrTuning().timeout, exec_ms / 1000 * self.SYDR_SLOWDOWN)))
+            tuning = tuning._replace(afl_timeout=f"{afl_timeout}+", timeout=sydr_timeout)
+        return tuning
+
+
+class ResourceTuner:
+    """
+    Periodically measure Sydr yield and AFL++ speed, and apply new
+    parameters (by restarting sydr-fuzz) when they changed significantly.
+    A restart throws away the in-memory state of AFL++ (calibration,
+    scheduling), restarts are at least ``min_restart_interval`` sec apart.
+    """
+
+    def __init__(self, manager: ResourceManager, tuning: SydrTuning, sydr_jobs: int,
+                 measure: Callable[[], Tuple[int, Optional[float]]], apply: Callable[[SydrTuning], None],
+                 interval: float = 900, min_change: float = 0.25, pinned: Iterable[str] = (),
+                 min_restart_interval: float = 3600):
+        """
+        :param manager: resource manager computing the new parameters
+        :param tuning: parameters of the current run
+        :param sydr_jobs: number of Sydr jobs
+        :param measure: return (number of inputs kept by Sydr so far, AFL++ exec/s per instance)
+        :param apply: restart sydr-fuzz with new parameters
+        :param interval: time (sec) between two measures
+        :param min_change: minimum relative change of a parameter triggering a restart
+        :param pinned: parameters which are never changed
+        :param min_restart_interval: minimum time (sec) between two restarts
+        """
+        self.manager = manager
+        self.tuning = tuning
+        self.sydr_jobs = sydr_jobs
+        self._measure = measure
+        self._apply = apply
+        self.interval = interval
+        self.min_change = min_change
+        self.pinned = pinned
+        self.min_restart_interval = min_restart_interval
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._last = (time.monotonic(), 0)
+        self._last_restart = time.monotonic()  # sydr-fuzz (re)start
+        self.restarts = 0
+        self.deferred = 0  # Significant changes not applied yet (rate limit)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._last = (time.monotonic(), self._measure()[0])
+        self._last_restart = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="ResourceTuner", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.tune()
+            except Exception as e:
+                logger.error(f"Resource tuning failed: {e}")
+
+    @staticmethod
+    def _number(value) -> float:
+        if isinstance(value, str):
+            value = value.rstrip("+")
+            return float(value) if value.isdigit() else 0.0
+        return float(value)
+
+    def _significant(self, new: SydrTuning) -> List[str]:
+        """ Parameters which changed significantly """
+        changed = []
+        for name, old_value, new_value in zip(SydrTuning._fields, self.tuning, new):
+            old_value, new_value = self._number(old_value), self._number(new_value)
+            if abs(new_value - old_value) > self.min_change * max(abs(old_value), 1):
+                changed.append(name)
+        return changed
+
+    def tune(self) -> None:
+        now = time.monotonic()
+        kept, exec_per_sec = self._measure()
+        then, kept_before = self._last
+        self._last = (now, kept)
+        job_minutes = self.sydr_jobs * (now - then) / 60
+        sydr_yield = (kept - kept_before) / job_minutes if job_minutes > 0 else None
+
+        new = self.manager.retune(self.tuning, sydr_yield, exec_per_sec)
+        logger.info(f"Resource tuning: Sydr yield {sydr_yield if sydr_yield is None else round(sydr_yield, 3)} "
+                    f"inputs/job-min, AFL++ {exec_per_sec} exec/s")
+        changed = [name for name in self._significant(new) if name not in self.pinned]
+        if not changed:
+            return
+        if now - self._last_restart < self.min_restart_interval:
+            self.deferred += 1
+            logger.info(f"Defer the restart of sydr-fuzz ({', '.join(changed)} changed), "
+                        f"last restart {now - self._last_restart:.0f} sec ago")
+            return
+        # Small drifts of the other parameters are not worth a restart, they are not applied
+        new = self.tuning._replace(**{name: getattr(new, name) for name in changed})
+        logger.warning(f"Restart sydr-fuzz with new parameters: {new}")
+        self.tuning = new
+        self.restarts += 1
+        self._apply(new)
+        self._last_restart = time.monotonic()
+        self._last = (self._last_restart, self._measure()[0])
@@ -0,0 +1,217 @@
+# builtin imports
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Local imports
+from .metrics import Metrics
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class QueueEntry(NamedTuple):
+    id: Optional[int]      # Queue id (None if the name is not an AFL++ one)
+    src: Tuple[int, ...]   # Parent entries
+    time: Optional[int]    # Time found (ms since the start of the instance)
+    op: Optional[str]      # Mutation stage
+    cov: bool              # Found new edges ("+cov"), not just new hit counts
+    sync: Optional[str]    # Instance it was imported from
+    orig: bool             # Initial input
+
+    @staticmethod
+    def parse(name: str) -> "QueueEntry":
+        """ Parse AFL++ queue entry names (eg: id:000042,src:000003+000007,time:1234,execs:5678,op:splice,rep:2,+cov) """
+        fields = {}
+        cov = False
+        for part in name.split(","):
+            if part == "+cov":
+                cov = True
+            elif ":" in part:
+                key, value = part.split(":", 1)
+                fields[key] = value
+        try:
+            id = int(fields["id"]) if "id" in fields else None
+            src = tuple(int(x) for x in fields["src"].split("+")) if "src" in fields else ()
+            found = int(fields["time"]) if "time" in fields else None
+        except ValueError:
+            id, src, found = None, (), None
+        return QueueEntry(id, src, found, fields.get("op"), cov, fields.get("sync"), "orig" in fields)
+
+
+class OutboundScheduler:
+    """
+    Order outbound queue entries by value instead of arrival: entries which
+    found new edges, come from Sydr, or are small are sent first. Every
+    ``interval`` sec, at most ``budget`` entries are released to the seed
+    pipeline, the rest waits (up to ``capacity`` entries, the lowest scored
+    ones are shed). With no budget, entries are released as they come.
+
+    Entries AFL++ imported from the remote queue (seeds received from the
+    broker) can be suppressed before being read. Entries imported from the
+    local queue (seeds of the other agents of the host) are always
+    suppressed, their agent sends them.
+
+    Entries larger than ``defer_size`` are deferred: they are released one
+    per ``interval`` sec, and only when no other entry waits, so that large
+    seeds do not hold back small ones.
+    """
+
+    SYDR_WORKER = "sydr-worker"
+    REMOTE_WORKER = "remote-worker"
+    LOCAL_WORKER = "local-worker"
+
+    # Score weights
+    COVERAGE = 4.0     # New edges
+    SYDR = 3.0         # Solved by Sydr (new branch direction)
+    NEW_BITS = 1.0     # Kept by AFL++ for new hit counts only
+    SYNCED = -2.0      # Imported from another local instance (most likely sent already)
+    ORIGINAL = -4.0    # Initial input
+    SIZE = 0.25        # Penalty per power of two of the size
+
+    def __init__(self, release: Callable[[Path], None], budget: Optional[int] = None, interval: float = 1,
+                 capacity: int = 100000, suppress_remote: bool = True, defer_size: Optional[int] = None,
+                 metrics: Optional[Metrics] = None):
+        """
+        :param release: callback sending an entry (to the seed pipeline)
+        :param budget: maximum number of entries released every ``interval`` sec (None for no limit)
+        :param interval: time (sec) between releases
+        :param capacity: maximum number of entries waiting for release
+        :param suppress_remote: drop entries AFL++ imported from the remote queue
+        :param defer_size: size (bytes) above which entries are deferred (None to not defer any)
+        :param metrics: where scheduling latency ("seed.scheduled") is recorded
+        """
+        self._release = release
+        self.budget = budget
+        self.interval = interval
+        self.capacity = capacity
+        self.suppress_remote = suppress_remote
+        self.defer_size = defer_size
+        self._metrics = metrics if metrics is not None else Metrics(enabled=False)
+
+        self._items: List[Tuple[float, int, float, Path]] = []  # Sorted, best first
+        self._deferred: deque = deque()  # (scheduled at, path) of oversized entries, oldest first
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters
+        self.scheduled = 0
+        self.released = 0
+        self.suppressed = 0
+        self.shed = 0
+        self.coverage = 0
+        self.sydr = 0
+        self.deferred = 0
+
+    def start(self) -> None:
+        if self.budget is None and self.defer_size is None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="OutboundScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True) -> None:
+        """ Stop releasing, and release all waiting entries if ``flush`` """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self._release_batch(len(self._items))
+            self._release_deferred(len(self._deferred))
+        logger.info(f"Outbound scheduler stats: {self.stats()}")
+
+    @property
+    def depth(self) -> int:
+        return len(self._items) + len(self._deferred)
+
+    def stats(self) -> Dict[str, int]:
+        return {"depth": self.depth, "scheduled": self.scheduled, "released": self.released,
+                "suppressed": self.suppressed, "shed": self.shed, "coverage": self.coverage, "sydr": self.sydr,
+                "deferred": self.deferred}
+
+    def from_sydr(self, path: Path) -> bool:
+        return path.parent.parent.name == self.SYDR_WORKER
+
+    def score(self, path: Path, entry: QueueEntry, size: int) -> float:
+        """ Value of an entry, higher is better """
+        if entry.orig:
+            return self.ORIGINAL
+        score = 0.0
+        if entry.cov:
+            score += self.COVERAGE
+        elif entry.id is not None and not entry.sync:
+            score += self.NEW_BITS
+        if self.from_sydr(path):
+            score += self.SYDR
+        elif entry.sync:
+            # Copy of an entry of another instance (Sydr inputs included), which is sent from there
+            score += self.SYNCED
+        return score - self.SIZE * size.bit_length()
+
+    def submit(self, path: Path) -> None:
+        path = Path(path)
+        entry = QueueEntry.parse(path.name)
+        if (self.suppress_remote and entry.sync == self.REMOTE_WORKER) or entry.sync == self.LOCAL_WORKER:
+            self.suppressed += 1
+            return
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            return
+        score = self.score(path, entry, size)
+        self.scheduled += 1
+        self.coverage += entry.cov
+        self.sydr += self.from_sydr(path)
+        if self.defer_size is not None and size > self.defer_size:
+            with self._lock:
+                self._deferred.append((time.perf_counter(), path))
+                self.deferred += 1
+                if len(self._deferred) > self.capacity:
+                    self._deferred.popleft()
+                    self.shed += 1
+            return
+        if self.budget is None:
+            self._release(path)
+            self.released += 1
+            return
+        with self._lock:
+            self._seq += 1
+            bisect.insort(self._items, (-score, self._seq, time.perf_counter(), path))
+            if len(self._items) > self.capacity:
+                self._items.pop()  # Lowest score
+                self.shed += 1
+                if self.shed % 1000 == 1:
+                    logger.warning(f"Outbound scheduler full ({self.capacity}), {self.shed} entries shed so far")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.budget is not None:
+                self._release_batch(self.budget)
+            if not self._items:
+                self._release_deferred(1)
+
+    def _release_batch(self, count: int) -> None:
+        with self._lock:
+            batch = self._items[:count]
+            del self._items[:count]
+        now = time.perf_counter()
+        for _, _, scheduled_at, path in batch:
+            self._release(path)
+            self.released += 1
+            self._metrics.observe("seed.scheduled", now - scheduled_at)
+
+    def _release_deferred(self, count: int) -> None:
+        with self._lock:
+            batch = [self._deferred.popleft() for _ in range(min(count, len(self._deferred)))]
+        now = time.perf_counter()
+        for scheduled_at, path in batch:
+            self._release(path)
+            self.released += 1
+            self._metrics.observe("seed.scheduled", now - scheduled_at)
@@ -0,0 +1,86 @@
+# builtin imports
+import hashlib
+import mmap
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+DIGEST_NAME = "blake2b"  # Stored in the seed index (at most 8 characters)
+DIGEST_SIZE = 16         # 128-bit BLAKE2b, faster than MD5 on 64-bit CPUs
+MMAP_THRESHOLD = 64 * 1024
+OVERSIZE_POLICIES = ["skip", "truncate", "defer"]  # Outbound queue entries larger than the maximum seed size
+
+
+def digest_seed(seed: Union[bytes, memoryview, mmap.mmap]) -> bytes:
+    return hashlib.blake2b(seed, digest_size=DIGEST_SIZE).digest()
+
+
+def digest_file(file: Union[str, Path]) -> bytes:
+    with SeedFile(file) as seed:
+        return seed.digest()
+
+
+class SeedFile:
+    """
+    Seed file opened once: hashed in a single pass, from memory for small
+    files and through a memory mapping for large ones, whose content is
+    only copied when it is actually needed (eg: to be sent).
+
+    If ``limit`` is given, only the first ``limit`` bytes are considered
+    (hashed and returned), the seed is then truncated.
+    """
+
+    def __init__(self, path: Union[str, Path], limit: Optional[int] = None):
+        self.path = Path(path)
+        self._fd = os.open(self.path, os.O_RDONLY)
+        try:
+            self.size = os.fstat(self._fd).st_size
+        except OSError:
+            os.close(self._fd)
+            raise
+        self.length = self.size if limit is None else min(self.size, limit)
+        self._data: Optional[bytes] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._digest: Optional[bytes] = None
+
+    def __enter__(self) -> "SeedFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def truncated(self) -> bool:
+        return self.length < self.size
+
+    def _view(self) -> Union[bytes, memoryview]:
+        if self.length < MMAP_THRESHOLD or self.length == 0:
+            if self._data is None:
+                self._data = os.pread(self._fd, self.length, 0)
+            return self._data
+        if self._mm is None:
+            self._mm = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mm)[:self.length]
+
+    def digest(self) -> bytes:
+        if self._digest is None:
+            view = self._view()
+            self._digest = digest_seed(view)
+            if isinstance(view, memoryview):
+                view.release()
+        return self._digest
+
+    def read(self) -> bytes:
+        view = self._view()
+        if isinstance(view, bytes):
+            return view
+        try:
+            return view.tobytes()
+        finally:
+            view.release()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        os.close(self._fd)
@@ -0,0 +1,195 @@
+# builtin imports
+import logging
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class SeedIndex:
+    """
+    Compact set of seed digests with per-seed flags (received from the broker,
+    sent to the broker).
+
+    Digests are stored raw in an open-addressing hash table (linear probing)
+    laid out in a memory-mapped file, so the index survives restarts and its
+    resident memory is managed by the kernel page cache. An optional Bloom
+    filter kept in memory answers most negative lookups without touching the
+    table.
+    """
+
+    MAGIC = b"SYDRIDX1"
+    HEADER = struct.Struct("<8s8sQQ")  # magic, digest name, capacity, count
+    DIGEST_SIZE = 16
+    SLOT_SIZE = DIGEST_SIZE + 1        # digest + flags (0 means empty slot)
+    MAX_LOAD = 0.7
+
+    RECEIVED = 0x1
+    SENT = 0x2
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, capacity: int = 1 << 16, digest_name: str = "md5", bloom_bits: int = 0):
+        """
+        :param path: file backing the index, anonymous memory if None
+        :param capacity: initial number of slots (rounded to a power of two)
+        :param digest_name: name of the digest algorithm stored in the index
+        :param bloom_bits: size of the Bloom filter front, rounded to a power of two (0 to disable)
+        """
+        self.path = Path(path) if path is not None else None
+        self.digest_name = digest_name
+        self._lock = threading.Lock()
+        if bloom_bits > 0:
+            bloom_bits = max(8, 1 << (bloom_bits - 1).bit_length())  # Power of two to mask positions
+        self._bloom = bytearray(bloom_bits // 8) if bloom_bits > 0 else None
+        self._bloom_mask = (len(self._bloom) * 8 - 1) if self._bloom is not None else 0
+        self._mm = None
+        self._capacity = 0
+        self._count = 0
+
+        if self.path is not None and self.path.exists() and self.path.stat().st_size >= self.HEADER.size:
+            self._open_existing()
+        else:
+            self._capacity = self._round_capacity(capacity)
+            self._mm = self._create(self.path, self._capacity)
+
+    @staticmethod
+    def _round_capacity(capacity: int) -> int:
+        return 1 << max(4, (capacity - 1).bit_length())
+
+    def _create(self, path: Optional[Path], capacity: int) -> mmap.mmap:
+        size = self.HEADER.size + capacity * self.SLOT_SIZE
+        if path is None:
+            mm = mmap.mmap(-1, size)
+        else:
+            with open(path, "wb+") as f:
+                f.truncate(size)
+                mm = mmap.mmap(f.fileno(), size)
+        self.HEADER.pack_into(mm, 0, self.MAGIC, self.digest_name.encode()[:8], capacity, 0)
+        return mm
+
+    def _open_existing(self) -> None:
+        with open(self.path, "rb+") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        magic, digest_name, capacity, _ = self.HEADER.unpack_from(mm, 0)
+        digest_name = digest_name.rstrip(b"\0").decode()
+        if magic != self.MAGIC or len(mm) != self.HEADER.size + capacity * self.SLOT_SIZE or digest_name != self.digest_name:
+            logger.warning(f"Seed index {self.path} is invalid or uses another digest ({digest_name}), reset it")
+            mm.close()
+            self._capacity = self._round_capacity(1 << 16)
+            self._mm = self._create(self.path, self._capacity)
+            return
+
+        # Count is recomputed as the header may be stale after a crash
+        self._mm, self._capacity, self._count = mm, capacity, 0
+        for i in range(capacity):
+            off = self.HEADER.size + i * self.SLOT_SIZE
+            if mm[off + self.DIGEST_SIZE]:
+                self._count += 1
+                self._bloom_add(mm[off:off + self.DIGEST_SIZE])
+        logger.info(f"Seed index reopened: {self._count} entries ({self.path})")
+
+    def _bloom_positions(self, digest: bytes):
+        # Digests are uniformly distributed, slice them to get independent hashes
+        for i in range(0, self.DIGEST_SIZE, 4):
+            yield int.from_bytes(digest[i:i+4], "little") & self._bloom_mask
+
+    def _bloom_add(self, digest: bytes) -> None:
+        if self._bloom is not None:
+            for pos in self._bloom_positions(digest):
+                self._bloom[pos >> 3] |= 1 << (pos & 7)
+
+    def _bloom_maybe(self, digest: bytes) -> bool:
+        if self._bloom is None:
+            return True
+        return all(self._bloom[pos >> 3] & (1 << (pos & 7)) for pos in self._bloom_positions(digest))
+
+    def _find_slot(self, digest: bytes) -> int:
+        """ Return the offset of the slot holding ``digest`` or of the first empty slot """
+        mask = self._capacity - 1
+        i = int.from_bytes(digest[:8], "little") & mask
+        mm = self._mm
+        while True:
+            off = self.HEADER.size + i * self.SLOT_SIZE
+            if not mm[off + self.DIGEST_SIZE] or mm[off:off + self.DIGEST_SIZE] == digest:
+                return off
+            i = (i + 1) & mask
+
+    def _grow(self) -> None:
+        old_mm, old_capacity = self._mm, self._capacity
+        new_capacity = old_capacity * 2
+        tmp_path = self.path.with_suffix(".tmp") if self.path is not None else None
+        self._mm, self._capacity = self._create(tmp_path, new_capacity), new_capacity
+        for i in range(old_capacity):
+            off = self.HEADER.size + i * self.SLOT_SIZE
+            flags = old_mm[off + self.DIGEST_SIZE]
+            if flags:
+                new_off = self._find_slot(old_mm[off:off + self.DIGEST_SIZE])
+                self._mm[new_off:new_off + self.SLOT_SIZE] = old_mm[off:off + self.SLOT_SIZE]
+        old_mm.close()
+        if tmp_path is not None:
+            os.replace(tmp_path, self.path)
+        self.HEADER.pack_into(self._mm, 0, self.MAGIC, self.digest_name.encode()[:8], self._capacity, self._count)
+        logger.debug(f"Seed index grown to {new_capacity} slots")
+
+    def flags(self, digest: bytes) -> int:
+        """ Return the flags of the given digest (0 if unknown) """
+        if not self._bloom_maybe(digest):
+            return 0
+        with self._lock:
+            off = self._find_slot(digest)
+            return self._mm[off + self.DIGEST_SIZE]
+
+    def has(self, digest: bytes, flag: int = RECEIVED | SENT) -> bool:
+        return bool(self.flags(digest) & flag)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return self.flags(digest) != 0
+
+    def add(self, digest: bytes, flag: int) -> bool:
+        """
+        Set ``flag`` on the given digest.
+
+        :return: True if the flag was not already set
+        """
+        if len(digest) != self.DIGEST_SIZE:
+            raise ValueError(f"Invalid digest size {len(digest)} (expected {self.DIGEST_SIZE})")
+        with self._lock:
+            off = self._find_slot(digest)
+            flags = self._mm[off + self.DIGEST_SIZE]
+            if flags & flag:
+                return False
+            if not flags:
+                if (self._count + 1) > self._capacity * self.MAX_LOAD:
+                    self._grow()
+                    off = self._find_slot(digest)
+                self._mm[off:off + self.DIGEST_SIZE] = digest
+                self._count += 1
+                self._bloom_add(digest)
+            self._mm[off + self.DIGEST_SIZE] = flags | flag
+            return True
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def bytes_per_entry(self) -> float:
+        """ Footprint of the table (and bloom filter) per stored entry """
+        size = len(self._mm) + (len(self._bloom) if self._bloom is not None else 0)
+        return size / max(1, self._count)
+
+    def flush(self) -> None:
+        with self._lock:
+            self.HEADER.pack_into(self._mm, 0, self.MAGIC, self.digest_name.encode()[:8], self._capacity, self._count)
+            self._mm.flush()
+
+    def close(self) -> None:
+        if self._mm is not None and not self._mm.closed:
+            self.flush()
+            self._mm.close()
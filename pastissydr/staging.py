@@ -0,0 +1,158 @@
+# builtin imports
+import bisect
+import logging
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# third-party imports
+from libpastis.types import SeedType
+
+# Local imports
+from .metrics import Metrics
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class InboundStaging:
+    """
+    Bounded staging area between the inbound filter and the AFL++ remote
+    queue. Seeds are ordered by type (inputs, then crashes, then hangs), by
+    size class (powers of two, smaller first) and by arrival order, which
+    ages larger seeds within their class. When full, the lowest priority
+    seed is shed.
+
+    Every ``interval`` sec, up to ``batch_size`` seeds are released, as long
+    as AFL++ has imported the previous ones: the main instance records in
+    ``.synced/remote-worker`` the next id it will import from the remote
+    queue, so at most ``max_unsynced`` released seeds wait for AFL++. If the
+    cursor does not move for ``max_paused`` rounds, a batch is released anyway.
+    """
+
+    TYPE_RANK = {SeedType.INPUT: 0, SeedType.CRASH: 1, SeedType.HANG: 2}
+
+    def __init__(self, release: Callable[[bytes, bytes, int], None], synced_file: Optional[Path] = None,
+                 first_id: int = 0, capacity: int = 10000, batch_size: int = 256, interval: float = 10,
+                 max_unsynced: Optional[int] = None, max_paused: int = 30, metrics: Optional[Metrics] = None):
+        """
+        :param release: callback writing (seed, digest, id) into the remote queue
+        :param synced_file: AFL++ sync cursor of the remote queue (None to disable backpressure)
+        :param first_id: id of the next seed written in the remote queue (ids are allocated here only)
+        :param capacity: maximum number of staged seeds
+        :param batch_size: maximum number of seeds released at once
+        :param interval: time (sec) between releases
+        :param max_unsynced: released seeds not yet imported by AFL++ above which releases pause (default: batch_size)
+        :param max_paused: number of consecutive paused rounds after which a batch is released anyway
+        :param metrics: where staging latency ("recv.staged") is recorded
+        """
+        self._release = release
+        self.synced_file = synced_file
+        self.next_id = first_id
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_unsynced = batch_size if max_unsynced is None else max_unsynced
+        self.max_paused = max_paused
+        self._metrics = metrics if metrics is not None else Metrics(enabled=False)
+
+        self._items: List[Tuple[int, int, int, float, bytes, bytes]] = []  # Sorted, best first
+        self._seq = 0
+        self._paused_rounds = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters
+        self.staged = 0
+        self.shed = 0
+        self.released = 0
+        self.batches = 0
+        self.paused = 0
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="InboundStaging", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True) -> None:
+        """ Stop releasing, and write all staged seeds if ``flush`` """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            while self._items:
+                self._release_batch(len(self._items))
+        logger.info(f"Inbound staging stats: {self.stats()}")
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        return {"depth": self.depth, "staged": self.staged, "shed": self.shed, "released": self.released,
+                "batches": self.batches, "paused": self.paused, "unsynced": self.unsynced(), "next_id": self.next_id}
+
+    def submit(self, seed: bytes, digest: bytes, typ: SeedType = SeedType.INPUT) -> None:
+        item = (self.TYPE_RANK.get(typ, 0), len(seed).bit_length(), self._seq, time.perf_counter(), digest, seed)
+        with self._lock:
+            self._seq += 1
+            self.staged += 1
+            bisect.insort(self._items, item)
+            if len(self._items) > self.capacity:
+                self._items.pop()  # Lowest priority
+                self.shed += 1
+                if self.shed % 1000 == 1:
+                    logger.warning(f"Inbound staging full ({self.capacity}), {self.shed} seed(s) shed so far")
+
+    def synced_id(self) -> Optional[int]:
+        """ Next remote queue id AFL++ will import, None if unknown """
+        if self.synced_file is None:
+            return None
+        try:
+            with open(self.synced_file, "rb") as f:
+                data = f.read(4)
+        except FileNotFoundError:
+            return 0  # Nothing imported yet
+        except OSError:
+            return None
+        return struct.unpack("=I", data)[0] if len(data) == 4 else None
+
+    def unsynced(self) -> int:
+        synced = self.synced_id()
+        return 0 if synced is None else max(0, self.next_id - synced)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self._items:
+                continue
+            room = self.max_unsynced - self.unsynced()
+            if room <= 0:
+                self.paused += 1
+                self._paused_rounds += 1
+                if self._paused_rounds < self.max_paused:
+                    logger.debug(f"Inbound staging paused, AFL++ has not imported {self.unsynced()} seeds yet")
+                    continue
+                logger.warning(f"AFL++ did not import remote seeds for {self._paused_rounds} rounds, release a batch anyway")
+                room = self.batch_size
+            self._paused_rounds = 0
+            self._release_batch(min(room, self.batch_size))
+
+    def _release_batch(self, count: int) -> None:
+        with self._lock:
+            batch = self._items[:count]
+            del self._items[:count]
+        now = time.perf_counter()
+        for _, _, _, staged_at, digest, seed in batch:
+            try:
+                self._release(seed, digest, self.next_id)
+            except OSError as e:
+                logger.error(f"Cannot release inbound seed {digest.hex()}: {e}")
+                continue
+            self.next_id += 1
+            self.released += 1
+            self._metrics.observe("recv.staged", now - staged_at)
+        if batch:
+            self.batches += 1
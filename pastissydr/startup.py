@@ -0,0 +1,105 @@
+# builtin imports
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Local imports
+from .telemetry import StatsReader, stat_int
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+def process_start() -> Optional[float]:
+    """ Time (time.monotonic clock) the current process was started at, None if unknown """
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the command name (which may contain spaces), starttime is the 22nd field
+            starttime = int(f.read().rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return time.monotonic() - max(0.0, uptime - starttime)
+
+
+class StartupTimer:
+    """
+    Break the time-to-first-exec of a campaign down by phase. Phases are
+    consecutive: a phase lasts from the previous mark (or the start of the
+    process) to its own mark. The last one ends when an AFL++ instance
+    reports its first executions.
+    """
+
+    FIRST_EXEC = "first_exec"
+
+    def __init__(self, origin: Optional[float] = None):
+        """
+        :param origin: time (time.monotonic clock) of the beginning of the first phase (default: process start)
+        """
+        if origin is None:
+            origin = process_start()
+        self.origin = origin if origin is not None else time.monotonic()
+        self.phases: Dict[str, float] = {}
+        self._last = self.origin
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark(self, phase: str) -> float:
+        """ End ``phase`` now, return its duration (sec) """
+        now = time.monotonic()
+        self.phases[phase] = now - self._last
+        self._last = now
+        return self.phases[phase]
+
+    @property
+    def total(self) -> float:
+        return self._last - self.origin
+
+    def report(self) -> Dict[str, float]:
+        return dict({k: round(v, 3) for k, v in self.phases.items()}, total=round(self.total, 3))
+
+    def summary(self) -> str:
+        return ", ".join(f"{k} {v:.3f}s" for k, v in self.report().items())
+
+    def wait_first_exec(self, stats_files: Callable[[], List[Path]], done: Callable[["StartupTimer"], None],
+                        interval: float = 0.1, timeout: float = 3600) -> None:
+        """ Poll AFL++ stats in the background, mark FIRST_EXEC and call ``done`` once executions are reported """
+        reader = StatsReader()
+        since = time.time()  # Stats of a resumed workspace are older
+
+        def executed(path: Path) -> bool:
+            try:
+                if os.stat(path).st_mtime < since:
+                    return False
+            except FileNotFoundError:
+                return False
+            stats = reader.read(path)
+            return bool(stats) and (stat_int(stats, "execs_done") or 0) > 0
+
+        def run():
+            deadline = time.monotonic() + timeout
+            while not self._stop.wait(interval):
+                if any(executed(path) for path in stats_files()):
+                    self.mark(self.FIRST_EXEC)
+                    done(self)
+                    return
+                if time.monotonic() > deadline:
+                    logger.warning(f"No AFL++ execution reported after {timeout}s")
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="StartupTimer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
+
+    def dump(self, path: Path) -> None:
+        path.write_text(json.dumps(self.report(), indent=2))
@@ -0,0 +1,156 @@
+# builtin imports
+import logging
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+def wait_process(process: subprocess.Popen, timeout: Optional[float] = None) -> Optional[int]:
+    """
+    Wait for a process to exit without polling: the exit is notified through
+    a pidfd (Linux >= 5.3), with a fallback on Popen.wait.
+
+    :param timeout: maximum time (sec) to wait, None for no limit
+    :return: exit code, None on timeout
+    """
+    if process.poll() is not None:
+        return process.returncode
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        try:
+            return process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return None
+    try:
+        poller = select.poll()
+        poller.register(pidfd, select.POLLIN)
+        if not poller.poll(None if timeout is None else int(timeout * 1000)):
+            return None
+        return process.wait()
+    finally:
+        os.close(pidfd)
+
+
+def terminate_group(process: subprocess.Popen, timeout: float = 60, kill_timeout: float = 10) -> int:
+    """
+    Stop the process group of ``process``: SIGINT (graceful shutdown), then
+    SIGTERM after ``timeout`` sec, then SIGKILL after ``kill_timeout`` more
+    sec. Processes of the group still alive once the leader exited are killed.
+
+    :return: exit code of the process
+    """
+    try:
+        pgid = os.getpgid(process.pid)
+    except ProcessLookupError:
+        return process.wait()
+    for sig, delay in [(signal.SIGINT, timeout), (signal.SIGTERM, kill_timeout), (signal.SIGKILL, None)]:
+        try:
+            os.killpg(pgid, sig)
+        except ProcessLookupError:
+            break
+        code = wait_process(process, delay)
+        if code is not None:
+            break
+        logger.warning(f"Process {process.pid} did not exit after {signal.Signals(sig).name} for {delay} sec")
+    code = process.wait()
+    try:
+        os.killpg(pgid, signal.SIGKILL)  # Stragglers
+    except ProcessLookupError:
+        pass
+    return code
+
+
+class Supervisor:
+    """
+    Watch a process and call ``restart`` when it exits unexpectedly (non-zero
+    exit code or signal), after an exponential backoff (``backoff`` sec doubled at every consecutive failure,
+    up to ``max_backoff``). A process which ran for ``reset_after`` sec resets
+    the backoff. After ``max_restarts`` consecutive failures, ``give_up`` is
+    called instead, as well as when the process exits with code 0.
+    """
+
+    def __init__(self, restart: Callable[[], None], give_up: Callable[[int], None], max_restarts: int = 5,
+                 backoff: float = 1, max_backoff: float = 60, reset_after: float = 300):
+        """
+        :param restart: start the process again (and watch it)
+        :param give_up: called with the exit code when the process will not be restarted (exit code 0 included)
+        :param max_restarts: maximum number of consecutive restarts
+        :param backoff: delay (sec) before the first restart
+        :param max_backoff: maximum delay (sec) before a restart
+        :param reset_after: run time (sec) after which an exit is not considered consecutive to the previous one
+        """
+        self._restart = restart
+        self._give_up = give_up
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.reset_after = reset_after
+
+        self._lock = threading.Lock()
+        self._expected = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._generation = 0  # Incremented at every watch, older watches are void
+        self._failures = 0
+
+        # Counters
+        self.restarts = 0
+        self.crashes = 0
+
+    def watch(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._expected = False
+            self._generation += 1
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(process, self._generation, time.monotonic()),
+                                        name="Supervisor", daemon=True)
+        self._thread.start()
+
+    def expect_exit(self) -> None:
+        """ The process is about to be stopped on purpose, do not restart it """
+        with self._lock:
+            self._expected = True
+
+    def cancel(self) -> None:
+        """ Do not restart the process anymore (a pending restart included) """
+        self.expect_exit()
+        self._stop.set()
+
+    def _current(self, generation: int) -> bool:
+        with self._lock:
+            return not self._expected and generation == self._generation and not self._stop.is_set()
+
+    def _run(self, process: subprocess.Popen, generation: int, started: float) -> None:
+        code = wait_process(process)
+        if not self._current(generation):
+            return
+        if code == 0:
+            logger.info("Process exited normally, do not restart it")
+            self._give_up(code)
+            return
+        self.crashes += 1
+        if time.monotonic() - started >= self.reset_after:
+            self._failures = 0
+        self._failures += 1
+        if self._failures > self.max_restarts:
+            logger.error(f"Process exited with code {code}, {self.max_restarts} restarts failed, give up")
+            self._give_up(code)
+            return
+        delay = min(self.max_backoff, self.backoff * 2 ** (self._failures - 1))
+        logger.error(f"Process exited unexpectedly with code {code}, restart in {delay:g} sec "
+                     f"({self._failures}/{self.max_restarts})")
+        if self._stop.wait(delay) or not self._current(generation):
+            return
+        self.restarts += 1
+        try:
+            self._restart()
+        except Exception as e:
+            logger.error(f"Restart failed: {e}")
+            self._give_up(code)
@@ -2,18 +2,21 @@
 import logging
 import os
 import re
-import signal
 import subprocess
-import time
-from typing import Optional, Union
+import threading
+from typing import List, Optional, Tuple, Union
 from pathlib import Path
 
 # third-party imports
 import shutil
 import toml
 from libpastis.types import FuzzMode
+from sydrbroker import SydrConfigurationInterface
 
 # Local imports
+from .logtail import LogFollower
+from .resources import SydrTuning
+from .supervisor import Supervisor, terminate_group
 from .workspace import Workspace
 
 logger = logging.getLogger("pastis_sydr_logger")
@@ -24,13 +27,31 @@ class SydrProcess:
     SYDR_BINARY = "/fuzz/sydr/sydr-fuzz"
     STAT_FILE = "fuzzer_stats"
 
-    def __init__(self, path: str = None):
+    def __init__(self, path: str = None, afl_jobs: int = 1, sydr_jobs: int = 1, cpus: Optional[List[int]] = None,
+                 max_restarts: int = 5, stop_timeout: float = 60):
         self.__path = self.find_sydr_binary(path)
         if self.__path is None:
             raise FileNotFoundError(f"Can't find Sydr-Fuzz binary, default location: {SydrProcess.SYDR_BINARY}")
 
+        # Scaling parameters
+        self.afl_jobs = afl_jobs    # Planned AFL++ instances (main + secondaries)
+        self.sydr_jobs = sydr_jobs  # Planned concurrent Sydr jobs
+        self.jobs = (afl_jobs, sydr_jobs)  # AFL++ instances and Sydr jobs of the running campaign
+        self.cpus = cpus            # CPUs the sydr-fuzz process tree is pinned to
+
         self.__process = None
         self.__log_file = None
+        self.fuzz_command = None  # AFL++ target command line of the running campaign
+        self.sydr_command = None  # Sydr (uninstrumented) target command line
+        self.log_follower = LogFollower()  # Live sydr-fuzz.log events
+        self.tuning = SydrTuning()  # Sydr and AFL++ parameters of the running campaign
+        self._start_args = None
+
+        # Supervision: sydr-fuzz is resumed when it exits unexpectedly
+        self.stop_timeout = stop_timeout  # Graceful shutdown deadline (sec) before SIGTERM, then SIGKILL
+        self._supervisor = Supervisor(self._resume, self._give_up, max_restarts=max_restarts)
+        self._restarting = False
+        self._done = threading.Event()  # Set once the campaign is over
 
     @staticmethod
     def find_sydr_binary(root_dir: Union[Path, str]) -> Optional[Path]:
@@ -50,23 +71,113 @@ class SydrProcess:
 
         return None
 
-    def start(self, fuzztarget: str, sydrtarget: str, target_arguments: str, workspace: Workspace, fuzzmode: FuzzMode, stdin: bool, engine_args: str, dictionary: str, cmplog: Optional[str] = None):
+    @staticmethod
+    def plan_jobs(cores: int) -> Tuple[int, int]:
+        """
+        Split the given number of cores between AFL++ instances and Sydr jobs.
+        A quarter of the cores goes to Sydr (symbolic execution is slower but
+        each job is costlier), the rest to AFL++.
+
+        :return: number of AFL++ instances, number of Sydr jobs
+        """
+        if cores <= 1:
+            return 1, 1
+        sydr_jobs = max(1, cores // 4)
+        return max(1, cores - sydr_jobs), sydr_jobs
+
+    @staticmethod
+    def parse_cpu_list(cpu_list: str) -> List[int]:
+        """ Parse a CPU list in the taskset format (eg: "0-7,16,18") """
+        cpus = []
+        for part in cpu_list.split(','):
+            part = part.strip()
+            if '-' in part:
+                start, end = part.split('-')
+                cpus.extend(range(int(start), int(end) + 1))
+            elif part:
+                cpus.append(int(part))
+        return sorted(set(cpus))
+
+    @staticmethod
+    def merge_tuning(tuning: SydrTuning, config: SydrConfigurationInterface) -> Tuple[SydrTuning, List[str]]:
+        """
+        Override parameters with the ones set in the engine configuration.
+
+        :return: new parameters, names of the overridden ones
+        """
+        overrides = {"solving_timeout": config.sydr.solving_timeout,
+                     "memory_limit": config.sydr.memory_limit,
+                     "wait_jobs": config.sydr.wait_jobs,
+                     "timeout": config.sydr.timeout,
+                     "sleep_time": config.scheduling.sleep_time,
+                     "afl_timeout": config.afl.timeout}
+        overrides = {k: v for k, v in overrides.items() if v is not None}
+        return tuning._replace(**overrides), list(overrides)
+
+    @staticmethod
+    def clamp_jobs(name: str, planned: int, requested: Optional[int]) -> int:
+        """
+        Number of jobs requested by the broker, within the planned one (CPUs and memory).
+
+        :param name: jobs name, for logging
+        :param planned: number of jobs planned by the agent
+        :param requested: number of jobs set in the engine configuration (None if unset)
+        """
+        if not requested:
+            return planned
+        if requested > planned:
+            logger.warning(f"Broker requested {requested} {name}, only {planned} fit the resources of the agent")
+            return planned
+        return requested
+
+    def _preexec(self) -> None:
+        os.setsid()
+        if self.cpus:
+            os.sched_setaffinity(0, self.cpus)
+
+    def start(self, fuzztarget: str, sydrtarget: str, target_arguments: str, workspace: Workspace, fuzzmode: FuzzMode, stdin: bool,
+              engine_config: SydrConfigurationInterface, dictionary: str, cmplog: Optional[str] = None, tuning: Optional[SydrTuning] = None,
+              resume: bool = False):
+        self._start_args = (fuzztarget, sydrtarget, target_arguments, workspace, fuzzmode, stdin, engine_config, dictionary, cmplog)
+        if tuning is not None:
+            self.tuning = tuning
+        sydr_opts, afl_opts, sched_opts = engine_config.sydr, engine_config.afl, engine_config.scheduling
+        # The broker may lower the planned number of jobs, never exceed it
+        self.jobs = (self.clamp_jobs("AFL++ instances", self.afl_jobs, afl_opts.jobs),
+                     self.clamp_jobs("Sydr jobs", self.sydr_jobs, sydr_opts.jobs))
         sydr_out = str(workspace.output_dir)
         config_file = os.path.join(workspace.root_dir, 'sydr-fuzz.toml')
-        self.__log_file = workspace.output_dir / "sydr-fuzz.log"
+        self.__log_file = workspace.log_file
 
         # Build AFL++ arguments.
         afl_args = "-Q " if fuzzmode == FuzzMode.BINARY_ONLY else ""
-        afl_args += f"-t 1000+ -m none -i {workspace.input_dir}"
+        afl_args += f"{self.tuning.afl_args} -i {workspace.input_dir}"
+        if afl_opts.power_schedule:
+            afl_args += f" -p {afl_opts.power_schedule}"
+        if afl_opts.cmplog_level:
+            if cmplog:
+                afl_args += f" -c {cmplog} -l {afl_opts.cmplog_level}"
+            else:
+                logger.warning(f"No cmplog binary in the package, ignore cmplog level {afl_opts.cmplog_level}")
+        if afl_opts.dictionary:
+            if os.path.isfile(afl_opts.dictionary):
+                dictionary = afl_opts.dictionary
+            else:
+                logger.warning(f"Dictionary {afl_opts.dictionary} not found, ignore it")
         if dictionary != "":
             afl_args += f" -x {dictionary}"
-        if engine_args != "":
-            logger.info(f"Received extra engine arguments from broker: {engine_args}")
-            logger.warning(f"IGNORING ARGUMENTS {engine_args}")
-            #afl_args += " " + engine_args
+        if afl_opts.extra_args:
+            logger.info(f"Extra AFL++ arguments from broker: {afl_opts.extra_args}")
+            afl_args += " " + " ".join(afl_opts.extra_args)
 
         # Construct toml.
-        sydr_args = "-s 60 -m 8192 --wait-jobs 300"
+        sydr_args = self.tuning.sydr_args
+        if sydr_opts.optimistic is False:
+            sydr_args += " --no-optimistic"
+        if sydr_opts.strategy:
+            sydr_args += f" --strategy {sydr_opts.strategy}"
+        if sydr_opts.extra_args:
+            sydr_args += " " + " ".join(sydr_opts.extra_args)
         if "@@" in target_arguments:
             sydr_cmd = f"{sydrtarget} {target_arguments}"
             fuzz_cmd = f"{fuzztarget} {target_arguments}"
@@ -77,32 +188,44 @@ class SydrProcess:
             sydr_args += " --sym-stdin"
             sydr_cmd = f"{sydrtarget} {target_arguments}"
             fuzz_cmd = f"{fuzztarget} {target_arguments} 2147483647"
+        self.fuzz_command = fuzz_cmd
+        self.sydr_command = sydr_cmd
         config = {}
-        config["sleep-time"] = 10
+        config["sleep-time"] = self.tuning.sleep_time
         config["sydr"] = {}
         config["sydr"]["target"] = sydr_cmd
         config["sydr"]["args"] = (sydr_args)
-        config["sydr"]["timeout"] = 180
+        config["sydr"]["timeout"] = self.tuning.timeout
+        config["sydr"]["jobs"] = self.jobs[1]
         config["aflplusplus"] = {}
         config["aflplusplus"]["target"] = fuzz_cmd
         config["aflplusplus"]["args"] = afl_args
-        config["aflplusplus"]["cmin"] = False
+        config["aflplusplus"]["jobs"] = self.jobs[0]
+        config["aflplusplus"]["cmin"] = bool(sched_opts.cmin)
 
         config_str = toml.dumps(config)
-        print('[sydr-fuzz] Config: ' + config_str)
+        logger.debug(f"sydr-fuzz config:\n{config_str}")
         text_file = open(config_file, "wt")
         text_file.write(config_str)
         text_file.close()
         
-        # Setup basic AFL++ environment preferences.
-        os.environ["AFL_NO_UI"] = "1"
-        os.environ["AFL_IMPORT_FIRST"] = "1"
-        os.environ["AFL_SKIP_CPUFREQ"] = "1"
-        os.environ["AFL_I_DONT_CARE_ABOUT_MISSING_CRASHES"] = "1"
-        os.environ['AFL_DISABLE_TRIM'] = "1"
-        os.environ['AFL_FAST_CAL'] = "1"
-        os.environ['AFL_IGNORE_UNKNOWN_ENVS'] = "1"
-        os.environ['AFL_CMPLOG_ONLY_NEW'] = "1"
+        # Setup basic AFL++ environment preferences, in the environment of this
+        # sydr-fuzz process only (campaigns of a daemon share os.environ).
+        env = dict(os.environ)
+        env["AFL_NO_UI"] = "1"
+        env["AFL_IMPORT_FIRST"] = "1"
+        env["AFL_SKIP_CPUFREQ"] = "1"
+        env["AFL_I_DONT_CARE_ABOUT_MISSING_CRASHES"] = "1"
+        env['AFL_DISABLE_TRIM'] = "1"
+        env['AFL_FAST_CAL'] = "1"
+        env['AFL_IGNORE_UNKNOWN_ENVS'] = "1"
+        env['AFL_CMPLOG_ONLY_NEW'] = "1"
+        if workspace.resumed or resume:
+            # Restart from the existing AFL++ output instead of the initial inputs
+            env['AFL_AUTORESUME'] = "1"
+        if self.cpus:
+            # Let AFL++ instances inherit our CPU set instead of binding themselves
+            env['AFL_NO_AFFINITY'] = "1"
         
         # Build Sydr-Fuzz cmdline.
         command = [
@@ -116,11 +239,14 @@ class SydrProcess:
             'run',
         ]
 
-        logger.info(f"Run Sydr-Fuzz: {command}")
+        logger.info(f"Run Sydr-Fuzz: {command} (AFL++ jobs: {self.jobs[0]}, Sydr jobs: {self.jobs[1]}, CPUs: {self.cpus if self.cpus else 'all'})")
         logger.debug(f"Workspace: {workspace.root_dir}")
 
         # Create a new fuzzer process and set it apart into a new process group.
-        self.__process = subprocess.Popen(command, cwd=str(workspace.root_dir), preexec_fn=os.setsid)
+        self.log_follower.follow(self.__log_file)
+        self.__process = subprocess.Popen(command, cwd=str(workspace.root_dir), env=env, preexec_fn=self._preexec)
+        self.log_follower.start()
+        self._supervisor.watch(self.__process)
 
         logger.debug(f'Process pid: {self.__process.pid}')
 
@@ -131,18 +257,42 @@ class SydrProcess:
 
     def stop(self):
         if self.__process:
-            os.killpg(os.getpgid(self.__process.pid), signal.SIGINT)
-            while self.instanciated:
-                time.sleep(1)
-                with open(self.__log_file) as f:
-                    if "[RESULTS]" in f.readlines()[-1]:
-                        break
-                logger.debug("Wait for sydr-fuzz to stop...")
+            self._supervisor.expect_exit()
+            if self.__process.poll() is None:
+                # sydr-fuzz copies Sydr inputs and prints its results on SIGINT
+                terminate_group(self.__process, self.stop_timeout)
+            self.log_follower.stop()
         else:
             logger.debug(f"Sydr-Fuzz process seems already killed")
+        if not self._restarting:
+            self._supervisor.cancel()
+            self._done.set()
+
+    def restart(self, tuning: SydrTuning) -> None:
+        """ Stop sydr-fuzz and resume the campaign with new parameters """
+        if self._start_args is None:
+            raise RuntimeError("Sydr-Fuzz was never started")
+        self._restarting = True
+        try:
+            self.stop()
+            self._resume(tuning)
+        finally:
+            self._restarting = False
+
+    def _resume(self, tuning: Optional[SydrTuning] = None) -> None:
+        """ Start sydr-fuzz again on the existing workspace """
+        self.log_follower.stop()
+        self.start(*self._start_args, tuning=tuning, resume=True)  # Keep the AFL++ queues of the previous run
+
+    def _give_up(self, code: int) -> None:
+        self.log_follower.stop()
+        self._done.set()
+
+    @property
+    def restarts(self) -> int:
+        return self._supervisor.restarts
 
     def wait(self):
-        while not self.instanciated:
-            time.sleep(0.1)
-        self.__process.wait()
-        logger.info(f"Sydr-Fuzz terminated with code : {self.__process.returncode}")
+        self._done.wait()
+        if self.__process:
+            logger.info(f"Sydr-Fuzz terminated with code : {self.__process.returncode}")
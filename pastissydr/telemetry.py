@@ -0,0 +1,265 @@
+# builtin imports
+import logging
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Local imports
+from .logtail import LogEventType, LogFollower
+from .metrics import Metrics
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+def parse_stats(text: str) -> Dict[str, str]:
+    """ Parse a fuzzer_stats file, ignoring malformed lines """
+    stats = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition(":")
+        if sep:
+            stats[key.strip()] = value.strip()
+    return stats
+
+
+def stat_int(stats: Dict[str, str], *keys: str) -> Optional[int]:
+    """ First of ``keys`` holding an integer (AFL++ renamed some fields across versions) """
+    for key in keys:
+        try:
+            return int(float(stats[key].rstrip("%")))
+        except (KeyError, ValueError):
+            continue
+    return None
+
+
+class StatsReader:
+    """ Read fuzzer_stats files, parsing them again only when they changed """
+
+    def __init__(self):
+        self._cache: Dict[Path, Tuple[Tuple[int, int], Dict[str, str]]] = {}
+        self.parsed = 0
+        self.errors = 0
+
+    def read(self, path: Path) -> Optional[Dict[str, str]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        try:
+            with open(path, "r", errors="replace") as f:
+                stats = parse_stats(f.read())
+        except OSError as e:
+            self.errors += 1
+            logger.warning(f"Cannot read {path}: {e}")
+            return cached[1] if cached else None
+        self.parsed += 1
+        self._cache[path] = (key, stats)
+        return stats
+
+
+class TelemetrySample(NamedTuple):
+    time: float
+    workers: int            # AFL++ instances reporting stats
+    exec_per_sec: float     # Sum over instances
+    total_exec: int         # Sum over instances
+    cycles: int             # Max over instances
+    corpus: int             # Queue size of the main instance (it imports the entries of the others)
+    edges_found: int        # Max over instances (they share their findings)
+    total_edges: int        # Size of the coverage map
+    crashes: int            # Sum over instances
+    hangs: int              # Sum over instances
+    last_find: int          # Time (epoch) of the last new path, over instances
+    sydr_jobs: int          # Sydr jobs started (from sydr-fuzz.log)
+    sydr_finished: int      # Sydr jobs finished
+    sydr_kept: int          # Inputs kept from Sydr jobs
+    sydr_errors: int        # Errors reported by sydr-fuzz
+    seeds_sent: int
+    seeds_received: int
+
+
+class TelemetrySeries:
+    """
+    Append-only binary time series of telemetry samples: a header followed
+    by fixed-size little-endian records, one per sample.
+    """
+
+    MAGIC = b"SYDRTEL1"
+    RECORD = struct.Struct("<dIdQ13I")
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        new = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, "ab")
+        if new:
+            self._file.write(self.MAGIC)
+            self._file.flush()
+
+    def append(self, sample: TelemetrySample) -> None:
+        self._file.write(self.RECORD.pack(*sample))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    @staticmethod
+    def read(path: Path) -> Iterator[TelemetrySample]:
+        with open(path, "rb") as f:
+            if f.read(len(TelemetrySeries.MAGIC)) != TelemetrySeries.MAGIC:
+                raise ValueError(f"{path} is not a telemetry series")
+            size = TelemetrySeries.RECORD.size
+            while True:
+                record = f.read(size)
+                if len(record) < size:
+                    return  # EOF (or record truncated by a crash)
+                yield TelemetrySample(*TelemetrySeries.RECORD.unpack(record))
+
+
+class TelemetrySampler:
+    """
+    Sample AFL++ stats of all instances and Sydr job events on a timer,
+    append every sample to a time series, and send aggregated telemetry
+    every ``send_interval`` sec.
+    """
+
+    def __init__(self, stats_files: Callable[[], List[Path]], log_follower: LogFollower,
+                 send: Callable[[TelemetrySample], None], send_interval: float = 30, sample_interval: float = 5,
+                 series_file: Optional[Path] = None, counters: Optional[Callable[[], Tuple[int, int]]] = None,
+                 metrics: Optional[Metrics] = None, main_stats_file: Optional[Path] = None):
+        """
+        :param stats_files: return the fuzzer_stats files of all AFL++ instances
+        :param log_follower: sydr-fuzz.log follower counting Sydr events
+        :param send: callback sending a sample to the broker
+        :param send_interval: time (sec) between two telemetry messages
+        :param sample_interval: time (sec) between two samples
+        :param series_file: where samples are recorded (None to disable)
+        :param counters: return the number of seeds sent and received
+        :param metrics: where sampling ("telemetry.parsed") and sending ("telemetry.sent") latencies are recorded
+        :param main_stats_file: fuzzer_stats of the main AFL++ instance (corpus size), the largest queue is used without it
+        """
+        self._stats_files = stats_files
+        self._log_follower = log_follower
+        self._send = send
+        self.send_interval = send_interval
+        self.sample_interval = min(sample_interval, send_interval)
+        self.series_file = series_file
+        self._counters = counters
+        self._metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.main_stats_file = main_stats_file
+
+        self._reader = StatsReader()
+        self._series: Optional[TelemetrySeries] = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_send = 0.0
+        self.last: Optional[TelemetrySample] = None
+
+        # Counters
+        self.samples = 0
+        self.sent = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        if self.series_file is not None:
+            try:
+                self._series = TelemetrySeries(self.series_file)
+            except OSError as e:
+                logger.warning(f"Cannot record telemetry series: {e}")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="Telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.tick(send=False)  # Final sample
+        if self._series is not None:
+            self._series.close()
+            self._series = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"samples": self.samples, "sent": self.sent, "parsed": self._reader.parsed,
+                "errors": self.errors + self._reader.errors}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            self.tick()
+
+    def tick(self, send: bool = True) -> Optional[TelemetrySample]:
+        try:
+            sample = self.sample()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cannot sample telemetry: {e}")
+            return None
+        if self._series is not None:
+            try:
+                self._series.append(sample)
+            except OSError as e:
+                self.errors += 1
+                logger.warning(f"Cannot record telemetry sample: {e}")
+        if send and sample.workers and sample.time - self._last_send >= self.send_interval:
+            self._last_send = sample.time
+            t0 = time.perf_counter()
+            try:
+                self._send(sample)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Cannot send telemetry: {e}")
+            self._metrics.observe("telemetry.sent", time.perf_counter() - t0)
+        return sample
+
+    def sample(self) -> TelemetrySample:
+        t0 = time.perf_counter()
+        files = self._stats_files()
+        workers = [s for s in (self._reader.read(f) for f in files) if s]
+        counts = self._log_follower.counts
+        sent, received = self._counters() if self._counters else (0, 0)
+
+        def total(*keys: str) -> int:
+            return sum(stat_int(w, *keys) or 0 for w in workers)
+
+        def highest(*keys: str) -> int:
+            return max((stat_int(w, *keys) or 0 for w in workers), default=0)
+
+        # Instances import the queue entries of each other, queue sizes are not summed
+        main = self._reader.read(self.main_stats_file) if self.main_stats_file in files else None
+        corpus = stat_int(main, "corpus_count", "paths_total") if main else None
+        if corpus is None:
+            corpus = highest("corpus_count", "paths_total")
+
+        exec_per_sec = 0.0
+        for w in workers:
+            try:
+                exec_per_sec += float(w.get("execs_per_sec", 0))
+            except ValueError:
+                pass
+        sample = TelemetrySample(time=time.time(),
+                                 workers=len(workers),
+                                 exec_per_sec=exec_per_sec,
+                                 total_exec=total("execs_done"),
+                                 cycles=highest("cycles_done"),
+                                 corpus=corpus,
+                                 edges_found=highest("edges_found"),
+                                 total_edges=highest("total_edges"),
+                                 crashes=total("saved_crashes", "unique_crashes"),
+                                 hangs=total("saved_hangs", "unique_hangs"),
+                                 last_find=highest("last_find", "last_path"),
+                                 sydr_jobs=counts[LogEventType.JOB_START],
+                                 sydr_finished=counts[LogEventType.JOB_FINISH],
+                                 sydr_kept=counts[LogEventType.KEEP_INPUT],
+                                 sydr_errors=counts[LogEventType.ERROR],
+                                 seeds_sent=sent,
+                                 seeds_received=received)
+        self.samples += 1
+        self.last = sample
+        self._metrics.observe("telemetry.parsed", time.perf_counter() - t0)
+        return sample
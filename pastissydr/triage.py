@@ -0,0 +1,304 @@
+# builtin imports
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class CrashSignature(NamedTuple):
+    kind: str                # Sanitizer report type or signal name
+    pc: str                  # Faulting location (top frame)
+    frames: Tuple[str, ...]  # Top frames, normalized
+    replayed: bool           # False if the crash did not reproduce
+
+    @property
+    def bucket(self) -> str:
+        return hashlib.sha1(f"{self.kind}|{self.pc}|{';'.join(self.frames)}".encode()).hexdigest()[:16]
+
+
+class CrashTriage:
+    """
+    Replay new crash inputs on the (uninstrumented) Sydr target and bucket
+    them by (kind, faulting PC, top-N frames). Only the first crash of every
+    bucket is reported, bucket counts are summarized periodically.
+
+    The signature comes, in order of preference, from a sanitizer report,
+    from a gdb backtrace (if gdb is available), or from the signal alone.
+    Crashes that do not reproduce cannot be told apart: they are all
+    reported, and counted in a bucket per signal found in their AFL++ name
+    (``sig:NN``). Sanitizer runtime and libc frames are skipped.
+    """
+
+    ASAN_OPTIONS = "detect_leaks=0:symbolize=1:abort_on_error=1:handle_abort=1"
+    UBSAN_OPTIONS = "print_stacktrace=1:halt_on_error=1:abort_on_error=1"
+
+    SANITIZER = re.compile(r'ERROR: (\w+Sanitizer): ([\w-]+)')
+    UBSAN = re.compile(r'(\S+:\d+:\d+): runtime error: ')
+    SAN_FRAME = re.compile(r'^\s*#(\d+) 0x[0-9a-f]+ (?:in (\S+)(?: (\S+))?|\((\S+)\+(0x[0-9a-f]+)\))', re.M)
+    GDB_SIGNAL = re.compile(r'Program (?:received|terminated with) signal (SIG\w+)')
+    GDB_FRAME = re.compile(r'^#(\d+)\s+(?:(0x[0-9a-f]+) in )?(\S+) \(.*?\)(?: at (\S+))?', re.M)
+    AFL_SIGNAL = re.compile(r'sig:(\d+)')
+    # Sanitizer runtime and libc frames say nothing about the bug
+    NOISE_FRAME = re.compile(r'^(__asan|__ubsan|__msan|__sanitizer|__interceptor|__interception|___interceptor|__GI_|__libc_|'
+                             r'__pthread_kill|pthread_kill|raise$|abort$|gsignal$|libc\.so|ld-linux)')
+    SUMMARY_TOP = 20  # Buckets detailed in summaries
+
+    def __init__(self, report: Callable[[Path], None], summary: Callable[[Dict], None],
+                 workers: int = 2, timeout: int = 10, frames: int = 5, report_interval: float = 60,
+                 state_file: Optional[Path] = None, use_gdb: Optional[bool] = None):
+        """
+        :param report: callback called with the representative crash of every new bucket
+        :param summary: callback called with the bucket summary
+        :param workers: number of concurrent replays
+        :param timeout: replay timeout (sec)
+        :param frames: number of top frames in the signature
+        :param report_interval: minimum time (sec) between two summaries
+        :param state_file: where buckets are persisted across restarts
+        :param use_gdb: get backtraces of non-sanitized crashes with gdb (default: if available)
+        """
+        self._report = report
+        self._summary = summary
+        self.workers = workers
+        self.timeout = timeout
+        self.frames = frames
+        self.report_interval = report_interval
+        self.state_file = state_file
+        self._gdb = shutil.which("gdb") if use_gdb is not False else None
+
+        self._command: Optional[List[str]] = None
+        self._stdin = False
+        self._queue: queue.Queue = queue.Queue()
+        self._buckets: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_summary = 0.0
+        self._dirty = False
+
+        # Counters
+        self.crashes = 0
+        self.replayed = 0
+        self.unreproduced = 0
+        self.errors = 0
+        self._load()
+
+    def configure(self, command: str, stdin: bool) -> None:
+        """
+        :param command: target command line (with @@ for file inputs)
+        :param stdin: whether the target reads its input on stdin
+        """
+        self._command = shlex.split(command)
+        self._stdin = stdin
+
+    def start(self) -> None:
+        self._stop.clear()
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._run, name=f"CrashReplay-{i}", daemon=True))
+        for t in self._threads:
+            t.start()
+
+    def stop(self) -> None:
+        """ Stop once running replays are done, crashes not triaged yet are left on disk """
+        self._stop.set()
+        for t in self._threads:
+            t.join()
+        self._threads.clear()
+        if self._dirty:
+            self._send_summary()
+        self._save()
+        logger.info(f"Crash triage stats: {self.stats()}")
+
+    def stats(self) -> Dict[str, int]:
+        return {"crashes": self.crashes, "buckets": len(self._buckets), "replayed": self.replayed,
+                "unreproduced": self.unreproduced, "errors": self.errors, "pending": self._queue.qsize()}
+
+    def submit(self, path: Path) -> None:
+        self._queue.put(Path(path))
+
+    def _load(self) -> None:
+        if self.state_file is None or not self.state_file.exists():
+            return
+        try:
+            self._buckets = json.loads(self.state_file.read_text())
+            logger.info(f"Crash triage: {len(self._buckets)} known buckets")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot load crash buckets: {e}")
+
+    def _save(self) -> None:
+        if self.state_file is None:
+            return
+        try:
+            tmp = self.state_file.with_name(f".{self.state_file.name}.tmp")
+            with self._lock:
+                tmp.write_text(json.dumps(self._buckets))
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            logger.warning(f"Cannot save crash buckets: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                path = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._dirty and time.monotonic() - self._last_summary > self.report_interval:
+                    self._send_summary()
+                continue
+            self._triage(path)
+
+    def _triage(self, path: Path) -> None:
+        try:
+            signature = self.replay(path)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Cannot replay crash {path.name}: {e}")
+            self.errors += 1
+            signature = self._fallback(path)
+        new = self._add(signature, path)
+        if new:
+            logger.info(f"[TRIAGE] new bucket {signature.bucket}: {signature.kind} at {signature.pc} ({path.name})")
+        if new or not signature.replayed:
+            self._report(path)
+        if time.monotonic() - self._last_summary > self.report_interval:
+            self._send_summary()
+
+    def _add(self, signature: CrashSignature, path: Path) -> bool:
+        with self._lock:
+            self.crashes += 1
+            self._dirty = True
+            bucket = self._buckets.get(signature.bucket)
+            if bucket is not None:
+                bucket["count"] += 1
+                return False
+            self._buckets[signature.bucket] = {"kind": signature.kind, "pc": signature.pc,
+                                               "frames": list(signature.frames), "replayed": signature.replayed,
+                                               "first": path.name, "count": 1}
+            return True
+
+    def _send_summary(self) -> None:
+        with self._lock:
+            self._last_summary = time.monotonic()
+            self._dirty = False
+            summary = {"crashes": self.crashes, "buckets": len(self._buckets),
+                       "top": {k: {"kind": b["kind"], "pc": b["pc"], "count": b["count"]}
+                               for k, b in sorted(self._buckets.items(), key=lambda x: -x[1]["count"])[:self.SUMMARY_TOP]}}
+        try:
+            self._summary(summary)
+        except Exception as e:
+            logger.warning(f"Cannot send crash summary: {e}")
+
+    # Replay
+    def _argv(self, path: Path) -> List[str]:
+        if self._stdin:
+            return list(self._command)
+        return [str(path) if arg == "@@" else arg for arg in self._command]
+
+    def _run_target(self, argv: List[str], path: Path, env: Dict[str, str]) -> Tuple[int, str]:
+        with open(path, "rb") as stdin:
+            proc = subprocess.run(argv, stdin=stdin if self._stdin else subprocess.DEVNULL,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env,
+                                  timeout=self.timeout, start_new_session=True)
+        return proc.returncode, proc.stderr.decode(errors="replace")
+
+    def replay(self, path: Path) -> CrashSignature:
+        if self._command is None:
+            return self._fallback(path)
+        env = dict(os.environ)
+        env.setdefault("ASAN_OPTIONS", self.ASAN_OPTIONS)
+        env.setdefault("UBSAN_OPTIONS", self.UBSAN_OPTIONS)
+        try:
+            code, stderr = self._run_target(self._argv(path), path, env)
+        except subprocess.TimeoutExpired:
+            self.unreproduced += 1
+            return self._fallback(path)
+        self.replayed += 1
+
+        signature = self.parse_sanitizer(stderr)
+        if signature is not None:
+            return signature
+        if code >= 0:
+            self.unreproduced += 1
+            return self._fallback(path)
+        if self._gdb:
+            signature = self._gdb_signature(path, env)
+            if signature is not None:
+                return signature
+        return CrashSignature(self._signal_name(-code), "", (), True)
+
+    def parse_sanitizer(self, report: str) -> Optional[CrashSignature]:
+        m = self.SANITIZER.search(report)
+        u = self.UBSAN.search(report)
+        if m is None and u is None:
+            return None
+        if m is not None:
+            kind = f"{m.group(1)}:{m.group(2)}"
+            report = report[m.end():]
+        else:
+            kind = "UndefinedBehaviorSanitizer"
+        frames = []
+        for f in self.SAN_FRAME.finditer(report):
+            if f.group(1) == "0" and frames:
+                break  # Next stack (allocation, free...)
+            if f.group(2):
+                where = f.group(3)
+                frame = f"{f.group(2)}@{os.path.basename(where)}" if where and not where.startswith("(") else f.group(2)
+            else:
+                frame = f"{os.path.basename(f.group(4))}+{f.group(5)}"
+            if self.NOISE_FRAME.match(frame):
+                continue
+            frames.append(frame)
+            if len(frames) >= self.frames:
+                break
+        if frames:
+            pc = frames[0]
+        else:
+            pc = u.group(1) if u else ""
+        return CrashSignature(kind, pc, tuple(frames), True)
+
+    def _gdb_signature(self, path: Path, env: Dict[str, str]) -> Optional[CrashSignature]:
+        run = f"run < {shlex.quote(str(path))}" if self._stdin else "run"
+        argv = [self._gdb, "-q", "-nx", "-batch", "-ex", "set pagination off", "-ex", run,
+                "-ex", f"bt {self.frames}", "--args"] + self._argv(path)
+        try:
+            proc = subprocess.run(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  env=env, timeout=self.timeout * 3, start_new_session=True)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        out = proc.stdout.decode(errors="replace")
+        sig = self.GDB_SIGNAL.search(out)
+        if sig is None:
+            return None
+        frames = []
+        pc = ""
+        for f in self.GDB_FRAME.finditer(out):
+            frame = f"{f.group(3)}@{os.path.basename(f.group(4))}" if f.group(4) else f.group(3)
+            if self.NOISE_FRAME.match(frame):
+                continue
+            if not frames:
+                pc = f"{frame}:{f.group(2)}" if f.group(2) else frame  # gdb disables ASLR, addresses are stable
+            frames.append(frame)
+        return CrashSignature(sig.group(1), pc, tuple(frames[:self.frames]), True)
+
+    def _fallback(self, path: Path) -> CrashSignature:
+        m = self.AFL_SIGNAL.search(path.name)
+        kind = self._signal_name(int(m.group(1))) if m else "unknown"
+        return CrashSignature(f"unreproduced:{kind}", "", (), False)
+
+    @staticmethod
+    def _signal_name(signum: int) -> str:
+        try:
+            return signal.Signals(signum).name
+        except ValueError:
+            return f"SIG{signum}"
@@ -0,0 +1,290 @@
+# builtin imports
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+# third-party imports
+from watchdog.events import FileCreatedEvent, FileModifiedEvent, FileSystemEventHandler
+
+logger = logging.getLogger("pastis_sydr_logger")
+
+
+class InotifyObserver(threading.Thread):
+    """
+    Minimal inotify-backed observer exposing the subset of the watchdog
+    observer API used by the Workspace (schedule/start/stop/join).
+
+    Events are coalesced per path over a short window and a file is only
+    reported as created once it has been closed after writing (or moved in),
+    so that callbacks never see half-written queue entries. When the kernel
+    event queue overflows, watched directories are rescanned once and every
+    file modified since the last synchronization point is reported again.
+    Watches of removed directories are re-armed when the directory is
+    created again, and its files are then all reported.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    EVENT_HEADER = struct.Struct("iIII")
+    READ_SIZE = 64 * 1024
+    REARM_INTERVAL = 1.0  # sec, between two checks for removed directories
+
+    _libc = None
+
+    def __init__(self, coalesce_delay: float = 0.05, settle_delay: float = 1.0):
+        super(InotifyObserver, self).__init__(name="InotifyObserver", daemon=True)
+        self.coalesce_delay = coalesce_delay
+        self.settle_delay = settle_delay
+
+        libc = self.load_libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watches: Dict[int, Path] = {}                                 # wd -> directory
+        self._handlers: Dict[Path, List[FileSystemEventHandler]] = {}     # directory -> handlers
+        self._lost: Dict[Path, None] = {}                                   # removed directories (ordered set)
+        self._rearmed_at = 0.0
+
+        # Coalescing state
+        self._pending_created: Dict[Path, float] = {}  # created but not yet closed
+        self._ready_created: Dict[Path, None] = {}     # ordered set
+        self._ready_modified: Dict[Path, None] = {}    # ordered set
+        self._synced_at = time.time()
+        self._overflowed = False
+
+        # Counters
+        self.events_read = 0
+        self.events_dispatched = 0
+        self.overflows = 0
+        self.rearmed = 0
+
+    @classmethod
+    def load_libc(cls) -> Optional[ctypes.CDLL]:
+        if cls._libc is None:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+                libc.inotify_init1, libc.inotify_add_watch   # Check symbols exists
+            except (OSError, AttributeError):
+                return None
+            libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            cls._libc = libc
+        return cls._libc
+
+    @staticmethod
+    def is_available() -> bool:
+        return InotifyObserver.load_libc() is not None
+
+    def schedule(self, event_handler: FileSystemEventHandler, path: Union[str, Path], recursive: bool = False) -> None:
+        # NOTE: recursive watches are not supported, the workspace only
+        # dispatches events of direct children of hooked directories.
+        path = Path(path)
+        with self._lock:
+            handlers = self._handlers.setdefault(path, [])
+            if event_handler not in handlers:
+                handlers.append(event_handler)
+            if path in self._watches.values():
+                return
+            self._add_watch(path)
+        logger.debug(f"inotify: watching {path}")
+
+    def _add_watch(self, path: Path) -> None:
+        """ Watch ``path`` (lock held) """
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch failed on {path}: {os.strerror(err)}")
+        self._watches[wd] = path
+        self._lost.pop(path, None)
+
+    def unschedule_all(self) -> None:
+        with self._lock:
+            self._watches.clear()
+            self._handlers.clear()
+            self._lost.clear()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def run(self) -> None:
+        poller = select.poll()
+        poller.register(self._fd, select.POLLIN)
+        last_flush = time.monotonic()
+        try:
+            while not self._stopped.is_set():
+                if poller.poll(self.coalesce_delay * 1000):
+                    self._read_events()
+                now = time.monotonic()
+                if now - last_flush >= self.coalesce_delay:
+                    self._flush()
+                    last_flush = now
+        finally:
+            os.close(self._fd)
+
+    def _read_events(self) -> None:
+        try:
+            buf = os.read(self._fd, self.READ_SIZE)
+        except BlockingIOError:
+            return
+        now = time.monotonic()
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _cookie, length = self.EVENT_HEADER.unpack_from(buf, offset)
+            offset += self.EVENT_HEADER.size
+            name = buf[offset:offset+length].rstrip(b"\0")
+            offset += length
+            self.events_read += 1
+
+            if mask & self.IN_Q_OVERFLOW:
+                self._overflowed = True
+                continue
+            with self._lock:
+                if mask & self.IN_IGNORED:
+                    # Directory removed (or unmounted): watch it again once it is back
+                    directory = self._watches.pop(wd, None)
+                    if directory is not None and directory in self._handlers:
+                        self._lost[directory] = None
+                        logger.info(f"inotify: {directory} removed")
+                    continue
+                directory = self._watches.get(wd)
+            if directory is None or not name or mask & self.IN_ISDIR:
+                continue
+
+            path = directory / os.fsdecode(name)
+            if mask & self.IN_CREATE:
+                self._pending_created[path] = now
+            elif mask & self.IN_MOVED_TO:
+                self._pending_created.pop(path, None)
+                self._ready_created[path] = None
+                self._ready_modified[path] = None
+            elif mask & self.IN_CLOSE_WRITE:
+                if self._pending_created.pop(path, None) is not None:
+                    self._ready_created[path] = None
+                self._ready_modified[path] = None
+            elif mask & self.IN_MODIFY:
+                if path not in self._pending_created:
+                    self._ready_modified[path] = None
+
+    def _flush(self) -> None:
+        if self._overflowed:
+            self._rescan()
+        if self._lost and time.monotonic() - self._rearmed_at >= self.REARM_INTERVAL:
+            self._rearm()
+
+        # Files created without being written (eg: hard links) are released once settled
+        now = time.monotonic()
+        for path, ts in list(self._pending_created.items()):
+            if now - ts >= self.settle_delay:
+                del self._pending_created[path]
+                self._ready_created[path] = None
+
+        created, self._ready_created = self._ready_created, {}
+        modified, self._ready_modified = self._ready_modified, {}
+        for path in created:
+            self._dispatch(path, FileCreatedEvent(str(path)))
+        for path in modified:
+            self._dispatch(path, FileModifiedEvent(str(path)))
+
+        if not self._pending_created:
+            self._synced_at = time.time()
+
+    def _rescan(self) -> None:
+        self._overflowed = False
+        self.overflows += 1
+        since = self._synced_at - 1.0  # Give some slack for timestamps granularity
+        with self._lock:
+            directories = list(self._watches.values())
+        logger.warning(f"inotify: event queue overflow, rescan {len(directories)} directories")
+        for directory in directories:
+            self._scan(directory, since)
+
+    def _rearm(self) -> None:
+        self._rearmed_at = time.monotonic()
+        with self._lock:
+            lost = list(self._lost)
+        for directory in lost:
+            if not directory.is_dir():
+                continue
+            with self._lock:
+                if directory not in self._lost:
+                    continue  # Unscheduled or scheduled again meanwhile
+                try:
+                    self._add_watch(directory)
+                except OSError as e:
+                    logger.debug(f"inotify: cannot watch {directory} again: {e}")
+                    continue
+            self.rearmed += 1
+            logger.info(f"inotify: {directory} created again, watching it")
+            # Files written before the watch was re-armed
+            self._scan(directory, 0)
+
+    def _scan(self, directory: Path, since: float) -> None:
+        """ Report the files of ``directory`` modified since ``since`` """
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.stat().st_mtime >= since:
+                        path = Path(entry.path)
+                        self._pending_created.pop(path, None)
+                        self._ready_created[path] = None
+                        self._ready_modified[path] = None
+        except FileNotFoundError:
+            pass
+
+    def _dispatch(self, path: Path, event) -> None:
+        with self._lock:
+            handlers = list(self._handlers.get(path.parent, []))
+        for handler in handlers:
+            try:
+                handler.dispatch(event)
+            except Exception as e:
+                logger.error(f"inotify: handler failed on {path}: {e}")
+        self.events_dispatched += 1
+
+
+WATCHER_KINDS = ["auto", "inotify", "polling"]
+
+
+def create_observer(kind: str = "auto", polling_interval: float = 1):
+    """
+    Instanciate the observer used to watch workspace directories.
+
+    :param kind: "inotify", "polling" or "auto" (inotify when available)
+    :param polling_interval: interval in seconds of the polling fallback
+    :return: an observer providing the watchdog schedule/start/stop API
+    """
+    if kind not in WATCHER_KINDS:
+        raise ValueError(f"Invalid watcher kind {kind} (expected one of {WATCHER_KINDS})")
+
+    if kind in ["auto", "inotify"]:
+        try:
+            observer = InotifyObserver()
+            logger.info("Use inotify workspace watcher")
+            return observer
+        except OSError as e:
+            if kind == "inotify":
+                raise
+            logger.warning(f"inotify not available ({e}), fallback on polling watcher")
+
+    from watchdog.observers.polling import PollingObserverVFS  # Only imported when used
+    logger.info(f"Use polling workspace watcher (interval: {polling_interval}s)")
+    return PollingObserverVFS(stat=os.stat, listdir=os.scandir, polling_interval=polling_interval)
@@ -1,51 +1,174 @@
 # builtin imports
-from typing import Callable
+from typing import Callable, List, Optional, Tuple
+import threading
 import time
 import tempfile
 import os
 import logging
 from pathlib import Path
-from hashlib import md5
 
 # third-party imports
 import shutil
 from watchdog.events import FileSystemEventHandler
-from watchdog.observers.polling import PollingObserverVFS
+
+# Local imports
+from .watcher import create_observer
 
 logger = logging.getLogger("pastis_sydr_logger")
 
 class Workspace(FileSystemEventHandler):
 
     SYDR_WS_ENV_VAR = "SYDR_WS"
+    SYDR_RAM_WS_ENV_VAR = "SYDR_RAM_WS"
     DEFAULT_WS_PATH = "sydr_workspace"
+    DEFAULT_RAM_PATH = "/dev/shm"
+    LOG_FILE = "sydr-fuzz.log"
     STATS_FILE = "fuzzer_stats"
+    SEED_INDEX_FILE = "seeds.idx"
+    METRICS_FILE = "metrics.json"
+    CRASH_BUCKETS_FILE = "crash-buckets.json"
+    TELEMETRY_FILE = "telemetry.bin"
+    STARTUP_FILE = "startup.json"
+    DICTIONARY_FILE = "target.dict"
+    TRASH_SUFFIX = ".trash-"
+    OWNER_FILE = ".owner"    # pid of the agent using a RAM workspace
+    STALE_RAM_AGE = 3600     # sec, RAM workspaces without owner (eg: being removed) older than that are stale
+    REMOTE_WORKER = "remote-worker"
+    LOCAL_WORKER = "local-worker"  # Seeds of the other agents of the host (see LocalSync)
+    WORKER_DISCOVERY_INTERVAL = 5
 
-    def __init__(self):
-        self.observer = PollingObserverVFS(stat=os.stat, listdir=os.scandir, polling_interval=1)
+    def __init__(self, watcher: str = "auto", ram: bool = False, resume: bool = False, path: Optional[Path] = None,
+                 observer=None):
+        """
+        :param watcher: watcher backend (see watcher.create_observer)
+        :param ram: put the workspace on a memory-backed filesystem, the
+                    regular location only receives logs and checkpoints
+        :param resume: reopen the existing workspace (if valid) instead of wiping it
+        :param path: workspace location (default: SYDR_WS)
+        :param observer: observer shared with other workspaces, started and stopped by its owner
+        """
+        self._shared_observer = observer is not None
+        self.observer = observer if observer is not None else create_observer(watcher)
+        self.path = path
         self.modif_callbacks = {}  # Map fullpath -> callback
         self.created_callbacks = {}
         self.root_dir = None
+        self.persistent_dir = None  # Same as root_dir unless in RAM mode
+        self.ram = ram
+        self.resume = resume
+        self.resumed = False
+        self._worker_hooks: Optional[Tuple[Callable, Callable]] = None
+        self._watching = False  # Events of a shared observer are ignored out of start/stop
+        self._discovery_stop = threading.Event()
+        self._discovery_thread = None
         self._setup_workspace()
 
     def _setup_workspace(self):
-        ws = os.environ.get(self.SYDR_WS_ENV_VAR, None)
+        ws = self.path if self.path is not None else os.environ.get(self.SYDR_WS_ENV_VAR, None)
         if ws is None:
-            self.root_dir = (Path(tempfile.gettempdir()) / self.DEFAULT_WS_PATH) / str(time.time()).replace(".", "")
+            self.persistent_dir = (Path(tempfile.gettempdir()) / self.DEFAULT_WS_PATH) / str(time.time()).replace(".", "")
         else:
-            self.root_dir = Path(ws)  # Use the one provided
+            self.persistent_dir = Path(ws)  # Use the one provided
 
-        if os.path.exists(self.root_dir):
-            logger.warning(f"Remove existing workspace {self.root_dir}")
-            shutil.rmtree(self.root_dir)
+        if self.ram:
+            ram_base = Path(os.environ.get(self.SYDR_RAM_WS_ENV_VAR, self.DEFAULT_RAM_PATH)) / self.DEFAULT_WS_PATH
+            self._remove_stale_ram_workspaces(ram_base)
+            self.root_dir = ram_base / str(time.time()).replace(".", "")
+        else:
+            self.root_dir = self.persistent_dir
+
+        if self.resume and self._is_resumable():
+            self.resumed = True
+            logger.info(f"Resume existing workspace {self.persistent_dir}")
+            if self.ram:
+                self._restore_checkpoint()
+        else:
+            if self.resume:
+                logger.warning(f"No valid workspace to resume in {self.persistent_dir}, start from scratch")
+            for d in {self.root_dir, self.persistent_dir}:
+                if os.path.exists(d):
+                    logger.warning(f"Remove existing workspace {d}")
+                    self._discard(d)
 
         for d in [self.target_dir, self.input_dir, self.dynamic_input_dir, self.corpus_dir, self.sydr_dir, self.crash_dir]:
-            d.mkdir(parents=True)
+            d.mkdir(parents=True, exist_ok=True)
+
+        if self.ram:
+            # Trace logs are large and write-only, keep them on persistent storage
+            self.persistent_dir.mkdir(parents=True, exist_ok=True)
+            (self.root_dir / self.OWNER_FILE).write_text(str(os.getpid()))
+            (self.output_dir / self.LOG_FILE).unlink(missing_ok=True)  # Restored from a checkpoint
+            (self.output_dir / self.LOG_FILE).symlink_to(self.persistent_dir / self.LOG_FILE)
+            logger.info(f"RAM workspace: {self.root_dir} (persistent: {self.persistent_dir})")
 
         # Create dummy input file.
         # AFLPP requires that the initial seed directory is not empty.
         # TODO Is there a better approach to this?
-        seed_path = self.input_dir / 'seed-dummy'
-        seed_path.write_bytes(b'A')
+        if not any(self.input_dir.iterdir()):
+            seed_path = self.input_dir / 'seed-dummy'
+            seed_path.write_bytes(b'A')
+
+    def _discard(self, path: Path):
+        """ Move a directory aside and remove it in the background (with leftovers of previous removals) """
+        trash = path.with_name(f"{path.name}{self.TRASH_SUFFIX}{time.time_ns()}")
+        try:
+            path.rename(trash)
+        except OSError as e:
+            logger.debug(f"Cannot move {path} aside ({e}), remove it in place")
+            shutil.rmtree(path)
+            return
+        trashes = list(path.parent.glob(f"{path.name}{self.TRASH_SUFFIX}*"))
+
+        def remove():
+            for d in trashes:
+                shutil.rmtree(d, ignore_errors=True)
+
+        threading.Thread(target=remove, name="WorkspaceCleanup", daemon=True).start()
+
+    def _remove_stale_ram_workspaces(self, ram_base: Path):
+        """ Remove the RAM workspaces left behind by agents which did not stop cleanly """
+        if not ram_base.is_dir():
+            return
+        for d in ram_base.iterdir():
+            try:
+                pid = int((d / self.OWNER_FILE).read_text())
+            except (OSError, ValueError):
+                pid = None
+            if pid is not None:
+                try:
+                    os.kill(pid, 0)
+                    continue  # Agent still running
+                except ProcessLookupError:
+                    pass
+                except PermissionError:
+                    continue  # Running, as another user
+            elif time.time() - d.lstat().st_mtime < self.STALE_RAM_AGE:
+                continue  # Being set up or removed
+            logger.warning(f"Remove stale RAM workspace {d}")
+            shutil.rmtree(d, ignore_errors=True)
+
+    def release(self):
+        """ Remove the RAM workspace (once checkpointed), the persistent one is kept """
+        if self.ram and self.root_dir is not None and self.root_dir.exists():
+            logger.info(f"Remove RAM workspace {self.root_dir}")
+            shutil.rmtree(self.root_dir, ignore_errors=True)
+
+    def _is_resumable(self) -> bool:
+        """
+        A workspace can be resumed if the AFL++ main queue survived (in place
+        or in checkpoints) along with its fuzzer_stats: without it,
+        AFL_AUTORESUME does not resume in place and AFL++ wipes the queue.
+        """
+        base = self.checkpoint_dir if self.ram else self.persistent_dir
+        corpus = base / self.corpus_dir.relative_to(self.root_dir)
+        stats = base / self.stats_file.relative_to(self.root_dir)
+        if corpus.is_dir() and not stats.is_file():
+            logger.warning(f"No AFL++ {self.STATS_FILE} next to {corpus}, AFL++ cannot resume it")
+        return corpus.is_dir() and stats.is_file()
+
+    def _restore_checkpoint(self):
+        logger.info(f"Restore checkpoint {self.checkpoint_dir} into {self.root_dir}")
+        shutil.copytree(self.checkpoint_dir, self.root_dir, dirs_exist_ok=True)
 
     @property
     def target_dir(self):
@@ -59,9 +182,13 @@ class Workspace(FileSystemEventHandler):
     def output_dir(self):
         return self.root_dir / 'sydr-fuzz-output'
 
+    @property
+    def afl_dir(self):
+        return self.output_dir / 'aflplusplus'
+
     @property
     def dynamic_input_dir(self):
-        return self.output_dir / 'aflplusplus' / 'remote-worker' / 'queue'
+        return self.afl_dir / self.REMOTE_WORKER / 'queue'
 
     @property
     def corpus_dir(self):
@@ -71,6 +198,15 @@ class Workspace(FileSystemEventHandler):
     def sydr_dir(self):
         return self.output_dir / 'aflplusplus' / 'sydr-worker' / 'queue'
 
+    @property
+    def local_sync_link(self):
+        return self.afl_dir / self.LOCAL_WORKER
+
+    @property
+    def remote_synced_file(self):
+        """ Next id of the remote queue the AFL++ main instance will import """
+        return self.stats_dir / '.synced' / self.REMOTE_WORKER
+
     @property
     def crash_dir(self):
         return self.output_dir / 'crashes'
@@ -79,13 +215,45 @@ class Workspace(FileSystemEventHandler):
     def stats_dir(self):
         return self.output_dir / 'aflplusplus' / 'afl_main-worker'
 
+    @property
+    def log_file(self):
+        return self.output_dir / self.LOG_FILE
+
+    @property
+    def checkpoint_dir(self):
+        return self.persistent_dir / 'checkpoint'
+
+    @property
+    def seed_index_file(self):
+        return self.persistent_dir / self.SEED_INDEX_FILE
+
+    @property
+    def metrics_file(self):
+        return self.persistent_dir / self.METRICS_FILE
+
+    @property
+    def telemetry_file(self):
+        return self.persistent_dir / self.TELEMETRY_FILE
+
+    @property
+    def startup_file(self):
+        return self.persistent_dir / self.STARTUP_FILE
+
+    @property
+    def dictionary_file(self):
+        return self.persistent_dir / self.DICTIONARY_FILE
+
+    @property
+    def crash_buckets_file(self):
+        return self.persistent_dir / self.CRASH_BUCKETS_FILE
+
     @property
     def stats_file(self):
         return self.stats_dir / self.STATS_FILE
 
     def on_modified(self, event):
         path = Path(event.src_path)
-        if path.is_dir():
+        if not self._watching or path.is_dir():
             return  # We don't care about directories
         if path.parent in self.modif_callbacks:
             self.modif_callbacks[path.parent](path)  # call the callback
@@ -94,23 +262,74 @@ class Workspace(FileSystemEventHandler):
 
     def on_created(self, event):
         path = Path(event.src_path)
-        if path.is_dir():
+        if not self._watching or path.is_dir():
             return  # We don't care about directories
         if path.parent in self.created_callbacks:
             self.created_callbacks[path.parent](path)  # call the callback
         else:
             pass  # Do nothing at the moment
 
+    # NOTE: Callbacks are only triggered for direct children of the hooked
+    # directory, thus there is no need to watch it recursively.
     def add_file_modification_hook(self, path: str, callback: Callable):
-        self.observer.schedule(self, path=path, recursive=True)
+        self.observer.schedule(self, path=path, recursive=False)
         self.modif_callbacks[path] = callback
 
     def add_creation_hook(self, path: str, callback: Callable):
-        self.observer.schedule(self, path=path, recursive=True)
+        self.observer.schedule(self, path=path, recursive=False)
         self.created_callbacks[path] = callback
 
+    def worker_dirs(self) -> List[Path]:
+        """ Output directories of all AFL++ and Sydr workers (except the remote and local ones) """
+        try:
+            return sorted(d for d in self.afl_dir.iterdir()
+                          if d.name not in (self.REMOTE_WORKER, self.LOCAL_WORKER) and (d / 'queue').is_dir())
+        except FileNotFoundError:
+            return []
+
+    def add_worker_discovery_hook(self, queue_callback: Callable, stats_callback: Optional[Callable] = None):
+        """
+        Hook the queue (creation) and, if ``stats_callback`` is given, the stats
+        (modification) of every worker, including the ones spawned after the
+        workspace is started.
+        """
+        self._worker_hooks = (queue_callback, stats_callback)
+
+    def discover_workers(self):
+        if self._worker_hooks is None:
+            return
+        queue_callback, stats_callback = self._worker_hooks
+        for worker in self.worker_dirs():
+            queue = worker / 'queue'
+            if queue in self.created_callbacks:
+                continue
+            logger.info(f"New worker discovered: {worker.name}")
+            self.add_creation_hook(queue, queue_callback)
+            if stats_callback is not None and worker not in self.modif_callbacks:
+                self.add_file_modification_hook(worker, stats_callback)
+            # Entries written before the hook was set
+            for entry in queue.iterdir():
+                if entry.is_file():
+                    queue_callback(entry)
+
+    def _discovery_loop(self):
+        while not self._discovery_stop.wait(self.WORKER_DISCOVERY_INTERVAL):
+            try:
+                self.discover_workers()
+            except OSError as e:
+                logger.warning(f"Worker discovery failed: {e}")
+
     def start(self):
-        self.observer.start()
+        self._watching = True
+        if not self._shared_observer:
+            self.observer.start()
+        if self._worker_hooks is not None:
+            self._discovery_stop.clear()
+            self._discovery_thread = threading.Thread(target=self._discovery_loop, name="WorkerDiscovery", daemon=True)
+            self._discovery_thread.start()
 
     def stop(self):
-        self.observer.stop()
+        self._discovery_stop.set()
+        self._watching = False
+        if not self._shared_observer:
+            self.observer.stop()
@@ -12,6 +12,7 @@ setup(
         "coloredlogs",
         "watchdog",
         "toml",
+        "pastis-sydr-broker-addon",  # Engine configuration model and ELF helpers (./broker-addon)
     ],
     scripts=['bin/pastis-sydr']
 )
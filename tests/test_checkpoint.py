@@ -0,0 +1,83 @@
+# builtin imports
+import os
+from pathlib import Path
+
+# Local imports
+from pastissydr.checkpoint import Checkpointer
+from pastissydr.workspace import Workspace
+
+
+def make_workspace(tmp_path: Path, monkeypatch, resume: bool = False) -> Workspace:
+    monkeypatch.setenv(Workspace.SYDR_RAM_WS_ENV_VAR, str(tmp_path / "ram"))
+    return Workspace(watcher="polling", ram=True, resume=resume, path=tmp_path / "ws")
+
+
+def test_restore_keeps_queue_and_afl_state(tmp_path, monkeypatch):
+    ws = make_workspace(tmp_path, monkeypatch)
+    (ws.corpus_dir / "id:000000,orig:seed").write_bytes(b"A")
+    (ws.corpus_dir / "id:000001,src:000000,+cov").write_bytes(b"ABCD")
+    (ws.stats_dir / ".cur_input").write_bytes(b"tmp")
+    ws.stats_file.write_text("execs_done : 100\n")
+    (ws.stats_dir / ".synced").mkdir()
+    ws.remote_synced_file.write_bytes(b"\x01\x00\x00\x00")
+    (ws.dynamic_input_dir / "id:000000,seed-00").write_bytes(b"remote")
+    (ws.crash_dir / "id:000000,sig:11").write_bytes(b"crash")
+
+    checkpointer = Checkpointer(ws)
+    checkpointer.checkpoint()
+    # State files are rewritten by AFL++, they are saved again
+    ws.stats_file.write_text("execs_done : 200\n")
+    checkpointer.checkpoint()
+
+    restored = make_workspace(tmp_path, monkeypatch, resume=True)
+    assert restored.resumed
+    assert restored.root_dir != ws.root_dir
+    assert sorted(p.name for p in restored.corpus_dir.iterdir()) == ["id:000000,orig:seed", "id:000001,src:000000,+cov"]
+    assert (restored.corpus_dir / "id:000001,src:000000,+cov").read_bytes() == b"ABCD"
+    # AFL_AUTORESUME only resumes in place next to a fuzzer_stats, remote seeds must match the sync cursor
+    assert restored.stats_file.read_text() == "execs_done : 200\n"
+    assert restored.remote_synced_file.read_bytes() == b"\x01\x00\x00\x00"
+    assert (restored.dynamic_input_dir / "id:000000,seed-00").read_bytes() == b"remote"
+    assert (restored.crash_dir / "id:000000,sig:11").exists()
+    assert not (restored.stats_dir / ".cur_input").exists()
+
+
+def test_checkpoint_without_afl_state_is_not_resumed(tmp_path, monkeypatch):
+    ws = make_workspace(tmp_path, monkeypatch)
+    (ws.corpus_dir / "id:000000,orig:seed").write_bytes(b"A")
+    Checkpointer(ws).checkpoint()  # AFL++ has not written its fuzzer_stats yet
+
+    restored = make_workspace(tmp_path, monkeypatch, resume=True)
+    assert not restored.resumed
+    assert not any(restored.corpus_dir.iterdir())
+
+
+def test_ram_workspace_is_released_and_stale_ones_removed(tmp_path, monkeypatch):
+    ws = make_workspace(tmp_path, monkeypatch)
+    (ws.corpus_dir / "id:000000,orig:seed").write_bytes(b"A")
+    ws.stats_file.write_text("execs_done : 100\n")
+    Checkpointer(ws).stop()
+    ws.release()
+    assert not ws.root_dir.exists()
+    assert ws.checkpoint_dir.is_dir()
+
+    # Left behind by a crashed agent, or still used by a running one
+    ram_base = ws.root_dir.parent
+    crashed, running = ram_base / "1", ram_base / "2"
+    for d, pid in [(crashed, 2 ** 22 + 1), (running, os.getpid())]:
+        d.mkdir()
+        (d / Workspace.OWNER_FILE).write_text(str(pid))
+    restored = make_workspace(tmp_path, monkeypatch, resume=True)
+    assert restored.resumed
+    assert not crashed.exists() and running.exists()
+
+
+def test_restored_checkpoint_with_log_entry(tmp_path, monkeypatch):
+    ws = make_workspace(tmp_path, monkeypatch)
+    (ws.corpus_dir / "id:000000,orig:seed").write_bytes(b"A")
+    ws.stats_file.write_text("execs_done : 100\n")
+    Checkpointer(ws).checkpoint()
+    (ws.checkpoint_dir / ws.log_file.relative_to(ws.root_dir)).write_text("log")
+
+    restored = make_workspace(tmp_path, monkeypatch, resume=True)
+    assert restored.resumed and restored.log_file.is_symlink()
@@ -0,0 +1,49 @@
+# builtin imports
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# third-party imports
+from libpastis.types import FuzzMode, SeedInjectLoc
+
+CLI = Path(__file__).resolve().parent.parent / "bin" / "pastis-sydr"
+LOAD_CLI = f"""
+import importlib.machinery, importlib.util
+loader = importlib.machinery.SourceFileLoader("pastis_sydr_cli", {str(CLI)!r})
+cli = importlib.util.module_from_spec(importlib.util.spec_from_loader(loader.name, loader))
+loader.exec_module(cli)
+"""
+
+
+def load_cli():
+    namespace = {}
+    exec(LOAD_CLI + "result = cli", namespace)
+    return namespace["result"]
+
+
+def test_choices_match_libpastis():
+    cli = load_cli()
+    assert cli.FUZZ_MODES == [x.name for x in FuzzMode]
+    assert cli.INPUT_SOURCES == [x.name for x in SeedInjectLoc]
+
+
+def test_heavy_modules_are_loaded_by_the_subcommands():
+    check = LOAD_CLI + "import sys; print(sorted(m for m in ['libpastis', 'coloredlogs', 'pastissydr.driver'] if m in sys.modules))"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True, env=env).stdout
+    assert out.strip() == "[]"
+
+
+def test_driver_options_are_shared_and_converted():
+    cli = load_cli()
+    names = {p.name for p in cli.offline.params} & {p.name for p in cli.online.params}
+    assert {"ram_workspace", "auto_dictionary", "dictionary_size", "profile"} <= names
+
+    params = cli.online.make_context("online", ["--cpu-list", "0-1", "--ram-budget", "2", "--max-seed-size", "4",
+                                                "--no-auto-dict", "--outbound-budget", "10"]).params
+    options = cli.make_driver_options(params)
+    assert options.cpus == [0, 1] and options.ram_budget == 2 << 20 and options.max_seed_size == 4 << 10
+    assert options.local_sync_size == 1 << 30 and not options.auto_dictionary and options.outbound_budget == 10
+    # Left to the command
+    assert set(params) == {"host", "port", "logfile", "profile", "profile_delay", "profile_duration", "profile_dir"}
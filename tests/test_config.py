@@ -0,0 +1,48 @@
+# builtin imports
+import json
+
+# third-party imports
+import pytest
+from sydrbroker import SydrConfigurationInterface
+
+CONFIG = {"sydr": {"solving_timeout": 30, "memory_limit": 4096, "jobs": 2, "optimistic": False,
+                   "strategy": "direct", "extra_args": ["-j", "1"]},
+          "aflplusplus": {"power_schedule": "explore", "timeout": "500+", "cmplog_level": "2AT", "jobs": 4},
+          "sydr-fuzz": {"sleep_time": 5, "cmin": False}}
+
+
+def test_configuration_round_trip(tmp_path):
+    config = SydrConfigurationInterface.from_str(json.dumps(CONFIG))
+    assert config.sydr.extra_args == ("-j", "1") and config.afl.jobs == 4
+    assert config.sydr.wait_jobs is None and config.afl.dictionary is None  # Left to the agent
+    assert json.loads(config.to_str()) == CONFIG
+    path = tmp_path / "engine.json"
+    path.write_text(config.to_str())
+    assert SydrConfigurationInterface.from_file(path).to_str() == config.to_str()
+
+
+@pytest.mark.parametrize("data, message", [
+    ({"afl": {}}, "unknown section"),
+    ({"sydr": []}, "not an object"),
+    ({"sydr": {"solving-timeout": 30}}, "unknown option"),
+    ({"sydr": {"extra_args": "-j 1"}}, "list of strings"),
+    ({"sydr": {"jobs": 0}}, "sydr.jobs must be an integer >= 1"),
+    ({"sydr": {"memory_limit": True}}, "sydr.memory_limit"),
+    ({"sydr": {"optimistic": 1}}, "sydr.optimistic must be a boolean"),
+    ({"sydr": {"strategy": "direct; rm -rf"}}, "sydr.strategy"),
+    ({"aflplusplus": {"power_schedule": "slow"}}, "aflplusplus.power_schedule must be one of"),
+    ({"aflplusplus": {"timeout": "1s"}}, "aflplusplus.timeout"),
+    ({"aflplusplus": {"cmplog_level": "4"}}, "aflplusplus.cmplog_level"),
+    ({"aflplusplus": {"extra_args": ["-D", 1]}}, "aflplusplus.extra_args"),
+    ({"sydr-fuzz": {"cmin": "no"}}, "sydr-fuzz.cmin"),
+])
+def test_invalid_configurations_are_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        SydrConfigurationInterface.from_str(json.dumps(data))
+
+
+def test_all_errors_are_reported():
+    config = SydrConfigurationInterface.new()
+    assert config.errors() == []
+    config.sydr = config.sydr._replace(jobs=0, timeout=-1)
+    assert len(config.errors()) == 2
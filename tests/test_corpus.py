@@ -0,0 +1,38 @@
+# builtin imports
+import pytest
+
+# Local imports
+from pastissydr.corpus import CorpusImporter
+from pastissydr.seedfile import digest_file
+
+
+def make_corpus(root):
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "one").write_bytes(b"1")
+    (root / "a" / "two").write_bytes(b"22")
+    (root / "a" / "b" / "one-again").write_bytes(b"1")
+    (root / "a" / "b" / "large").write_bytes(b"L" * 100)
+    return root
+
+
+def test_corpus_is_walked_and_deduplicated(tmp_path):
+    corpus = make_corpus(tmp_path / "corpus")
+    importer = CorpusImporter(tmp_path / "dest", digest_file, workers=2, max_size=10)
+    stats = importer.run([corpus, corpus / "one"])
+    assert (stats["scanned"], stats["imported"], stats["duplicates"], stats["skipped"]) == (5, 2, 2, 1)
+    names = sorted(p.name for p in (tmp_path / "dest").iterdir())
+    assert names == sorted(digest_file(corpus / name).hex() for name in ["one", "a/two"])
+    assert stats["hardlink"] == 2 and (corpus / "one").stat().st_nlink == 2
+
+
+def test_import_is_bounded_and_copies(tmp_path):
+    corpus = make_corpus(tmp_path / "corpus")
+    importer = CorpusImporter(tmp_path / "dest", digest_file, workers=1, max_count=1, link="copy")
+    stats = importer.run([corpus])
+    assert stats["imported"] == 1 and stats["copy"] == 1
+    assert (corpus / "one").stat().st_nlink == 1
+
+
+def test_invalid_link_mode():
+    with pytest.raises(ValueError):
+        CorpusImporter("dest", digest_file, link="symlink")
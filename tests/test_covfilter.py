@@ -0,0 +1,63 @@
+# builtin imports
+import stat
+import sys
+import time
+
+# third-party imports
+from libpastis.types import SeedType
+
+# Local imports
+from pastissydr.covfilter import CoverageFilter
+
+# Every byte of an input is an edge
+FAKE_SHOWMAP = f"""#!{sys.executable}
+import os, sys
+args = sys.argv[1:sys.argv.index("--")]
+in_dir, out = args[args.index("-i") + 1], args[args.index("-o") + 1]
+maps = {{name: set(open(os.path.join(in_dir, name), "rb").read()) for name in os.listdir(in_dir)}}
+if "-C" in args:
+    with open(out, "w") as f:
+        f.writelines(f"{{e}}:1\\n" for e in set().union(*maps.values()))
+else:
+    for name, edges in maps.items():
+        with open(os.path.join(out, name), "w") as f:
+            f.writelines(f"{{e}}:1\\n" for e in edges)
+"""
+
+
+def wait_for(condition, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_edges_of_new_queue_entries_are_learned(tmp_path, monkeypatch):
+    showmap = tmp_path / CoverageFilter.SHOWMAP_BINARY
+    showmap.write_text(FAKE_SHOWMAP)
+    showmap.chmod(showmap.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("AFL_PATH", str(tmp_path))
+    queue_dir = tmp_path / "queue"
+    forwarded = []
+
+    cov = CoverageFilter(lambda seed, digest, typ: forwarded.append(seed), tmp_path / "inbound",
+                         batch_latency=0.01, prime_interval=0)
+    cov.configure("/bin/true @@", stdin=False, qemu=False, corpus_dir=queue_dir)
+    cov.start()
+    try:
+        # The queue is filled by AFL++ after the filter is configured
+        queue_dir.mkdir()
+        (queue_dir / "id:000000,orig:seed").write_bytes(b"AB")
+        assert wait_for(lambda: cov.stats()["edges"] == 2)
+        cov.submit(b"BA", b"\x01", SeedType.INPUT)
+        cov.submit(b"ABC", b"\x02", SeedType.INPUT)
+        assert wait_for(lambda: cov.accepted + cov.rejected == 2)
+        assert forwarded == [b"ABC"]
+
+        (queue_dir / "id:000001,src:000000,+cov").write_bytes(b"D")
+        assert wait_for(lambda: cov.stats()["primed"] == 2)
+        cov.submit(b"DD", b"\x03", SeedType.INPUT)
+        assert wait_for(lambda: cov.accepted + cov.rejected == 3)
+        assert forwarded == [b"ABC"]
+    finally:
+        cov.stop()
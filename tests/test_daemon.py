@@ -0,0 +1,48 @@
+# builtin imports
+import threading
+
+# third-party imports
+import pytest
+
+# Local imports
+from pastissydr.daemon import CampaignSpec, SydrDaemon
+
+
+class FakeDriver:
+    def __init__(self):
+        self.ended = threading.Event()
+        self.stopped = threading.Event()
+        self.started = True
+
+    def run(self):
+        self.ended.wait()
+
+    def stop(self):
+        self.started = False
+        self.stopped.set()
+
+
+def test_campaigns_are_handled_as_they_end(tmp_path):
+    daemon = SydrDaemon([CampaignSpec("a"), CampaignSpec("b")], workspace=tmp_path, watcher="polling")
+    daemon.drivers = {"a": FakeDriver(), "b": FakeDriver()}
+    runner = threading.Thread(target=daemon.run)
+    runner.start()
+
+    # The second campaign ends first, it is stopped while the first one goes on
+    daemon.drivers["b"].ended.set()
+    assert daemon.drivers["b"].stopped.wait(5)
+    assert runner.is_alive() and not daemon.drivers["a"].stopped.is_set()
+
+    daemon.drivers["a"].ended.set()
+    runner.join(5)
+    assert not runner.is_alive() and daemon.drivers["a"].stopped.is_set()
+
+
+def test_campaign_spec_is_validated():
+    spec = CampaignSpec.parse({"name": "png", "cpus": "0-1", "memory": 1024, "options": {"outbound_budget": 10}})
+    assert spec.cpus == [0, 1] and spec.memory == 1024 * 1024 * 1024
+    for data in [{"name": "a/b"}, {"name": "a", "memory": 0}, {"name": "a", "options": {"agent": None}},
+                 {"name": "a", "options": {"cores": 4}},
+                 {"name": "a", "unknown": 1}]:
+        with pytest.raises(ValueError):
+            CampaignSpec.parse(data)
@@ -0,0 +1,43 @@
+# builtin imports
+import shutil
+
+# Local imports
+from pastissydr.dictionary import Dictionary, escape_token, extract_tokens, unescape_token
+
+
+def test_tokens_are_escaped():
+    token = b'GIF8"\\\x00\xff'
+    assert escape_token(token) == 'GIF8\\x22\\x5c\\x00\\xff'
+    assert unescape_token(escape_token(token)) == token
+    assert unescape_token('a\\"b') == b'a"b'
+
+
+def test_tokens_of_an_elf_binary(tmp_path):
+    ls = shutil.which("ls")
+    tokens = extract_tokens(ls, max_tokens=32)
+    assert 0 < len(tokens) <= 32 and len(set(tokens)) == len(tokens)
+    (tmp_path / "script").write_bytes(b"#!/bin/sh\necho hello world\n")
+    assert extract_tokens(tmp_path / "script") == []
+
+
+def test_learned_tokens_are_kept_across_builds(tmp_path):
+    extra = tmp_path / "broker.dict"
+    extra.write_text('kw1="PNG"\n')
+    path = tmp_path / "target.dict"
+    dictionary = Dictionary(path, max_tokens=0, min_hits=2, cache_dir=tmp_path / "cache")
+    assert dictionary.build([], extra) == path
+
+    inputs = []
+    for i, data in enumerate([b"\x00IHDR\x01", b"\x02IHDR\x03", b"\x00tEXt\x00"]):
+        inputs.append(tmp_path / f"input{i}")
+        inputs[-1].write_bytes(data)
+    assert not dictionary.learn(inputs[0])
+    assert dictionary.learn(inputs[1])  # Found in two inputs
+    assert not dictionary.learn(inputs[2])
+    assert path.read_text().splitlines() == ['kw1="PNG"', 'sydr_0="IHDR"']
+
+    # Resumed workspace
+    resumed = Dictionary(path, max_tokens=0, cache_dir=tmp_path / "cache")
+    resumed.build([], extra)
+    assert resumed.stats()["learned"] == 1
+    assert not resumed.learn(inputs[1]) and not resumed.learn(inputs[0])
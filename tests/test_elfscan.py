@@ -0,0 +1,27 @@
+# builtin imports
+import sys
+
+# third-party imports
+from sydrbroker.elfscan import ContentCache, has_afl_instrumentation
+
+
+def test_unreadable_files_are_not_handled(tmp_path):
+    missing = tmp_path / "missing"
+    assert has_afl_instrumentation(missing) is None
+    assert has_afl_instrumentation(tmp_path) is None  # Directory
+    cache = ContentCache(tmp_path / "cache")
+    assert cache.digest(missing) is None
+    assert cache.cached(missing, lambda p: "computed", str, str) == "computed"
+    assert not (tmp_path / "cache").exists()
+
+
+def test_results_are_cached_by_content(tmp_path):
+    binary = tmp_path / "python"
+    binary.write_bytes(open(sys.executable, "rb").read())
+    assert has_afl_instrumentation(binary) is False
+    cache = ContentCache(tmp_path / "cache")
+    calls = []
+    for _ in range(2):
+        assert cache.cached(binary, lambda p: calls.append(p) or "1", str, str) == "1"
+    assert len(calls) == 1 and cache.hits == 1
+    assert ContentCache(tmp_path / "cache").get(cache.digest(binary)) == "1"
@@ -0,0 +1,64 @@
+# builtin imports
+import os
+import time
+
+# Local imports
+from pastissydr.localsync import LocalSync
+from pastissydr.seedfile import digest_seed
+
+
+def publish(sync: LocalSync, tmp_path, content: bytes) -> bytes:
+    path = tmp_path / f"seed-{content.hex()}"
+    path.write_bytes(content)
+    digest = digest_seed(content)
+    assert sync.publish(path, digest)
+    return digest
+
+
+def test_publish_and_echo(tmp_path):
+    sync = LocalSync(tmp_path / "sync")
+    sync.attach("target", tmp_path / "local-worker")
+    digest = publish(sync, tmp_path, b"AAAA")
+    assert sync.echo(digest)
+    assert not sync.publish(tmp_path / f"seed-{b'AAAA'.hex()}", digest)
+    assert [p.name for p in (tmp_path / "local-worker" / "queue").iterdir()] == [f"id:000000,seed-{digest.hex()}"]
+
+
+def test_evict_oldest_seeds_above_max_size(tmp_path):
+    sync = LocalSync(tmp_path / "sync", max_size=300)
+    sync.attach("target", tmp_path / "local-worker")
+    digests = []
+    for i in range(5):
+        digests.append(publish(sync, tmp_path, bytes([i]) * 100))
+        time.sleep(0.01)  # Distinct publication times
+    sync.evict()
+    assert sync.evictions == 2
+    assert [sync.echo(d) for d in digests] == [False, False, True, True, True]
+    assert sorted(p.name[:9] for p in sync.queue_dir.iterdir()) == ["id:000002", "id:000003", "id:000004"]
+    # Ids keep increasing after an eviction
+    publish(sync, tmp_path, b"new")
+    assert max(p.name[:9] for p in sync.queue_dir.iterdir()) == "id:000005"
+
+
+def test_evict_old_seeds_and_stale_targets(tmp_path):
+    stale = tmp_path / "sync" / "stale"
+    stale.mkdir(parents=True)
+    os.utime(stale, (time.time() - 3600, time.time() - 3600))
+    sync = LocalSync(tmp_path / "sync", max_age=60)
+    sync.attach("target", tmp_path / "local-worker")
+    assert not stale.exists()
+
+    digest = publish(sync, tmp_path, b"AAAA")
+    sync.max_age = 0
+    sync.evict()
+    assert not sync.echo(digest) and not any(sync.queue_dir.iterdir())
+
+
+def test_published_seeds_are_known_to_all_agents(tmp_path):
+    sync, other = LocalSync(tmp_path / "sync"), LocalSync(tmp_path / "sync")
+    assert not sync.has(b"\0" * 16)  # Not attached
+    sync.attach("target", tmp_path / "local-worker")
+    other.attach("target", tmp_path / "other-local-worker")
+    digest = publish(sync, tmp_path, b"BBBB")
+    assert sync.has(digest) and other.has(digest)
+    assert sync.echoes == other.echoes == 0
@@ -0,0 +1,53 @@
+# builtin imports
+from pathlib import Path
+
+# Local imports
+from pastissydr.logtail import LogEventType, LogFollower
+
+
+def follow(tmp_path: Path) -> LogFollower:
+    log = tmp_path / "sydr-fuzz.log"
+    log.write_text("")
+    follower = LogFollower()
+    follower.follow(log)
+    return follower
+
+
+def append(follower: LogFollower, lines: str) -> None:
+    with open(follower.path, "a") as f:
+        f.write(lines)
+    follower.poll()
+
+
+def test_sydr_fuzz_lines_are_parsed(tmp_path):
+    kept = []
+    follower = follow(tmp_path)
+    follower.subscribe(LogEventType.KEEP_INPUT, lambda e: kept.append(e.value))
+    append(follower, '[2024-03-01 10:00:00] [INFO] Launching Sydr on "id:000003,src:000001"\n'
+                     '[2024-03-01 10:00:01] [INFO] Keeping input "sydr_1c2f_int_0_1"\n'
+                     '[2024-03-01 10:00:01] [INFO] Keeping input sydr_1c2f_int_0_2\n'
+                     '[2024-03-01 10:00:02] [INFO] Sydr finished on "id:000003,src:000001"\n'
+                     '[2024-03-01 10:00:03] [ERROR] Sydr output directory is missing\n'
+                     '[2024-03-01 10:00:04] [INFO] Received SIGINT/SIGTERM: terminating\n'
+                     '[2024-03-01 10:00:04] [RESULTS] 12 inputs, 0 crashes\n')
+    assert kept == ["sydr_1c2f_int_0_1", "sydr_1c2f_int_0_2"]
+    counts = follower.counts
+    assert counts[LogEventType.JOB_START] == counts[LogEventType.JOB_FINISH] == 1
+    assert counts[LogEventType.ERROR] == counts[LogEventType.TERMINATING] == 1
+    assert follower.results.is_set()
+
+
+def test_quoted_output_is_not_an_event(tmp_path):
+    follower = follow(tmp_path)
+    append(follower, "[2024-03-01 10:00:00] [TRACE] target: ERROR: cannot run sydr, done\n"
+                     "[2024-03-01 10:00:00] [TRACE] AFL++: Starting Sydr worker sync\n")
+    assert sum(follower.counts.values()) == 0
+    assert follower.lines == 2
+
+
+def test_partial_line_is_parsed_once_complete(tmp_path):
+    follower = follow(tmp_path)
+    append(follower, '[INFO] Keeping input "sydr_')
+    assert follower.counts[LogEventType.KEEP_INPUT] == 0
+    append(follower, '0001"\n')
+    assert follower.counts[LogEventType.KEEP_INPUT] == 1
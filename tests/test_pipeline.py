@@ -0,0 +1,55 @@
+# builtin imports
+import threading
+import time
+from pathlib import Path
+
+# third-party imports
+from libpastis.types import SeedType
+
+# Local imports
+from pastissydr.pipeline import SeedPipeline
+
+
+def wait_for(predicate, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_failed_send_releases_seed():
+    released = []
+
+    def send(typ, raw, digest):
+        if raw == b"fail":
+            raise ConnectionError("broker gone")
+
+    pipeline = SeedPipeline(lambda path, typ: (path.name.encode(), path.name.encode()), send,
+                            workers=1, batch_latency=0.01, release=released.append)
+    pipeline.start()
+    pipeline.submit(Path("ok"), SeedType.INPUT)
+    pipeline.submit(Path("fail"), SeedType.INPUT)
+    assert wait_for(lambda: pipeline.pending == 0)
+    pipeline.stop()
+    assert (pipeline.sent, pipeline.failed) == (1, 1)
+    assert released == [b"fail"]
+
+
+def test_stop_releases_unsent_seeds():
+    released = []
+    blocked = threading.Event()
+
+    def send(typ, raw, digest):
+        blocked.wait()
+
+    pipeline = SeedPipeline(lambda path, typ: (b"x", path.name.encode()), send,
+                            workers=1, queue_size=2, batch_size=1, release=released.append)
+    pipeline.start()
+    for i in range(6):
+        pipeline.submit(Path(str(i)), SeedType.INPUT)
+    time.sleep(0.3)
+    threading.Timer(0.5, blocked.set).start()
+    pipeline.stop(drain_timeout=0)
+    # Seeds that reached the sender are sent, prepared ones left behind are released
+    assert pipeline.sent + len(released) == 6 - pipeline._intake.qsize() - len(pipeline._deferred)
+    assert len(released) > 0
@@ -0,0 +1,40 @@
+# builtin imports
+import shutil
+import stat
+import zipfile
+from pathlib import Path
+
+# Local imports
+from pastissydr.pkgcache import PackageCache
+
+
+def make_package(tmp_path: Path) -> bytes:
+    archive = tmp_path / "package.zip"
+    with zipfile.ZipFile(archive, "w") as z:
+        z.write(shutil.which("true"), "target")
+        info = zipfile.ZipInfo("target_sydr")
+        info.external_attr = 0o644 << 16  # Not executable in the archive
+        z.writestr(info, Path(shutil.which("true")).read_bytes())
+        z.writestr("target.dict", 'a="b"\n')
+    return archive.read_bytes()
+
+
+def test_cached_files_modes_are_set_once(tmp_path):
+    binary = make_package(tmp_path)
+    cache = PackageCache(tmp_path / "cache")
+    first = cache.unpack("target", binary, tmp_path / "ws1")
+    assert first.executable_path == tmp_path / "ws1" / "target"
+    assert sorted(f.name for f in first.other_files) == ["target_sydr"]
+    assert first.dictionary == tmp_path / "ws1" / "target.dict"
+    # Binaries are executable by all the agents of the host, data files are left alone
+    sydr_target = tmp_path / "ws1" / "target_sydr"
+    assert stat.S_IMODE(sydr_target.stat().st_mode) & PackageCache.EXEC_MODE == PackageCache.EXEC_MODE
+    assert not (tmp_path / "ws1" / "target.dict").stat().st_mode & stat.S_IXUSR
+
+    modes = {f: f.stat().st_mode for f in (tmp_path / "ws1").iterdir()}
+    second = cache.unpack("target", binary, tmp_path / "ws2")
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.arch == first.arch and second.platform == first.platform
+    assert (tmp_path / "ws2" / "target").stat().st_ino == first.executable_path.stat().st_ino
+    # Building the package of a hit does not touch the cached inodes
+    assert {f: f.stat().st_mode for f in (tmp_path / "ws1").iterdir()} == modes
@@ -0,0 +1,33 @@
+# builtin imports
+import pstats
+import threading
+import time
+
+# Local imports
+from pastissydr.profiling import CPROFILE_ALL_THREADS, Profiler
+
+
+def busy_worker(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiles_threads_running_before_the_window(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_worker, args=(stop,), name="BusyWorker")
+    worker.start()
+    try:
+        profiler = Profiler("cprofile", tmp_path, duration=0.5)
+        assert profiler.mode == ("cprofile" if CPROFILE_ALL_THREADS else "sampling")
+        profiler.start()
+        time.sleep(0.7)
+        profiler.stop()
+    finally:
+        stop.set()
+        worker.join()
+    if profiler.mode == "sampling":
+        folded = next(tmp_path.glob("*.folded")).read_text()
+        assert "BusyWorker;" in folded and "busy_worker" in folded
+    else:
+        stats = pstats.Stats(str(next(tmp_path.glob("*.prof"))))
+        assert any(func[2] == "busy_worker" for func in stats.stats)
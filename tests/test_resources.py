@@ -0,0 +1,56 @@
+# Local imports
+from pastissydr.resources import HostResources, MiB, ResourceManager, ResourceTuner, SydrTuning
+
+
+def make_tuner(manager: ResourceManager, tuning: SydrTuning) -> ResourceTuner:
+    return ResourceTuner(manager, tuning, 1, lambda: (0, None), lambda t: None)
+
+
+def test_retune_keeps_sydr_timeout_of_fast_targets():
+    manager = ResourceManager(HostResources(4.0, 16384 * MiB))
+    _, tuning = manager.plan(1)
+    for exec_per_sec in [10000.0, 100.0, 10.0]:
+        new = manager.retune(tuning, None, exec_per_sec)
+        assert new.timeout == tuning.timeout
+        # Only the AFL++ timeout may trigger a restart
+        assert not make_tuner(manager, tuning)._significant(new._replace(afl_timeout=tuning.afl_timeout))
+
+
+def test_retune_raises_sydr_timeout_of_slow_targets():
+    manager = ResourceManager(HostResources(4.0, 16384 * MiB))
+    _, tuning = manager.plan(1)
+    assert manager.retune(tuning, None, 2.0).timeout == 500       # 500 ms per execution
+    assert manager.retune(tuning, None, 0.1).timeout == ResourceManager.MAX_SYDR_TIMEOUT
+
+
+def test_fast_targets_keep_the_historical_afl_timeout():
+    manager = ResourceManager(HostResources(4.0, 16384 * MiB))
+    _, tuning = manager.plan(1)
+    applied = []
+    tuner = ResourceTuner(manager, tuning, 1, lambda: (0, 10000.0), applied.append, min_restart_interval=0,
+                          pinned=("solving_timeout", "wait_jobs"))
+    tuner.tune()
+    assert manager.retune(tuning, None, 10000.0).afl_timeout == "1000+"
+    assert applied == [] and tuner.restarts == 0
+
+
+def test_restarts_are_rate_limited_and_only_apply_significant_changes():
+    manager = ResourceManager(HostResources(4.0, 16384 * MiB))
+    _, tuning = manager.plan(1)
+    applied = []
+    speed = [2.0]  # exec/s
+    tuner = ResourceTuner(manager, tuning, 1, lambda: (0, speed[0]), applied.append, min_restart_interval=3600,
+                          pinned=("solving_timeout", "wait_jobs"))
+    tuner.tune()
+    assert applied == [] and tuner.deferred == 1
+
+    tuner.min_restart_interval = 0
+    tuner.tune()
+    assert len(applied) == 1 and tuner.restarts == 1
+    new = applied[0]
+    assert new.afl_timeout == "5000+" and new.timeout == 500
+    assert new._replace(afl_timeout=tuning.afl_timeout, timeout=tuning.timeout) == tuning
+
+    speed[0] = 2.2  # Not significant
+    tuner.tune()
+    assert len(applied) == 1
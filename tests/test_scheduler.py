@@ -0,0 +1,68 @@
+# builtin imports
+from pathlib import Path
+
+# Local imports
+from pastissydr.scheduler import OutboundScheduler, QueueEntry
+
+
+def entry(directory: Path, name: str, size: int = 1) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_bytes(b"A" * size)
+    return path
+
+
+def test_queue_entry_names_are_parsed():
+    e = QueueEntry.parse("id:000042,src:000003+000007,time:1234,execs:5678,op:splice,rep:2,+cov")
+    assert (e.id, e.src, e.time, e.op, e.cov, e.sync, e.orig) == (42, (3, 7), 1234, "splice", True, None, False)
+    assert QueueEntry.parse("id:000001,sync:remote-worker,src:000000").sync == "remote-worker"
+    assert QueueEntry.parse("id:000000,time:0,execs:0,orig:seed").orig
+    assert QueueEntry.parse("seed-abcdef").id is None
+
+
+def test_best_entries_are_released_first(tmp_path):
+    queue = tmp_path / "afl_main-worker" / "queue"
+    sydr = tmp_path / "sydr-worker" / "queue"
+    released = []
+    scheduler = OutboundScheduler(released.append, budget=2)
+    paths = [entry(queue, "id:000000,time:0,orig:seed"),
+             entry(queue, "id:000001,src:000000,op:havoc", 4096),
+             entry(queue, "id:000002,src:000000,op:havoc"),
+             entry(sydr, "id:000003,src:000000"),
+             entry(queue, "id:000004,src:000000,op:havoc,+cov"),
+             entry(queue, "id:000005,sync:sydr-worker,src:000003")]
+    for path in paths:
+        scheduler.submit(path)
+    assert released == []  # Wait for the budget
+    scheduler._release_batch(scheduler.budget)
+    # Sydr inputs and new edges score the same, ties are released in arrival order
+    assert [p.name.split(",")[0] for p in released] == ["id:000003", "id:000004"]
+    scheduler.stop()
+    # New hit counts (larger last), synced copies, then initial inputs
+    assert [p.name.split(",")[0] for p in released[2:]] == ["id:000002", "id:000001", "id:000005", "id:000000"]
+
+
+def test_imported_entries_are_suppressed(tmp_path):
+    queue = tmp_path / "afl_main-worker" / "queue"
+    released = []
+    scheduler = OutboundScheduler(released.append)
+    scheduler.submit(entry(queue, "id:000001,sync:remote-worker,src:000000"))
+    scheduler.submit(entry(queue, "id:000002,sync:local-worker,src:000000"))
+    scheduler.submit(entry(queue, "id:000003,src:000000,+cov"))
+    assert [p.name for p in released] == ["id:000003,src:000000,+cov"]  # No budget: released as they come
+    assert scheduler.suppressed == 2
+
+    kept = OutboundScheduler(released.append, suppress_remote=False)
+    kept.submit(queue / "id:000001,sync:remote-worker,src:000000")
+    assert len(released) == 2
+
+
+def test_oversized_entries_are_deferred(tmp_path):
+    queue = tmp_path / "afl_main-worker" / "queue"
+    released = []
+    scheduler = OutboundScheduler(released.append, defer_size=16)
+    scheduler.submit(entry(queue, "id:000001,src:000000,+cov", 64))
+    scheduler.submit(entry(queue, "id:000002,src:000000", 8))
+    assert [p.name for p in released] == ["id:000002,src:000000"]
+    scheduler.stop()
+    assert len(released) == 2 and scheduler.deferred == 1
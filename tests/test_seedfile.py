@@ -0,0 +1,24 @@
+# Local imports
+from pastissydr.seedfile import MMAP_THRESHOLD, SeedFile, digest_file, digest_seed
+
+
+def test_digest_and_read(tmp_path):
+    for size in [0, 100, MMAP_THRESHOLD * 2]:
+        data = bytes(i % 251 for i in range(size))
+        path = tmp_path / f"seed-{size}"
+        path.write_bytes(data)
+        with SeedFile(path) as seed:
+            assert seed.digest() == digest_seed(data) == digest_file(path)
+            assert seed.read() == data and not seed.truncated
+
+
+def test_limit_truncates_the_seed(tmp_path):
+    data = b"A" * MMAP_THRESHOLD + b"B" * 10
+    path = tmp_path / "seed"
+    path.write_bytes(data)
+    with SeedFile(path, limit=MMAP_THRESHOLD) as seed:
+        assert seed.truncated and seed.size == len(data)
+        assert seed.read() == data[:MMAP_THRESHOLD]
+        assert seed.digest() == digest_seed(data[:MMAP_THRESHOLD])
+    with SeedFile(path, limit=len(data) + 1) as seed:
+        assert not seed.truncated
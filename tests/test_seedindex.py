@@ -0,0 +1,62 @@
+# builtin imports
+import hashlib
+
+# Local imports
+from pastissydr.seedindex import SeedIndex
+
+
+def digest(i: int) -> bytes:
+    return hashlib.blake2b(str(i).encode(), digest_size=SeedIndex.DIGEST_SIZE).digest()
+
+
+def test_add_has_flags():
+    index = SeedIndex(capacity=16, bloom_bits=1024)
+    d = digest(0)
+    assert d not in index and index.flags(d) == 0
+    assert index.add(d, SeedIndex.RECEIVED)
+    assert not index.add(d, SeedIndex.RECEIVED)
+    assert index.has(d, SeedIndex.RECEIVED) and not index.has(d, SeedIndex.SENT)
+    assert index.add(d, SeedIndex.SENT)
+    assert index.flags(d) == SeedIndex.RECEIVED | SeedIndex.SENT
+    assert len(index) == 1
+    assert not index.has(digest(1))
+
+
+def test_reopen_keeps_entries(tmp_path):
+    path = tmp_path / "seeds.idx"
+    index = SeedIndex(path, capacity=16, digest_name="blake2b")
+    for i in range(100):
+        index.add(digest(i), SeedIndex.SENT if i % 2 else SeedIndex.RECEIVED)
+    index.close()
+
+    reopened = SeedIndex(path, digest_name="blake2b", bloom_bits=4096)
+    assert len(reopened) == 100
+    assert all(reopened.flags(digest(i)) == (SeedIndex.SENT if i % 2 else SeedIndex.RECEIVED) for i in range(100))
+    assert not reopened.has(digest(100))
+    reopened.close()
+
+    # An index of another digest is not reused
+    other = SeedIndex(path, digest_name="md5")
+    assert len(other) == 0 and not other.has(digest(0))
+
+
+def test_grow_rehashes_entries(tmp_path):
+    index = SeedIndex(tmp_path / "seeds.idx", capacity=16)
+    n = 1000
+    for i in range(n):
+        assert index.add(digest(i), SeedIndex.RECEIVED)
+    assert index.capacity >= n / SeedIndex.MAX_LOAD
+    assert len(index) == n
+    assert all(index.has(digest(i), SeedIndex.RECEIVED) for i in range(n))
+    assert not any(index.has(digest(i)) for i in range(n, 2 * n))
+    assert not (tmp_path / "seeds.tmp").exists()
+
+
+def test_bytes_per_entry_is_bounded():
+    index = SeedIndex(capacity=16, bloom_bits=1 << 16)
+    for i in range(20000):
+        index.add(digest(i), SeedIndex.SENT)
+    # Load factor stays above MAX_LOAD / 2 after growths, the Bloom filter adds a fixed 8 KiB
+    bound = SeedIndex.SLOT_SIZE / (SeedIndex.MAX_LOAD / 2) + (SeedIndex.HEADER.size + (1 << 16) // 8) / len(index)
+    assert index.bytes_per_entry <= bound
+    assert index.bytes_per_entry < 64
@@ -0,0 +1,66 @@
+# builtin imports
+import struct
+
+# third-party imports
+from libpastis.types import SeedType
+
+# Local imports
+from pastissydr.staging import InboundStaging
+
+
+class Queue:
+    """ Remote queue recording released seeds """
+
+    def __init__(self):
+        self.seeds = []
+
+    def __call__(self, seed: bytes, digest: bytes, seed_id: int) -> None:
+        self.seeds.append((seed_id, seed))
+
+
+def test_release_order_and_ids():
+    queue = Queue()
+    staging = InboundStaging(queue, first_id=5)
+    staging.submit(b"H", b"h", SeedType.HANG)
+    staging.submit(b"C", b"c", SeedType.CRASH)
+    staging.submit(b"L" * 100, b"l")
+    staging.submit(b"S", b"s")
+    staging.submit(b"T", b"t")
+    staging.stop()
+    # Inputs first (smaller first, then by arrival), then crashes, then hangs, ids follow the resumed queue
+    assert queue.seeds == [(5, b"S"), (6, b"T"), (7, b"L" * 100), (8, b"C"), (9, b"H")]
+    assert staging.next_id == 10
+
+
+def test_failed_release_does_not_consume_an_id():
+    released = []
+
+    def release(seed: bytes, digest: bytes, seed_id: int) -> None:
+        if seed == b"bad":
+            raise OSError("disk full")
+        released.append(seed_id)
+
+    staging = InboundStaging(release)
+    for seed in [b"a", b"bad", b"c"]:
+        staging.submit(seed, seed)
+    staging.stop()
+    assert released == [0, 1] and staging.next_id == 2
+
+
+def test_lowest_priority_seed_is_shed():
+    queue = Queue()
+    staging = InboundStaging(queue, capacity=2)
+    staging.submit(b"H", b"h", SeedType.HANG)
+    staging.submit(b"B" * 64, b"b")
+    staging.submit(b"A", b"a")
+    staging.stop()
+    assert [seed for _, seed in queue.seeds] == [b"A", b"B" * 64]
+    assert staging.shed == 1
+
+
+def test_unsynced_follows_afl_cursor(tmp_path):
+    synced = tmp_path / "remote-worker"
+    staging = InboundStaging(Queue(), synced_file=synced, first_id=10)
+    assert staging.unsynced() == 10  # Nothing imported yet
+    synced.write_bytes(struct.pack("=I", 8))
+    assert staging.unsynced() == 2
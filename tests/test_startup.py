@@ -0,0 +1,37 @@
+# builtin imports
+import json
+import os
+import threading
+import time
+
+# Local imports
+from pastissydr.startup import StartupTimer, process_start
+
+
+def test_phases_are_consecutive():
+    timer = StartupTimer(origin=time.monotonic())
+    timer.mark("driver")
+    time.sleep(0.01)
+    assert timer.mark("spawn") >= 0.01
+    report = timer.report()
+    assert list(report) == ["driver", "spawn", "total"]
+    assert abs(report["driver"] + report["spawn"] - report["total"]) < 0.002
+    assert process_start() is None or process_start() <= time.monotonic()
+
+
+def test_first_exec_of_a_fresh_stats_file(tmp_path):
+    stats = tmp_path / "fuzzer_stats"
+    stats.write_text("execs_done : 10\n")
+    os.utime(stats, (time.time() - 60, time.time() - 60))  # Left by a previous run
+    done = threading.Event()
+    timer = StartupTimer()
+    timer.wait_first_exec(lambda: [stats], lambda t: done.set(), interval=0.01)
+    assert not done.wait(0.1)
+    stats.write_text("execs_done : 0\n")
+    assert not done.wait(0.1)
+    stats.write_text("execs_done : 50\n")
+    assert done.wait(2)
+    timer.stop()
+    assert StartupTimer.FIRST_EXEC in timer.phases
+    timer.dump(tmp_path / "startup.json")
+    assert json.loads((tmp_path / "startup.json").read_text())["total"] == round(timer.total, 3)
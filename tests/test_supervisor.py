@@ -0,0 +1,62 @@
+# builtin imports
+import subprocess
+import sys
+import threading
+
+# Local imports
+from pastissydr.supervisor import Supervisor
+
+
+def spawn(code: int) -> subprocess.Popen:
+    """ Process exiting with ``code``, killed by signal ``-code`` if negative """
+    script = f"import os; os.kill(os.getpid(), {-code})" if code < 0 else f"import sys; sys.exit({code})"
+    return subprocess.Popen([sys.executable, "-c", script])
+
+
+class Watched:
+    def __init__(self, codes, max_restarts: int = 2):
+        self.codes = list(codes)
+        self.given_up = []
+        self.done = threading.Event()
+        self.supervisor = Supervisor(self.restart, self.give_up, max_restarts=max_restarts, backoff=0.01)
+        self.supervisor.watch(spawn(self.codes.pop(0)))
+
+    def restart(self) -> None:
+        self.supervisor.watch(spawn(self.codes.pop(0)))
+
+    def give_up(self, code: int) -> None:
+        self.given_up.append(code)
+        self.done.set()
+
+
+def test_normal_exit_is_not_restarted():
+    watched = Watched([0])
+    assert watched.done.wait(10)
+    assert watched.given_up == [0]
+    assert watched.supervisor.restarts == watched.supervisor.crashes == 0
+
+
+def test_failures_are_restarted_until_the_process_succeeds():
+    watched = Watched([1, -9, 0])
+    assert watched.done.wait(10)
+    assert watched.given_up == [0]
+    assert watched.supervisor.restarts == watched.supervisor.crashes == 2
+
+
+def test_give_up_after_max_restarts():
+    watched = Watched([1, 1, 1], max_restarts=2)
+    assert watched.done.wait(10)
+    assert watched.given_up == [1]
+    assert watched.supervisor.restarts == 2 and watched.supervisor.crashes == 3
+
+
+def test_expected_exit_is_not_restarted():
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(10)"])
+    watched = []
+    supervisor = Supervisor(lambda: watched.append("restart"), watched.append, backoff=0.01)
+    supervisor.watch(process)
+    supervisor.expect_exit()
+    process.kill()
+    process.wait()
+    supervisor._thread.join(10)
+    assert watched == [] and supervisor.crashes == 0
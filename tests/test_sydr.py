@@ -0,0 +1,58 @@
+# builtin imports
+import os
+import stat
+from pathlib import Path
+
+# third-party imports
+import pytest
+from libpastis.types import FuzzMode
+from sydrbroker import SydrConfigurationInterface
+
+# Local imports
+from pastissydr.sydr import SydrProcess
+from pastissydr.workspace import Workspace
+
+
+def test_afl_environment_is_per_process(tmp_path, monkeypatch):
+    fake = tmp_path / "sydr-fuzz"
+    fake.write_text("#!/bin/sh\nenv > sydr-fuzz.env\n")
+    fake.chmod(fake.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv(SydrProcess.SYDR_ENV_VAR, str(fake))
+    monkeypatch.delenv("AFL_AUTORESUME", raising=False)
+    monkeypatch.delenv("AFL_NO_AFFINITY", raising=False)
+
+    workspace = Workspace(watcher="polling", path=tmp_path / "ws")
+    sydr = SydrProcess(cpus=sorted(os.sched_getaffinity(0)), max_restarts=0)
+    sydr.start("/bin/true", "/bin/true", "", workspace, FuzzMode.BINARY_ONLY, True,
+               SydrConfigurationInterface.new(), "")
+    sydr.wait()
+    env = dict(line.split("=", 1) for line in (workspace.root_dir / "sydr-fuzz.env").read_text().splitlines()
+               if "=" in line)
+    assert env["AFL_NO_UI"] == "1" and env["AFL_NO_AFFINITY"] == "1"
+    assert "AFL_AUTORESUME" not in env
+    # Other campaigns of the process do not inherit them
+    assert "AFL_NO_UI" not in os.environ and "AFL_NO_AFFINITY" not in os.environ
+
+
+def test_broker_jobs_are_clamped_to_the_plan(tmp_path, monkeypatch):
+    fake = tmp_path / "sydr-fuzz"
+    fake.write_text("#!/bin/sh\n")
+    fake.chmod(fake.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv(SydrProcess.SYDR_ENV_VAR, str(fake))
+
+    workspace = Workspace(watcher="polling", path=tmp_path / "ws")
+    sydr = SydrProcess(afl_jobs=3, sydr_jobs=2, max_restarts=0)
+    config = SydrConfigurationInterface.from_str('{"sydr": {"jobs": 8}, "aflplusplus": {"jobs": 1}}')
+    sydr.start("/bin/true", "/bin/true", "", workspace, FuzzMode.BINARY_ONLY, True, config, "")
+    sydr.wait()
+    toml = (workspace.root_dir / "sydr-fuzz.toml").read_text()
+    assert sydr.jobs == (1, 2)
+    assert "jobs = 2" in toml and "jobs = 1" in toml
+    # The plan is kept for the next campaigns
+    assert (sydr.afl_jobs, sydr.sydr_jobs) == (3, 2)
+
+
+def test_legacy_engine_arguments_are_rejected():
+    assert SydrConfigurationInterface.from_str("").to_str() == "{}"
+    with pytest.raises(ValueError):
+        SydrConfigurationInterface.from_str("-D -p exploit")
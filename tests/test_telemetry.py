@@ -0,0 +1,41 @@
+# builtin imports
+from pathlib import Path
+
+# Local imports
+from pastissydr.logtail import LogFollower
+from pastissydr.telemetry import TelemetrySampler, TelemetrySeries
+
+
+def write_stats(path: Path, corpus: int, edges: int) -> Path:
+    path.mkdir(parents=True)
+    stats = path / "fuzzer_stats"
+    stats.write_text(f"execs_done        : 1000\n"
+                     f"execs_per_sec     : 250.00\n"
+                     f"corpus_count      : {corpus}\n"
+                     f"edges_found       : {edges}\n"
+                     f"total_edges       : 65536\n"
+                     f"saved_crashes     : 1\n"
+                     f"bitmap_cvg        : 0.15%\n")
+    return stats
+
+
+def test_corpus_comes_from_the_main_instance(tmp_path):
+    main = write_stats(tmp_path / "afl_main-worker", 120, 100)
+    secondary = write_stats(tmp_path / "afl_s01-worker", 90, 80)
+    sent = []
+    sampler = TelemetrySampler(lambda: [main, secondary], LogFollower(), sent.append,
+                               series_file=tmp_path / "telemetry.bin", main_stats_file=main)
+    sampler.start()
+    sampler.stop()  # Final sample, recorded but not sent
+    sample = sampler.tick()
+    assert sample.workers == 2 and sample.exec_per_sec == 500.0 and sample.total_exec == 2000
+    assert sample.corpus == 120 and sample.edges_found == 100 and sample.crashes == 2
+    assert sent and sent[-1] == sample
+    assert [s.corpus for s in TelemetrySeries.read(tmp_path / "telemetry.bin")] == [120]
+
+
+def test_corpus_without_main_instance_is_not_summed(tmp_path):
+    secondaries = [write_stats(tmp_path / f"afl_s0{i}-worker", 90 + i, 80) for i in range(3)]
+    sampler = TelemetrySampler(lambda: secondaries, LogFollower(), lambda s: None,
+                               main_stats_file=tmp_path / "afl_main-worker" / "fuzzer_stats")
+    assert sampler.sample().corpus == 92
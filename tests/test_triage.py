@@ -0,0 +1,26 @@
+# Local imports
+from pastissydr.triage import CrashTriage
+
+
+def test_unreproduced_crashes_are_all_reported(tmp_path):
+    reported = []
+    triage = CrashTriage(reported.append, lambda summary: None, use_gdb=False, timeout=5)
+    triage.configure("true @@", stdin=False)  # Crashes do not reproduce
+    for i in range(3):
+        crash = tmp_path / f"id:00000{i},sig:11,src:000000"
+        crash.write_bytes(bytes([i]))
+        triage._triage(crash)
+    assert [p.name for p in reported] == [f"id:00000{i},sig:11,src:000000" for i in range(3)]
+    assert triage.stats()["unreproduced"] == 3 and triage.stats()["buckets"] == 1
+
+
+def test_reproduced_crashes_are_deduplicated(tmp_path):
+    reported = []
+    triage = CrashTriage(reported.append, lambda summary: None, use_gdb=False, timeout=5)
+    triage.configure("sh -c 'kill -SEGV $$' @@", stdin=False)
+    for i in range(3):
+        crash = tmp_path / f"id:00000{i},sig:11,src:000000"
+        crash.write_bytes(bytes([i]))
+        triage._triage(crash)
+    assert [p.name for p in reported] == ["id:000000,sig:11,src:000000"]
+    assert triage.stats()["replayed"] == 3 and triage.stats()["buckets"] == 1
@@ -0,0 +1,50 @@
+# builtin imports
+import shutil
+import time
+from pathlib import Path
+
+# third-party imports
+import pytest
+from watchdog.events import FileSystemEventHandler
+
+# Local imports
+from pastissydr.watcher import InotifyObserver
+
+
+class Collector(FileSystemEventHandler):
+    def __init__(self):
+        self.created = []
+
+    def on_created(self, event):
+        self.created.append(Path(event.src_path).name)
+
+
+def wait_for(predicate, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.mark.skipif(not InotifyObserver.is_available(), reason="inotify not available")
+def test_removed_directory_is_watched_again(tmp_path):
+    queue = tmp_path / "queue"
+    queue.mkdir()
+    collector = Collector()
+    observer = InotifyObserver()
+    observer.schedule(collector, queue)
+    observer.start()
+    try:
+        (queue / "id:000000").write_bytes(b"A")
+        assert wait_for(lambda: collector.created == ["id:000000"])
+
+        shutil.rmtree(queue)
+        assert wait_for(lambda: queue in observer._lost)
+        queue.mkdir()
+        (queue / "id:000001").write_bytes(b"B")  # Before the watch is re-armed
+        assert wait_for(lambda: observer.rearmed == 1)
+        (queue / "id:000002").write_bytes(b"C")
+        assert wait_for(lambda: sorted(set(collector.created)) == ["id:000000", "id:000001", "id:000002"])
+    finally:
+        observer.stop()
+        observer.join()